@@ -1,7 +1,13 @@
 from django.contrib import admin
 from account.models import User
+from project.admin import LargeTableAdmin
 # Register your models here.
 
-class UserAdmin(admin.ModelAdmin):
-    list_display = ('username', 'email')
+class UserAdmin(LargeTableAdmin):
+    list_display = ('id', 'username', 'email', 'verified', 'is_staff', 'date_joined')
+    list_filter = ('verified', 'is_staff', 'is_active')
+    search_fields = ('=id', '^username', '=email')
+    readonly_fields = ('last_login', 'date_joined')
+    exclude = ('password',)
+    ordering = ('-id',)
 admin.site.register(User, UserAdmin)
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from account.models import User
+
+KEY = 'user-fragment:{}'
+CONTEXT_KEY = 'user_fragments'
+
+
+def render(user):
+    # Rendered without a request, so the picture URL stays relative and the
+    # fragment can be shared between hosts; `absolute` fixes it up per request.
+    from account.serializers import UserProfileSerializer
+    return dict(UserProfileSerializer(user).data)
+
+
+def refresh(user):
+    cache.set(KEY.format(user.pk), render(user), settings.USER_FRAGMENT_TIMEOUT)
+
+
+def forget(user_id):
+    cache.delete(KEY.format(user_id))
+
+
+def get_fragments(user_ids):
+    """Fragments for `user_ids` in one cache round trip, rendering (and caching) any misses."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    cached = cache.get_many([KEY.format(user_id) for user_id in user_ids])
+    fragments = {user_id: cached[KEY.format(user_id)] for user_id in user_ids if KEY.format(user_id) in cached}
+
+    missing = user_ids - fragments.keys()
+    if missing:
+        rendered = {user.pk: render(user) for user in User.objects.filter(pk__in=missing)}
+        cache.set_many({KEY.format(user_id): data for user_id, data in rendered.items()}, settings.USER_FRAGMENT_TIMEOUT)
+        fragments.update(rendered)
+    return fragments
+
+
+def prime(context, user_ids):
+    """Load fragments for a page of objects into the serializer context."""
+    loaded = context.setdefault(CONTEXT_KEY, {})
+    loaded.update(get_fragments(set(user_ids) - loaded.keys()))
+    return loaded
+
+
+def fragment_for(context, user_id):
+    if user_id is None:
+        return None
+    loaded = context.get(CONTEXT_KEY)
+    if loaded is None or user_id not in loaded:
+        loaded = prime(context, [user_id])
+    return absolute(loaded.get(user_id), context.get('request'))
+
+
+def absolute(fragment, request):
+    if fragment is None or request is None or not fragment.get('profile_picture'):
+        return fragment
+    return {**fragment, 'profile_picture': request.build_absolute_uri(fragment['profile_picture'])}
@@ -0,0 +1,48 @@
+"""
+Process pool for password hashing during user imports. Pool processes are
+spawned and unpickle their initializer from here, so this module must be
+importable before Django is set up: no models.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def init_worker():
+    # Spawned workers start from a fresh interpreter and need Django configured before hashing.
+    if not settings.configured or not django.apps.apps.ready:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
+        django.setup()
+
+
+def new_pool(workers):
+    # Spawned, not forked: forking a threaded server process copies locks
+    # held by its other threads into the children.
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=init_worker,
+    )
+
+
+def hashing_pool():
+    """The process-wide pool shared by all imports, sized by USER_IMPORT_WORKERS."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = new_pool(settings.USER_IMPORT_WORKERS)
+        return _pool
+
+
+def discard_pool(pool):
+    """Drop a broken pool so the next import starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
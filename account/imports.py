@@ -0,0 +1,199 @@
+import csv
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, close_old_connections, transaction
+
+from account.hashing import discard_pool, hashing_pool, new_pool
+from account.models import User
+from account.serializers import UserImportSerializer
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'ndjson')
+JOB_KEY = 'user-import:{}'
+
+
+def detect_format(name):
+    return 'ndjson' if name.lower().endswith(('.ndjson', '.jsonl')) else 'csv'
+
+
+def iter_rows(stream, fmt):
+    """Yield `(row_number, data)` from a binary stream; `data` is an error message for unreadable rows."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            yield number, {key: value for key, value in row.items() if key and value not in (None, '')}
+        return
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as exc:
+            yield number, f"Invalid JSON: {exc}"
+            continue
+        yield number, data if isinstance(data, dict) else "Each line must be a JSON object."
+
+
+class UserImporter:
+    """
+    Create users from CSV/NDJSON rows in chunks: validate each row, check
+    uniqueness for the whole chunk in two queries, hash passwords on a
+    process pool (the shared one, unless `workers` asks for a private pool
+    of that size) and insert with bulk_create. Rows without a password get
+    an unusable one.
+    """
+
+    def __init__(self, chunk_size=None, workers=None, send_emails=True):
+        self.chunk_size = chunk_size or settings.USER_IMPORT_CHUNK_SIZE
+        self.own_pool = workers is not None
+        self.workers = workers or settings.USER_IMPORT_WORKERS
+        self.send_emails = send_emails
+        self.created = []
+        self.errors = []
+        self.seen_emails = set()
+        self.seen_usernames = set()
+
+    def run(self, rows):
+        pool = new_pool(self.workers) if self.own_pool else hashing_pool()
+        with pool if self.own_pool else nullcontext():
+            try:
+                chunk = []
+                for row in rows:
+                    chunk.append(row)
+                    if len(chunk) >= self.chunk_size:
+                        self.import_chunk(chunk, pool)
+                        chunk = []
+                if chunk:
+                    self.import_chunk(chunk, pool)
+            except BrokenProcessPool:
+                # A worker died; the next import starts a fresh pool.
+                discard_pool(pool)
+                raise
+
+        if self.send_emails and self.created:
+            from account.utiles import queue_activation_emails
+            queue_activation_emails(self.created)
+        self.errors.sort(key=lambda error: error['row'])
+        return {'created': len(self.created), 'errors': self.errors}
+
+    def error(self, number, errors):
+        self.errors.append({'row': number, 'errors': errors})
+
+    def validate(self, chunk):
+        valid = []
+        for number, data in chunk:
+            if isinstance(data, str):
+                self.error(number, {'non_field_errors': [data]})
+                continue
+            serializer = UserImportSerializer(data=data)
+            if not serializer.is_valid():
+                self.error(number, serializer.errors)
+                continue
+            attrs = dict(serializer.validated_data)
+            password = attrs.pop('password', '')
+            user = User(**attrs, verified=False)
+            if password:
+                try:
+                    validate_password(password, user)
+                except DjangoValidationError as exc:
+                    self.error(number, {'password': exc.messages})
+                    continue
+            valid.append((number, user, password))
+
+        emails = {user.email for _, user, _ in valid}
+        usernames = {user.username for _, user, _ in valid}
+        taken_emails = set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+        taken_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+
+        unique = []
+        for number, user, password in valid:
+            errors = {}
+            if user.email in taken_emails or user.email in self.seen_emails:
+                errors['email'] = ["A user with this email already exists."]
+            if user.username in taken_usernames or user.username in self.seen_usernames:
+                errors['username'] = ["A user with that username already exists."]
+            if errors:
+                self.error(number, errors)
+                continue
+            self.seen_emails.add(user.email)
+            self.seen_usernames.add(user.username)
+            unique.append((number, user, password))
+        return unique
+
+    def import_chunk(self, chunk, pool):
+        valid = self.validate(chunk)
+        if not valid:
+            return
+        to_hash = [password for _, _, password in valid if password]
+        hashed = iter(pool.map(make_password, to_hash, chunksize=max(1, len(to_hash) // (self.workers * 4))))
+        for _, user, password in valid:
+            user.password = next(hashed) if password else make_password(None)
+
+        users = [user for _, user, _ in valid]
+        try:
+            with transaction.atomic():
+                self.created.extend(User.objects.bulk_create(users))
+        except IntegrityError:
+            # Someone registered one of these meanwhile; find the rows one by one.
+            for number, user, _ in valid:
+                try:
+                    with transaction.atomic():
+                        user.save()
+                except IntegrityError:
+                    self.error(number, {'non_field_errors': ["A user with this email or username already exists."]})
+                else:
+                    self.created.append(user)
+
+
+def start_import(upload, fmt, send_emails=True):
+    """
+    Copy an uploaded file aside and import it on a background thread.
+    Returns the job id; progress and the result are kept in the cache
+    (see `import_status`) for USER_IMPORT_JOB_TTL seconds.
+    """
+    with tempfile.NamedTemporaryFile(prefix='user-import-', delete=False) as f:
+        for chunk in upload.chunks():
+            f.write(chunk)
+    job_id = uuid.uuid4().hex
+    _set_status(job_id, 'pending')
+    threading.Thread(
+        target=_run_import, args=(job_id, f.name, fmt, send_emails), name='user-import', daemon=True,
+    ).start()
+    return job_id
+
+
+def import_status(job_id):
+    return cache.get(JOB_KEY.format(job_id))
+
+
+def _set_status(job_id, state, **data):
+    cache.set(JOB_KEY.format(job_id), {'id': job_id, 'status': state, **data}, settings.USER_IMPORT_JOB_TTL)
+
+
+def _run_import(job_id, path, fmt, send_emails):
+    close_old_connections()
+    try:
+        _set_status(job_id, 'running')
+        with open(path, 'rb') as stream:
+            result = UserImporter(send_emails=send_emails).run(iter_rows(stream, fmt))
+        _set_status(job_id, 'done', **result)
+    except Exception:
+        logger.exception("User import %s failed", job_id)
+        _set_status(job_id, 'failed')
+    finally:
+        os.remove(path)
+        close_old_connections()
@@ -0,0 +1,39 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from account.imports import FORMATS, UserImporter, detect_format, iter_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users from a CSV (header row) or NDJSON file with username, email and optional "
+        "password, first_name, last_name, phone, address, birth_date and bio columns."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or - for stdin.")
+        parser.add_argument('--format', choices=FORMATS, help="Defaults to the file extension (csv otherwise).")
+        parser.add_argument('--chunk-size', type=int)
+        parser.add_argument('--workers', type=int, help="Password hashing processes (default: the shared pool of USER_IMPORT_WORKERS).")
+        parser.add_argument('--no-email', action='store_true', help="Do not send activation emails.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path == '-' else detect_format(path))
+        try:
+            stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        except OSError as exc:
+            raise CommandError(exc)
+
+        importer = UserImporter(options['chunk_size'], options['workers'], send_emails=False)
+        with stream:
+            result = importer.run(iter_rows(stream, fmt))
+
+        for error in result['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        if importer.created and not options['no_email']:
+            # The command waits for delivery instead of handing off to a thread.
+            from account.utiles import send_activation_emails
+            self.stdout.write(f"Sent {send_activation_emails(importer.created)} activation email(s).")
+        self.stdout.write(f"Created {result['created']} user(s); {len(result['errors'])} row(s) rejected.")
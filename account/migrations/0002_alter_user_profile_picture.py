@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:33
+
+import funding.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='profile_picture',
+            field=models.ImageField(blank=True, default='default.jpg', null=True, storage=funding.storage.media_storage, upload_to='profile_pictures/'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from datetime import date
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
+from funding.storage import media_storage
 
 # Create your models here.
 
@@ -15,7 +16,7 @@ class User(AbstractUser):
     password = models.CharField(max_length=128)
     first_name = models.CharField(max_length=30, blank=True)
     last_name = models.CharField(max_length=30, blank=True)
-    profile_picture = models.ImageField(default='default.jpg', upload_to='profile_pictures/', blank=True, null=True)
+    profile_picture = models.ImageField(default='default.jpg', upload_to='profile_pictures/', storage=media_storage, blank=True, null=True)
     verified = models.BooleanField(default=False)
     bio = models.TextField(blank=True)
     address = models.CharField(max_length=100, blank=True)
@@ -70,6 +70,25 @@ class UserProfileSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id", "username", "email"]
 
+class UserImportSerializer(serializers.ModelSerializer):
+    # Uniqueness is checked per chunk in account.imports, not per row.
+    password = serializers.CharField(write_only=True, required=False, allow_blank=True)
+    phone = serializers.CharField(
+        required=False,
+        allow_blank=True,
+        validators=[
+            RegexValidator(
+                regex=r'^01[0125][0-9]{8}$',
+                message="Phone number must be a valid Egyptian mobile number."
+            )
+        ]
+    )
+
+    class Meta:
+        model = User
+        fields = ["first_name", "last_name", "username", "email", "password", "address", "birth_date", "phone", "bio"]
+        extra_kwargs = {"username": {"validators": []}, "email": {"validators": []}}
+
 class UserUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
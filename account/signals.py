@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from account import fragments
+from account.models import User
+
+
+@receiver(post_save, sender=User)
+def refresh_user_fragment(sender, instance, **kwargs):
+    transaction.on_commit(lambda: fragments.refresh(instance))
+
+
+@receiver(post_delete, sender=User)
+def forget_user_fragment(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: fragments.forget(user_id))
@@ -1,3 +1,164 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from account import fragments
+from account.imports import UserImporter, iter_rows
+from account.models import User
+from funding.models import Comment, Post
+
+
+class UserFragmentTests(TestCase):
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author', email='author@rafiq.local', bio="Builds wells")
+        cls.commenter = User.objects.create(username='commenter', email='commenter@rafiq.local')
+
+    def setUp(self):
+        cache.delete_many([fragments.KEY.format(user.pk) for user in (self.author, self.commenter)])
+
+    def test_misses_are_rendered_once_and_then_served_from_the_cache(self):
+        with self.assertNumQueries(1):
+            loaded = fragments.get_fragments([self.author.pk, self.commenter.pk])
+        self.assertEqual(loaded[self.author.pk]['bio'], "Builds wells")
+
+        with self.assertNumQueries(0):
+            self.assertEqual(fragments.get_fragments([self.author.pk, self.commenter.pk]), loaded)
+
+    def test_saving_or_deleting_a_user_updates_the_cached_fragment(self):
+        fragments.get_fragments([self.author.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.bio = "Builds schools"
+            self.author.save()
+        self.assertEqual(cache.get(fragments.KEY.format(self.author.pk))['bio'], "Builds schools")
+
+        author_id = self.author.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.delete()
+        self.assertIsNone(cache.get(fragments.KEY.format(author_id)))
+
+    def test_comment_users_have_absolute_picture_urls(self):
+        post = Post.objects.create(title="Campaign", content="-", author=self.author, target_amount=Decimal('100'))
+        comment = Comment.objects.create(post=post, user=self.commenter, content="First")
+        Comment.objects.create(post=post, user=self.author, parent=comment, content="Thanks")
+        fragments.get_fragments([self.author.pk])  # One cached, one missing.
+
+        self.client.force_authenticate(self.commenter)
+        response = self.client.get('/funding/comments/', {'post_id': post.pk})
+
+        self.assertEqual(response.status_code, 200)
+        [result] = response.json()['results']
+        self.assertEqual(result['user']['username'], 'commenter')
+        self.assertEqual(result['user']['profile_picture'], 'http://testserver/media/default.jpg')
+        self.assertEqual(result['replies'][0]['user']['username'], 'author')
+        self.assertEqual(cache.get(fragments.KEY.format(self.commenter.pk))['profile_picture'], '/media/default.jpg')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class UserImportTests(TestCase):
+    rows = (
+        "username,email,password,first_name\n"
+        "amira,amira@rafiq.local,Str0ng-passphrase,Amira\n"
+        "omar,omar@rafiq.local,,Omar\n"
+        "bad,not-an-email,Str0ng-passphrase,\n"
+        "dup,amira@rafiq.local,Str0ng-passphrase,\n"
+        "weak,weak@rafiq.local,123,\n"
+        "taken,taken@rafiq.local,,\n"
+    )
+
+    def setUp(self):
+        User.objects.create(username='existing', email='taken@rafiq.local')
+        pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(pool.shutdown)
+        self.enterContext(mock.patch('account.imports.hashing_pool', return_value=pool))
+
+    def run_import(self, content, fmt='csv', chunk_size=None):
+        importer = UserImporter(chunk_size=chunk_size, send_emails=False)
+        return importer.run(iter_rows(io.BytesIO(content.encode()), fmt))
+
+    def test_valid_rows_are_created_and_invalid_ones_reported(self):
+        result = self.run_import(self.rows, chunk_size=2)
+
+        self.assertEqual(result['created'], 2)
+        self.assertEqual([error['row'] for error in result['errors']], [3, 4, 5, 6])
+        self.assertIn('email', result['errors'][0]['errors'])
+        self.assertIn('password', result['errors'][2]['errors'])
+        amira, omar = User.objects.get(username='amira'), User.objects.get(username='omar')
+        self.assertTrue(amira.check_password('Str0ng-passphrase'))
+        self.assertFalse(amira.verified)
+        self.assertFalse(omar.has_usable_password())
+
+    def test_ndjson_lines_are_numbered_and_checked(self):
+        content = '{"username": "amira", "email": "amira@rafiq.local"}\n\nnot json\n[1, 2]\n'
+        result = self.run_import(content, fmt='ndjson')
+
+        self.assertEqual(result['created'], 1)
+        self.assertEqual([error['row'] for error in result['errors']], [3, 4])
+
+    def test_command_imports_with_its_own_pool(self):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'users.csv')
+        with open(path, 'w') as f:
+            f.write(self.rows)
+        out, err = StringIO(), StringIO()
+
+        call_command('import_users', path, '--workers', '1', '--no-email', stdout=out, stderr=err)
+
+        self.assertIn("Created 2 user(s); 4 row(s) rejected.", out.getvalue())
+        self.assertIn("Row 3:", err.getvalue())
+        # Spawned workers hash with the project's PASSWORD_HASHERS, not this test's override.
+        self.assertTrue(User.objects.get(username='amira').has_usable_password())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class UserImportAPITests(TransactionTestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', email='admin@rafiq.local', is_staff=True)
+        pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(pool.shutdown)
+        self.enterContext(mock.patch('account.imports.hashing_pool', return_value=pool))
+
+    def upload(self, content, name='users.csv', **data):
+        upload = SimpleUploadedFile(name, content.encode())
+        return self.client.post('/account/import-users/', {'file': upload, 'send_emails': 'false', **data}, format='multipart')
+
+    def wait_for(self, url):
+        for _ in range(100):
+            job = self.client.get(url).json()
+            if job['status'] in ('done', 'failed'):
+                return job
+            time.sleep(0.05)
+        self.fail("The import did not finish.")
+
+    def test_import_runs_in_the_background_and_reports_its_result(self):
+        self.client.force_authenticate(self.admin)
+        response = self.upload("username,email\nomar,omar@rafiq.local\nbad,not-an-email\n")
+
+        self.assertEqual(response.status_code, 202)
+        job = self.wait_for(response.json()['url'])
+        self.assertEqual((job['status'], job['created']), ('done', 1))
+        self.assertEqual([error['row'] for error in job['errors']], [2])
+        self.assertTrue(User.objects.filter(username='omar').exists())
+
+    def test_unknown_jobs_formats_and_non_admins(self):
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.get('/account/import-users/missing/').status_code, 404)
+        self.assertEqual(self.upload("", format='xml').status_code, 400)
+
+        self.client.force_authenticate(User.objects.create(username='member', email='member@rafiq.local'))
+        self.assertEqual(self.upload("username,email\n").status_code, 403)
@@ -10,4 +10,6 @@ urlpatterns = [
     path("password-reset/", views.RequestPasswordResetView.as_view(), name="request-password-reset"),
     path("password-reset/<str:token>/", views.ResetPasswordView.as_view(), name="reset-password"),
     path("update-profile/", views.UserUpdateView.as_view(), name="update-profile"),
+    path("import-users/", views.UserImportView.as_view(), name="import-users"),
+    path("import-users/<str:job_id>/", views.UserImportStatusView.as_view(), name="import-users-status"),
 ]
@@ -1,12 +1,17 @@
+import logging
+import threading
+
 import jwt
 from datetime import datetime, timedelta, timezone
 from django.conf import settings
-from django.core.mail import send_mail,EmailMultiAlternatives
+from django.core.mail import send_mail,EmailMultiAlternatives,get_connection
 from django.urls import reverse
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.contrib.sites.shortcuts import get_current_site
 
+logger = logging.getLogger(__name__)
+
 def generate_activation_jwt(user):
     payload = {
         "user_id": user.id,
@@ -17,7 +22,7 @@ def generate_activation_jwt(user):
     token = jwt.encode(payload, settings.SECRET_KEY, algorithm="HS256")
     return token
 
-def send_activation_email(user, request):
+def build_activation_email(user):
     token = generate_activation_jwt(user)
    
     # Build activation URL
@@ -38,7 +43,7 @@ def send_activation_email(user, request):
     html_content = render_to_string('emails/account_activation.html', context)
     text_content = strip_tags(html_content)
     
-    # Create and send email
+    # Create email
     email = EmailMultiAlternatives(
         subject,
         text_content,
@@ -53,8 +58,28 @@ def send_activation_email(user, request):
         'X-Priority': '1',  # High priority
         'X-MC-Tags': 'account-activation',
     }
-    
-    email.send()
+    return email
+
+def send_activation_email(user, request):
+    build_activation_email(user).send()
+
+def send_activation_emails(users, batch_size=100):
+    # One SMTP connection for the whole run instead of one per message.
+    sent = 0
+    with get_connection() as connection:
+        for start in range(0, len(users), batch_size):
+            messages = [build_activation_email(user) for user in users[start:start + batch_size]]
+            sent += connection.send_messages(messages) or 0
+    return sent
+
+def queue_activation_emails(users):
+    def run():
+        try:
+            send_activation_emails(users)
+        except Exception:
+            logger.exception("Sending %d activation emails failed", len(users))
+
+    threading.Thread(target=run, name='activation-emails', daemon=True).start()
     
 def generate_password_reset_jwt(user):
     payload = {
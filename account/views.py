@@ -6,9 +6,12 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.parsers import MultiPartParser
+from rest_framework.reverse import reverse
 from rest_framework.views import APIView
 from account.models import User
+from account.imports import FORMATS, detect_format, import_status, start_import
 from account.utiles import send_activation_email, send_password_reset_email
 from account.serializers import RegisterSerializer, LoginSerializer, UserProfileSerializer, UserUpdateSerializer
 from django.contrib.auth import get_user_model
@@ -109,3 +112,35 @@ class UserUpdateView(RetrieveUpdateAPIView):
 
     def get_object(self):
         return self.request.user
+
+
+class UserImportView(APIView):
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"file": ["A CSV or NDJSON file is required."]}, status=status.HTTP_400_BAD_REQUEST)
+        fmt = request.data.get("format") or detect_format(upload.name)
+        if fmt not in FORMATS:
+            return Response({"format": [f"Must be one of {', '.join(FORMATS)}."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        send_emails = request.data.get("send_emails", "true").lower() != "false"
+        # Hashing every password takes far longer than a request may, so
+        # the import runs in the background and is polled for its result.
+        job_id = start_import(upload, fmt, send_emails)
+        return Response(
+            {"id": job_id, "status": "pending", "url": reverse("import-users-status", args=[job_id], request=request)},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class UserImportStatusView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, job_id):
+        job = import_status(job_id)
+        if job is None:
+            return Response({"detail": "Unknown or expired import."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(job)
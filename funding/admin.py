@@ -1,8 +1,183 @@
-# from .models import * 
-# from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 
+from project.admin import LargeTableAdmin
 
-# admin.site.register(Post)
-# admin.site.register(PostImage)
+from . import leaderboards, similarity, typeahead
+from .models import Category, Comment, DigestPreference, Donation, Post, PostImage, Rating, Tag
 
-# Register your models here.
+ACTION_CHUNK_SIZE = 1000
+
+
+def chunked_ids(queryset):
+    ids = []
+    for pk in queryset.values_list('pk', flat=True).order_by('pk').iterator(chunk_size=ACTION_CHUNK_SIZE):
+        ids.append(pk)
+        if len(ids) == ACTION_CHUNK_SIZE:
+            yield ids
+            ids = []
+    if ids:
+        yield ids
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name')
+    search_fields = ('^name',)
+    ordering = ('name',)
+
+
+@admin.register(Tag)
+class TagAdmin(LargeTableAdmin):
+    list_display = ('id', 'name')
+    search_fields = ('^name',)
+    ordering = ('name',)
+
+
+@admin.register(Post)
+class PostAdmin(LargeTableAdmin):
+    list_display = (
+        'id', 'title', 'author', 'category', 'target_amount', 'donated', 'donation_count', 'is_canceled', 'created_at',
+    )
+    list_display_links = ('id', 'title')
+    list_select_related = ('author', 'category')
+    list_filter = ('is_canceled', 'category')
+    search_fields = ('=id', '^title')
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('category', 'tags')
+    # views is written in batches by funding.counters and the archived_*
+    # totals by funding.archive; editing them by hand would corrupt them.
+    readonly_fields = (
+        'views', 'archived_at', 'archived_donation_total', 'archived_donation_count',
+        'archived_comment_count', 'archived_rating_count', 'archived_rating_sum',
+    )
+    ordering = ('-id',)
+    actions = ('cancel_campaigns', 'recompute_leaderboards')
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            return super().save_model(request, obj, form, change)
+        # Leave the read-only counters out, so the values loaded with the form
+        # don't overwrite ones written since.
+        readonly = set(self.get_readonly_fields(request, obj))
+        obj.save(update_fields=[
+            field.name for field in Post._meta.concrete_fields if not field.primary_key and field.name not in readonly
+        ])
+
+    def get_queryset(self, request):
+        # Correlated subqueries are only evaluated for the rows on the page,
+        # unlike a JOIN + GROUP BY over every donation.
+        donations = Donation.objects.filter(post=OuterRef('pk')).order_by().values('post')
+        return super().get_queryset(request).annotate(
+            donated=Coalesce(
+                Subquery(donations.annotate(total=Sum('amount')).values('total')),
+                Value(0), output_field=DecimalField(max_digits=14, decimal_places=2),
+            ) + F('archived_donation_total'),
+            donation_count=Coalesce(
+                Subquery(donations.annotate(n=Count('id')).values('n')), Value(0),
+            ) + F('archived_donation_count'),
+        )
+
+    @admin.display(description='Donated')
+    def donated(self, obj):
+        return obj.donated
+
+    @admin.display(description='Donations')
+    def donation_count(self, obj):
+        return obj.donation_count
+
+    @admin.action(description='Cancel selected campaigns')
+    def cancel_campaigns(self, request, queryset):
+        # update() sends no post_save, so the work of the signal receivers
+        # for a canceled post is done here.
+        canceled = 0
+        for ids in chunked_ids(queryset.filter(is_canceled=False)):
+            with transaction.atomic():
+                ids = list(
+                    Post.objects.select_for_update().filter(pk__in=ids, is_canceled=False).values_list('pk', flat=True)
+                )
+                canceled += Post.objects.filter(pk__in=ids).update(is_canceled=True)
+                similarity.remove_posts(ids)
+                transaction.on_commit(typeahead.invalidate)
+        self.message_user(request, f"Canceled {canceled} campaign(s).", messages.SUCCESS)
+
+    @admin.action(description='Recompute donor leaderboards of selected campaigns')
+    def recompute_leaderboards(self, request, queryset):
+        rebuilt = 0
+        for ids in chunked_ids(queryset):
+            rebuilt += leaderboards.rebuild_post_leaderboards(ids)
+        self.message_user(request, f"Rebuilt {rebuilt} leaderboard row(s).", messages.SUCCESS)
+
+
+@admin.register(Donation)
+class DonationAdmin(LargeTableAdmin):
+    list_display = ('id', 'post', 'user', 'amount', 'created_at')
+    list_select_related = ('post', 'user')
+    search_fields = ('=id', '=post__id', '=user__email')
+    raw_id_fields = ('post', 'user')
+    ordering = ('-id',)
+
+    # Donations feed the leaderboards, so admin edits keep them in step the
+    # same way the API does.
+    def save_model(self, request, obj, form, change):
+        previous = Donation.objects.filter(pk=obj.pk).first() if change else None
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            if previous is not None:
+                leaderboards.record_donations([previous], sign=-1)
+            leaderboards.record_donations([obj])
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            leaderboards.record_donations([obj], sign=-1)
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        for ids in chunked_ids(queryset):
+            with transaction.atomic():
+                chunk = list(Donation.objects.filter(pk__in=ids))
+                leaderboards.record_donations(chunk, sign=-1)
+                Donation.objects.filter(pk__in=ids).delete()
+
+
+@admin.register(Comment)
+class CommentAdmin(LargeTableAdmin):
+    list_display = ('id', 'post', 'user', 'excerpt', 'parent_id', 'created_at')
+    list_select_related = ('post', 'user')
+    search_fields = ('=id', '=post__id', '=user__email')
+    raw_id_fields = ('post', 'user', 'parent')
+    ordering = ('-id',)
+
+    @admin.display(description='Content')
+    def excerpt(self, obj):
+        return obj.content[:80]
+
+
+@admin.register(Rating)
+class RatingAdmin(LargeTableAdmin):
+    list_display = ('id', 'post', 'user', 'value', 'created_at')
+    list_select_related = ('post', 'user')
+    list_filter = ('value',)
+    search_fields = ('=id', '=post__id', '=user__email')
+    raw_id_fields = ('post', 'user')
+    ordering = ('-id',)
+
+
+@admin.register(PostImage)
+class PostImageAdmin(LargeTableAdmin):
+    list_display = ('id', 'post', 'image')
+    list_select_related = ('post',)
+    search_fields = ('=id', '=post__id')
+    raw_id_fields = ('post',)
+    ordering = ('-id',)
+
+
+@admin.register(DigestPreference)
+class DigestPreferenceAdmin(LargeTableAdmin):
+    list_display = ('user', 'frequency', 'last_sent_at')
+    list_select_related = ('user',)
+    list_filter = ('frequency',)
+    raw_id_fields = ('user',)
+    ordering = ('-id',)
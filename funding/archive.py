@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import (
+    ArchivedComment, ArchivedDonation, ArchivedRating, Comment, Donation, Post, Rating,
+)
+
+
+def archivable_posts(age=None):
+    """Campaigns that ended (or were canceled) more than `age` ago and are not fully archived."""
+    cutoff = timezone.now() - (age or settings.ARCHIVE_AFTER)
+    return Post.objects.filter(
+        Q(end_time__lt=cutoff) | Q(end_time__isnull=True, is_canceled=True, created_at__lt=cutoff),
+        archived_at__isnull=True,
+    ).order_by('id')
+
+
+def _move_chunks(post, queryset, archive_model, copy, counters, chunk_size):
+    """
+    Move rows to their archive table one chunk per transaction: copy, delete
+    and bump the post's counters together, so an interrupted run can simply
+    be started again.
+    """
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(queryset[:chunk_size])
+            if not rows:
+                return moved
+            archive_model.objects.bulk_create([copy(row) for row in rows])
+            queryset.model.objects.filter(pk__in=[row.pk for row in rows]).delete()
+            Post.objects.filter(pk=post.pk).update(**counters(rows))
+            moved += len(rows)
+
+
+def archive_post(post, chunk_size=None):
+    """Move a campaign's donations, comments and ratings into the archive tables."""
+    chunk_size = chunk_size or settings.ARCHIVE_CHUNK_SIZE
+    moved = {}
+    moved['donations'] = _move_chunks(
+        post, Donation.objects.filter(post=post).order_by('id'), ArchivedDonation,
+        lambda d: ArchivedDonation(
+            id=d.id, user_id=d.user_id, post_id=d.post_id, amount=d.amount, message=d.message, created_at=d.created_at,
+        ),
+        lambda rows: {
+            'archived_donation_total': F('archived_donation_total') + sum(row.amount for row in rows),
+            'archived_donation_count': F('archived_donation_count') + len(rows),
+        },
+        chunk_size,
+    )
+    # Newest first: replies always have higher ids than their parent, so they
+    # leave before the parent's delete could cascade to them.
+    moved['comments'] = _move_chunks(
+        post, Comment.objects.filter(post=post).order_by('-id'), ArchivedComment,
+        lambda c: ArchivedComment(
+            id=c.id, user_id=c.user_id, post_id=c.post_id, parent_id=c.parent_id, content=c.content, created_at=c.created_at,
+        ),
+        lambda rows: {'archived_comment_count': F('archived_comment_count') + len(rows)},
+        chunk_size,
+    )
+    moved['ratings'] = _move_chunks(
+        post, Rating.objects.filter(post=post).order_by('id'), ArchivedRating,
+        lambda r: ArchivedRating(id=r.id, user_id=r.user_id, post_id=r.post_id, value=r.value, created_at=r.created_at),
+        lambda rows: {
+            'archived_rating_count': F('archived_rating_count') + len(rows),
+            'archived_rating_sum': F('archived_rating_sum') + sum(row.value for row in rows),
+        },
+        chunk_size,
+    )
+    Post.objects.filter(pk=post.pk).update(archived_at=timezone.now())
+    return moved
+
+
+def merge_by_created(*querysets):
+    return sorted((row for queryset in querysets for row in queryset), key=lambda row: (row.created_at, row.pk))
@@ -0,0 +1,117 @@
+import atexit
+import logging
+import secrets
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import F
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+KEY = 'post-views:{}'
+LOCK_KEY = 'post-views:flush-lock'
+
+# Views counted by this process and not yet handed to the shared cache.
+_buffer = Counter()
+# Posts this process has handed to the cache, to be written to the database.
+_pending_ids = set()
+_lock = threading.Lock()
+_flusher = None
+
+
+def record_view(post_id):
+    global _flusher
+    with _lock:
+        _buffer[post_id] += 1
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_run, name='view-counter', daemon=True)
+            _flusher.start()
+
+
+def _push():
+    """Move this process's buffered views into the shared per-post counters."""
+    with _lock:
+        counts = dict(_buffer)
+        _buffer.clear()
+        _pending_ids.update(counts)
+    for post_id, count in counts.items():
+        key = KEY.format(post_id)
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            # Evicted between add and incr.
+            cache.add(key, count, None)
+
+
+def flush(post_ids=None):
+    """
+    Write the shared pending counts to the database as `views = views + n`,
+    one UPDATE per post in a single transaction. Only one process flushes at
+    a time; pending counts are reduced by what was written, so views added
+    meanwhile are kept for the next flush. Returns the number of views written,
+    or None when another process holds the flush lock.
+    """
+    _push()
+    if post_ids is None:
+        with _lock:
+            post_ids = set(_pending_ids)
+            _pending_ids.clear()
+    if not post_ids:
+        return 0
+    token = secrets.token_hex(16)
+    if not cache.add(LOCK_KEY, token, settings.VIEW_FLUSH_LOCK_TIMEOUT):
+        # Another process is flushing; our posts wait for the next round.
+        with _lock:
+            _pending_ids.update(post_ids)
+        return None
+    try:
+        keys = {KEY.format(post_id): post_id for post_id in post_ids}
+        counts = {keys[key]: count for key, count in cache.get_many(list(keys)).items() if count > 0}
+        with transaction.atomic():
+            for post_id, count in counts.items():
+                Post.objects.filter(pk=post_id).update(views=F('views') + count)
+        for post_id, count in counts.items():
+            cache.decr(KEY.format(post_id), count)
+        return sum(counts.values())
+    except Exception:
+        with _lock:
+            _pending_ids.update(post_ids)
+        raise
+    finally:
+        # A flush that outlived the lock's timeout must not release the lock
+        # another process has taken since.
+        if cache.get(LOCK_KEY) == token:
+            cache.delete(LOCK_KEY)
+
+
+def pending(post_id):
+    """Views of `post_id` counted but not written to the database yet."""
+    with _lock:
+        local = _buffer[post_id] if post_id in _buffer else 0
+    return local + max(cache.get(KEY.format(post_id), 0), 0)
+
+
+def _run():
+    while True:
+        time.sleep(settings.VIEW_FLUSH_INTERVAL)
+        close_old_connections()
+        try:
+            flush()
+        except Exception:
+            logger.exception("Flushing post view counts failed")
+
+
+@atexit.register
+def _flush_at_exit():
+    if _buffer or _pending_ids:
+        try:
+            flush()
+        except Exception:
+            logger.exception("Flushing post view counts at exit failed")
@@ -0,0 +1,137 @@
+from contextlib import nullcontext
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .models import DigestPreference, Donation
+
+WINDOWS = {
+    DigestPreference.FREQUENCY_HOURLY: timedelta(hours=1),
+    DigestPreference.FREQUENCY_DAILY: timedelta(days=1),
+    DigestPreference.FREQUENCY_WEEKLY: timedelta(days=7),
+}
+# Scheduler jitter: a daily digest sent at 09:01 is due again at 08:56 the next day.
+SLACK = timedelta(minutes=5)
+
+
+def unreported_donations(now):
+    """Donations each author has not had a digest for yet, grouped by author."""
+    watermark = DigestPreference.objects.filter(user=OuterRef('post__author')).values('last_donation_id')
+    return (
+        Donation.objects.filter(created_at__gte=now - settings.DIGEST_LOOKBACK)
+        .exclude(post__author__digest_preference__frequency=DigestPreference.FREQUENCY_OFF)
+        .annotate(watermark=Coalesce(Subquery(watermark), Value(0)))
+        .filter(id__gt=F('watermark'))
+        .select_related('user', 'post__author')
+        .order_by('post__author_id', 'id')
+    )
+
+
+def is_due(preference, now):
+    frequency = preference.frequency if preference else settings.DIGEST_DEFAULT_FREQUENCY
+    if frequency not in WINDOWS:
+        return False
+    return preference is None or preference.last_sent_at is None or now - preference.last_sent_at >= WINDOWS[frequency] - SLACK
+
+
+def build_digest(author, donations, frequency):
+    campaigns = {}
+    for donation in donations:
+        campaign = campaigns.setdefault(donation.post_id, {'post': donation.post, 'count': 0, 'total': 0, 'recent': []})
+        campaign['count'] += 1
+        campaign['total'] += donation.amount
+        campaign['recent'].append(donation)
+    for campaign in campaigns.values():
+        campaign['recent'] = campaign['recent'][::-1][:settings.DIGEST_MAX_DONATIONS]
+        campaign['more'] = campaign['count'] - len(campaign['recent'])
+
+    count = len(donations)
+    context = {
+        'user': author,
+        'frequency': frequency,
+        'campaigns': sorted(campaigns.values(), key=lambda campaign: -campaign['total']),
+        'donation_count': count,
+        'donation_total': sum(donation.amount for donation in donations),
+        'support_email': 'support@rafiq.com',
+    }
+    html_content = render_to_string('emails/donation_digest.html', context)
+    email = EmailMultiAlternatives(
+        f"You received {count} new donation{'s' if count != 1 else ''} on Rafiq",
+        strip_tags(html_content),
+        settings.DEFAULT_FROM_EMAIL,
+        [author.email],
+        reply_to=[settings.EMAIL_HOST_USER],
+    )
+    email.attach_alternative(html_content, "text/html")
+    email.extra_headers = {'X-MC-Tags': 'donation-digest'}
+    return email
+
+
+def _record(batch, preferences, now):
+    existing, created = [], []
+    for author, donations in batch:
+        preference = preferences.get(author.pk)
+        if preference is None:
+            created.append(DigestPreference(
+                user=author, frequency=settings.DIGEST_DEFAULT_FREQUENCY,
+                last_donation_id=donations[-1].pk, last_sent_at=now,
+            ))
+        else:
+            preference.last_donation_id = donations[-1].pk
+            preference.last_sent_at = now
+            existing.append(preference)
+    DigestPreference.objects.bulk_update(existing, ['last_donation_id', 'last_sent_at'])
+    # Upsert: the author may have saved a preference since it was read.
+    DigestPreference.objects.bulk_create(
+        created, update_conflicts=True, unique_fields=['user'], update_fields=['last_donation_id', 'last_sent_at'],
+    )
+
+
+def send_digests(now=None, dry_run=False):
+    """
+    Send one email per author whose digest window has passed, covering the
+    donations since their last digest. All messages of a run go through one
+    connection, in batches of DIGEST_BATCH_SIZE; an author's watermark only
+    moves once their batch was handed to the mail server, so a failed run
+    is simply repeated. Returns the number of digests sent.
+    """
+    now = now or timezone.now()
+    by_author = groupby(unreported_donations(now).iterator(chunk_size=2000), key=lambda donation: donation.post.author)
+    sent = 0
+    with nullcontext() if dry_run else get_connection() as connection:
+        batch = []
+        for author, donations in by_author:
+            batch.append((author, list(donations)))
+            if len(batch) == settings.DIGEST_BATCH_SIZE:
+                sent += _send_batch(connection, batch, now, dry_run)
+                batch = []
+        if batch:
+            sent += _send_batch(connection, batch, now, dry_run)
+    return sent
+
+
+def _send_batch(connection, batch, now, dry_run):
+    preferences = {
+        preference.user_id: preference
+        for preference in DigestPreference.objects.filter(user__in=[author.pk for author, _ in batch])
+    }
+    due = [(author, donations) for author, donations in batch if is_due(preferences.get(author.pk), now)]
+    if not due or dry_run:
+        return len(due)
+    messages = [
+        build_digest(
+            author, donations,
+            preferences[author.pk].frequency if author.pk in preferences else settings.DIGEST_DEFAULT_FREQUENCY,
+        )
+        for author, donations in due
+    ]
+    connection.send_messages(messages)
+    _record(due, preferences, now)
+    return len(due)
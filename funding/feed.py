@@ -0,0 +1,172 @@
+import logging
+import queue
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import CampaignEvent, Donation, Post, Rating, TimelineEntry
+
+logger = logging.getLogger(__name__)
+
+MILESTONES = (25, 50, 75, 100)
+INSERT_BATCH = 1000
+PRUNE_INTERVAL = 60 * 60
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+_last_prune = None
+
+
+def followers(post_id, limit):
+    """Users who donated to or rated the post, at most `limit + 1` of them."""
+    donors = set(
+        Donation.objects.filter(post_id=post_id, user__isnull=False)
+        .values_list('user_id', flat=True).distinct()[:limit + 1]
+    )
+    raters = set(
+        Rating.objects.filter(post_id=post_id).values_list('user_id', flat=True)[:limit + 1]
+    )
+    return donors | raters
+
+
+def fan_out(event):
+    """
+    Copy an event into its followers' timelines, or leave it to be pulled at
+    read time when the campaign has more than FEED_FANOUT_LIMIT followers.
+    """
+    user_ids = followers(event.post_id, settings.FEED_FANOUT_LIMIT)
+    user_ids.discard(event.actor_id)
+
+    if len(user_ids) > settings.FEED_FANOUT_LIMIT:
+        CampaignEvent.objects.filter(pk=event.pk).update(fanout=CampaignEvent.FANOUT_PULL)
+        return
+
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), INSERT_BATCH):
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=user_id, event_id=event.pk) for user_id in user_ids[start:start + INSERT_BATCH]],
+            ignore_conflicts=True,
+        )
+    CampaignEvent.objects.filter(pk=event.pk).update(fanout=CampaignEvent.FANOUT_DONE)
+
+
+def check_milestones(post_id, donation_id, amount):
+    post = Post.objects.filter(pk=post_id).only('id', 'author_id', 'target_amount', 'archived_donation_total').first()
+    if post is None or not post.target_amount:
+        return
+    # The running total as of this donation, not whatever has committed by
+    # the time the worker gets here; otherwise a burst of donations all see
+    # the final total and the milestones crossed in between are skipped.
+    live = post.donations.filter(id__lte=donation_id).aggregate(total=Sum('amount'))['total']
+    total = (live or Decimal('0')) + post.archived_donation_total
+    before = (total - Decimal(amount)) * 100 / post.target_amount
+    after = total * 100 / post.target_amount
+
+    for percent in MILESTONES:
+        if before < percent <= after:
+            try:
+                with transaction.atomic():
+                    event = CampaignEvent.objects.create(
+                        post_id=post_id, verb=CampaignEvent.VERB_MILESTONE,
+                        actor_id=post.author_id, object_id=percent, data={'percent': percent},
+                    )
+            except IntegrityError:
+                continue  # Another process already recorded this milestone.
+            fan_out(event)
+
+
+def prune(retention=None):
+    """Delete feed events (and their timeline rows) older than the retention window."""
+    cutoff = timezone.now() - (retention or settings.FEED_RETENTION)
+    deleted = 0
+    while True:
+        ids = list(CampaignEvent.objects.filter(created_at__lt=cutoff).values_list('id', flat=True)[:INSERT_BATCH])
+        if not ids:
+            return deleted
+        TimelineEntry.objects.filter(event_id__in=ids).delete()
+        CampaignEvent.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+
+
+def _maybe_prune():
+    global _last_prune
+    now = time.monotonic()
+    if _last_prune is None or now - _last_prune > PRUNE_INTERVAL:
+        _last_prune = now
+        prune()
+
+
+def _run():
+    while True:
+        job, args = _queue.get()
+        close_old_connections()
+        try:
+            if job == 'fan_out':
+                event = CampaignEvent.objects.filter(pk=args[0], fanout=CampaignEvent.FANOUT_PENDING).first()
+                if event is not None:
+                    fan_out(event)
+            elif job == 'donation':
+                check_milestones(*args)
+            _maybe_prune()
+        except Exception:
+            logger.exception("Feed job %s%r failed", job, args)
+        finally:
+            _queue.task_done()
+
+
+def _enqueue(job, *args):
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name='feed-fanout', daemon=True)
+            _worker.start()
+    _queue.put((job, args))
+
+
+def publish(post_id, verb, actor_id=None, object_id=None, data=None):
+    """
+    Record a campaign event in the current transaction and hand it to the
+    fan-out worker once that transaction commits. Until then (or if the
+    worker dies) the event is still served to followers by the pull path.
+    """
+    event = CampaignEvent.objects.create(
+        post_id=post_id, verb=verb, actor_id=actor_id, object_id=object_id, data=data or {},
+    )
+    transaction.on_commit(lambda: _enqueue('fan_out', event.pk))
+    return event
+
+
+def donation_created(donation):
+    transaction.on_commit(lambda: _enqueue('donation', donation.post_id, donation.pk, donation.amount))
+
+
+def feed_for(user, before=None, limit=20):
+    """
+    Newest-first events for `user`, keyset-paginated on event id: the
+    user's materialized timeline merged with events of followed campaigns
+    that were not fanned out.
+    """
+    pushed = TimelineEntry.objects.filter(user=user)
+    if before is not None:
+        pushed = pushed.filter(event_id__lt=before)
+    event_ids = set(pushed.order_by('-event_id').values_list('event_id', flat=True)[:limit])
+
+    followed = Donation.objects.filter(user=user).values('post_id').union(
+        Rating.objects.filter(user=user).values('post_id')
+    )
+    pulled = CampaignEvent.objects.exclude(fanout=CampaignEvent.FANOUT_DONE).filter(
+        post_id__in=[row['post_id'] for row in followed]
+    ).exclude(actor=user)
+    if before is not None:
+        pulled = pulled.filter(id__lt=before)
+    event_ids.update(pulled.order_by('-id').values_list('id', flat=True)[:limit])
+
+    page = sorted(event_ids, reverse=True)[:limit]
+    events = CampaignEvent.objects.filter(id__in=page).select_related('post', 'actor').order_by('-id')
+    return list(events)
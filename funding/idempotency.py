@@ -0,0 +1,145 @@
+import hashlib
+import json
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+PRUNE_BATCH = 1000
+
+
+def fingerprint(request):
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    payload = json.dumps([request.method, request.path, data], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _claim(user, key, digest):
+    """
+    Take the key for this request. Returns `(record, owned)`: owned is True
+    when the caller must do the work, otherwise `record` is the existing row.
+    """
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                user=user, key=key, fingerprint=digest, locked_at=now,
+                expires_at=now + settings.IDEMPOTENCY_KEY_TTL,
+            )
+        return record, True
+    except IntegrityError:
+        pass
+
+    record = IdempotencyKey.objects.filter(user=user, key=key).first()
+    if record is None:
+        return _claim(user, key, digest)
+
+    if record.expires_at <= now:
+        # An expired key is as good as unused.
+        IdempotencyKey.objects.filter(pk=record.pk, expires_at__lte=now).delete()
+        return _claim(user, key, digest)
+
+    if record.status_code is None and record.fingerprint == digest and record.locked_at <= now - settings.IDEMPOTENCY_LOCK_TIMEOUT:
+        # The request holding the key died before finishing; nothing it did
+        # was committed, so the work can be redone.
+        taken = IdempotencyKey.objects.filter(
+            pk=record.pk, status_code__isnull=True, locked_at=record.locked_at,
+        ).update(locked_at=now)
+        if taken:
+            record.locked_at = now
+            return record, True
+    return record, False
+
+
+def replay(record):
+    response = Response(record.response, status=record.status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def run(request, key, handler, atomic=True):
+    """
+    Run `handler` at most once per (user, Idempotency-Key). The first
+    successful response is stored with the key and returned to retries;
+    a retry that arrives while the first request is still running gets 409.
+
+    Pass `atomic=False` when the handler commits its write on another
+    connection; the response is then stored right after it returns. If the
+    handler raises an exception with `when_done(callback)`, its write may
+    still commit later: the key stays locked and the outcome is stored (or
+    the key released) once it is known.
+    """
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return Response(
+            {'detail': f'{HEADER} must be between 1 and {MAX_KEY_LENGTH} characters.'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    digest = fingerprint(request)
+    record, owned = _claim(request.user, key, digest)
+    if not owned:
+        if record.fingerprint != digest:
+            return Response(
+                {'detail': f'{HEADER} was already used for a different request.'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        if record.status_code is not None:
+            return replay(record)
+        response = Response(
+            {'detail': 'A request with this key is still being processed.'}, status=status.HTTP_409_CONFLICT,
+        )
+        response['Retry-After'] = '1'
+        return response
+
+    try:
+        # The write and the stored response commit together, so a key is
+        # either unused or tied to exactly one donation.
+        with transaction.atomic() if atomic else nullcontext():
+            response = handler()
+            if status.is_success(response.status_code):
+                IdempotencyKey.objects.filter(pk=record.pk).update(
+                    status_code=response.status_code, response=response.data,
+                )
+                return response
+    except BaseException as exc:
+        if hasattr(exc, 'when_done'):
+            _hold(record, exc)
+        else:
+            IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True).delete()
+        raise
+    IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True).delete()
+    return response
+
+
+def _hold(record, pending):
+    # Locked until expiry so the stale-lock takeover in _claim cannot redo work that may still commit.
+    IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True).update(locked_at=record.expires_at)
+
+    def finish(status_code=None, data=None):
+        unfinished = IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True)
+        if status_code is None:
+            unfinished.delete()
+        else:
+            unfinished.update(status_code=status_code, response=data)
+
+    pending.when_done(finish)
+
+
+def prune():
+    deleted = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(expires_at__lt=timezone.now()).values_list('id', flat=True)[:PRUNE_BATCH]
+        )
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,148 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from rest_framework.exceptions import APIException
+
+from . import feed, leaderboards, progress
+from .models import Donation
+
+logger = logging.getLogger(__name__)
+
+
+class CommitTimeout(APIException):
+    """
+    The donation is still queued and may yet be saved. `when_done` lets the
+    idempotency layer record its outcome, so a retry with the same key gets
+    the original result instead of creating a second donation.
+    """
+    status_code = 503
+    default_detail = (
+        'The donation is still being processed. Retry with the same Idempotency-Key to get its result.'
+    )
+    default_code = 'commit_timeout'
+
+    def __init__(self, future, render=None):
+        super().__init__()
+        self.future = future
+        self.render = render
+
+    def when_done(self, callback):
+        def done(future):
+            try:
+                if future.exception() is not None:
+                    callback()
+                else:
+                    donation = future.result()
+                    callback(201, self.render(donation) if self.render else {'id': donation.pk})
+            except Exception:
+                logger.exception("Recording the outcome of a delayed donation failed")
+            finally:
+                close_old_connections()
+
+        self.future.add_done_callback(done)
+
+
+_queue = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def enabled():
+    return settings.DONATION_GROUP_COMMIT
+
+
+def _write(donations):
+    """Everything perform_create does for a donation, for a whole batch in one transaction."""
+    with transaction.atomic():
+        Donation.objects.bulk_create(donations)
+        leaderboards.record_donations(donations)
+        for donation in donations:
+            feed.donation_created(donation)
+        for post_id in {donation.post_id for donation in donations}:
+            progress.donation_changed(post_id)
+
+
+def _commit(batch):
+    try:
+        _write([donation for donation, _ in batch])
+    except Exception:
+        if len(batch) == 1:
+            raise
+        # Retry one by one so a single bad row only fails its own request.
+        logger.warning("Group commit of %d donations failed; retrying individually", len(batch), exc_info=True)
+        for donation, future in batch:
+            donation.pk = None
+            try:
+                _write([donation])
+            except Exception as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(donation)
+        return
+    for donation, future in batch:
+        future.set_result(donation)
+
+
+def _collect():
+    batch = [_queue.get()]
+    deadline = time.monotonic() + settings.DONATION_BATCH_WAIT
+    while len(batch) < settings.DONATION_BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    # Anything that queued up while we waited goes in too.
+    while len(batch) < settings.DONATION_BATCH_SIZE:
+        try:
+            batch.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _run():
+    while True:
+        batch = _collect()
+        close_old_connections()
+        try:
+            _commit(batch)
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            connection.close_if_unusable_or_obsolete()
+        finally:
+            for _ in batch:
+                _queue.task_done()
+
+
+def submit(donation):
+    """
+    Queue a validated, unsaved donation for the writer thread and return a
+    future that resolves to the saved donation once its batch has committed.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_run, name='donation-writer', daemon=True)
+            _writer.start()
+    future = Future()
+    _queue.put((donation, future))
+    return future
+
+
+def save(donation, render=None):
+    """Save through the writer; `render(donation)` builds the response data if the commit is late."""
+    future = submit(donation)
+    try:
+        return future.result(timeout=settings.DONATION_COMMIT_TIMEOUT)
+    except TimeoutError:
+        raise CommitTimeout(future, render)
@@ -0,0 +1,178 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import Greatest, TruncMonth
+
+from .models import ArchivedDonation, Donation, DonorLeaderboardEntry
+
+GLOBAL = 'global'
+ALL_TIME = 'all'
+ANONYMOUS = 'anonymous'
+MAX_LIMIT = 100
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def month_period(moment):
+    return moment.strftime('%Y-%m')
+
+
+def donor_key(user_id):
+    return f'user:{user_id}' if user_id is not None else ANONYMOUS
+
+
+def _entry_keys(post_id, user_id, created_at):
+    key = donor_key(user_id)
+    for scope in (GLOBAL, post_scope(post_id)):
+        for period in (ALL_TIME, month_period(created_at)):
+            yield scope, period, key
+
+
+def record_donations(donations, sign=1):
+    """
+    Apply donations to the leaderboards. Must run inside the transaction that
+    writes the donations; pass `sign=-1` to take them back out.
+
+    Deltas are merged per leaderboard row first, so a batch touches each row once.
+    """
+    deltas = defaultdict(lambda: [Decimal('0'), 0, None, None])
+    for donation in donations:
+        for key in _entry_keys(donation.post_id, donation.user_id, donation.created_at):
+            delta = deltas[key]
+            delta[0] += sign * Decimal(donation.amount)
+            delta[1] += sign
+            delta[2] = donation.user_id
+            if delta[3] is None or donation.created_at > delta[3]:
+                delta[3] = donation.created_at
+
+    for (scope, period, key), (amount, count, user_id, last_at) in deltas.items():
+        rows = DonorLeaderboardEntry.objects.filter(scope=scope, period=period, donor_key=key)
+        changes = {'total': F('total') + amount, 'donation_count': F('donation_count') + count}
+        if sign > 0:
+            changes['last_donated_at'] = Greatest(F('last_donated_at'), last_at)
+        if sign < 0:
+            rows.update(**changes)
+            rows.filter(donation_count__lte=0).delete()
+            continue
+        if rows.update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                DonorLeaderboardEntry.objects.create(
+                    scope=scope, period=period, donor_key=key, user_id=user_id,
+                    total=amount, donation_count=count, last_donated_at=last_at,
+                )
+        except IntegrityError:
+            rows.update(**changes)
+
+
+def forget_post(post_id):
+    """Take a deleted post's donations, live and archived, out of the leaderboards."""
+    for model in (Donation, ArchivedDonation):
+        record_donations(list(model.objects.filter(post_id=post_id)), sign=-1)
+    DonorLeaderboardEntry.objects.filter(scope=post_scope(post_id)).delete()
+
+
+def forget_donor(user_id):
+    """
+    Move a deleted user's donations to the anonymous donor, as SET_NULL does
+    to the rows. Donations to the user's own posts go with those posts.
+    """
+    for model in (Donation, ArchivedDonation):
+        donations = list(model.objects.filter(user_id=user_id).exclude(post__author_id=user_id))
+        record_donations(donations, sign=-1)
+        for donation in donations:
+            donation.user_id = None
+        record_donations(donations)
+
+
+def top_donors(scope, period=ALL_TIME, limit=10):
+    # Served straight off the (scope, period, -total) index.
+    return (
+        DonorLeaderboardEntry.objects.filter(scope=scope, period=period)
+        .select_related('user').order_by('-total', 'id')[:min(limit, MAX_LIMIT)]
+    )
+
+
+def expected_entries(post_ids=None):
+    """Recompute every leaderboard row from the raw donations, live and archived."""
+    expected = {}
+    for model in (Donation, ArchivedDonation):
+        donations = model.objects.all() if post_ids is None else model.objects.filter(post_id__in=post_ids)
+        rows = (
+            donations.annotate(month=TruncMonth('created_at'))
+            .values('post_id', 'user_id', 'month')
+            .annotate(total=Sum('amount'), count=Count('id'), last=Max('created_at'))
+            .order_by()
+        )
+        for row in rows.iterator(chunk_size=5000):
+            for key in _entry_keys(row['post_id'], row['user_id'], row['month']):
+                entry = expected.setdefault(key, [Decimal('0'), 0, row['user_id'], None])
+                entry[0] += Decimal(row['total'])
+                entry[1] += row['count']
+                if entry[3] is None or row['last'] > entry[3]:
+                    entry[3] = row['last']
+    return expected
+
+
+def rebuild_leaderboards(fix=False):
+    """
+    Compare the leaderboard tables with the raw donations. Returns a list of
+    `(scope, period, donor_key, stored, expected)` mismatches; with `fix=True`
+    the tables are replaced by the recomputed rows.
+    """
+    expected = expected_entries()
+    stored = {
+        (row.scope, row.period, row.donor_key): (row.total, row.donation_count)
+        for row in DonorLeaderboardEntry.objects.iterator(chunk_size=5000)
+    }
+
+    mismatches = []
+    for key in sorted(expected.keys() | stored.keys()):
+        want = expected.get(key)
+        want = (want[0], want[1]) if want else None
+        have = stored.get(key)
+        if have is None or want is None or have[0] != want[0] or have[1] != want[1]:
+            mismatches.append((*key, have, want))
+
+    if fix and mismatches:
+        with transaction.atomic():
+            DonorLeaderboardEntry.objects.all().delete()
+            DonorLeaderboardEntry.objects.bulk_create(
+                (
+                    DonorLeaderboardEntry(
+                        scope=scope, period=period, donor_key=key, user_id=user_id,
+                        total=total, donation_count=count, last_donated_at=last_at,
+                    )
+                    for (scope, period, key), (total, count, user_id, last_at) in expected.items()
+                ),
+                batch_size=2000,
+            )
+    return mismatches
+
+
+def rebuild_post_leaderboards(post_ids):
+    """
+    Recompute the per-post leaderboards of `post_ids` from their donations.
+    The global boards are left alone; `rebuild_leaderboards` covers those.
+    """
+    scopes = {post_scope(post_id) for post_id in post_ids}
+    expected = expected_entries(post_ids)
+    with transaction.atomic():
+        DonorLeaderboardEntry.objects.filter(scope__in=scopes).delete()
+        rows = DonorLeaderboardEntry.objects.bulk_create(
+            (
+                DonorLeaderboardEntry(
+                    scope=scope, period=period, donor_key=key, user_id=user_id,
+                    total=total, donation_count=count, last_donated_at=last_at,
+                )
+                for (scope, period, key), (total, count, user_id, last_at) in expected.items()
+                if scope in scopes
+            ),
+            batch_size=2000,
+        )
+    return len(rows)
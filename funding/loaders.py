@@ -0,0 +1,109 @@
+from collections import defaultdict
+
+from django.db.models import Avg, Count, Sum, prefetch_related_objects
+
+from .models import ArchivedComment, ArchivedDonation, Comment, Donation, Post, Rating
+
+CONTEXT_KEY = 'post_loader'
+
+
+class PostLoader:
+    """
+    Request-scoped loader for full post representations. Ids are collected
+    with `load()` and resolved together on first use with one query per
+    relation, however many posts were asked for; PostSerializer reads
+    comments, donations and aggregates from it instead of querying per post.
+    """
+
+    def __init__(self):
+        self._pending = []
+        self._posts = {}
+        self._missing = set()
+        self._comments = defaultdict(list)
+        self._replies = defaultdict(list)
+        self._donations = defaultdict(list)
+        self._ratings = {}
+
+    def load(self, ids):
+        self._pending.extend(
+            post_id for post_id in ids if post_id not in self._posts and post_id not in self._missing
+        )
+
+    def get_many(self, ids):
+        """Posts in the order of `ids` (first occurrence wins) and the ids that do not exist."""
+        self.load(ids)
+        self.dispatch()
+        found, missing = [], []
+        for post_id in dict.fromkeys(ids):
+            if post_id in self._posts:
+                found.append(self._posts[post_id])
+            else:
+                missing.append(post_id)
+        return found, missing
+
+    def dispatch(self):
+        ids = set(self._pending)
+        self._pending = []
+        if not ids:
+            return
+        posts = list(Post.objects.filter(pk__in=ids).select_related('author', 'category'))
+        prefetch_related_objects(posts, 'tags', 'images')
+        by_id = {post.pk: post for post in posts}
+        self._posts.update(by_id)
+        self._missing.update(ids - by_id.keys())
+        if not posts:
+            return
+
+        archived = [post.pk for post in posts if post.archived_comment_count or post.archived_donation_count]
+        comments = list(Comment.objects.filter(post_id__in=by_id))
+        if archived:
+            comments += ArchivedComment.objects.filter(post_id__in=archived)
+        for comment in sorted(comments, key=lambda comment: (comment.created_at, comment.pk)):
+            if comment.parent_id is None:
+                self._comments[comment.post_id].append(comment)
+            else:
+                self._replies[type(comment), comment.parent_id].append(comment)
+        # Archived donations come first, as on the detail endpoint.
+        if archived:
+            self._load_donations(ArchivedDonation.objects.filter(post_id__in=archived), by_id)
+        self._load_donations(Donation.objects.filter(post_id__in=by_id), by_id)
+
+        self._ratings.update(
+            (row['post'], row) for row in
+            Rating.objects.filter(post_id__in=by_id).values('post')
+            .annotate(avg=Avg('value'), total=Sum('value'), count=Count('id')).order_by()
+        )
+
+    def _load_donations(self, queryset, posts):
+        for donation in queryset.select_related('user').order_by('id'):
+            donation.post = posts[donation.post_id]
+            self._donations[donation.post_id].append(donation)
+
+    def user_ids(self, posts):
+        ids = [post.author_id for post in posts]
+        for post in posts:
+            for comment in self._comments[post.pk]:
+                ids.append(comment.user_id)
+        ids.extend(reply.user_id for replies in self._replies.values() for reply in replies)
+        return ids
+
+    def comments(self, post):
+        """Top-level comments, oldest first."""
+        return self._comments[post.pk]
+
+    def replies(self, comment):
+        return self._replies[type(comment), comment.pk]
+
+    def donations(self, post):
+        return self._donations[post.pk]
+
+    def current_amount(self, post):
+        live = sum(donation.amount for donation in self._donations[post.pk] if isinstance(donation, Donation)) or 0
+        return live + post.archived_donation_total
+
+    def average_rating(self, post):
+        row = self._ratings.get(post.pk, {'avg': None, 'total': None, 'count': 0})
+        if not post.archived_rating_count:
+            return round(row['avg'], 2) if row['avg'] else 0.00
+        total = (row['total'] or 0) + post.archived_rating_sum
+        return round(total / (row['count'] + post.archived_rating_count), 2)
@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from funding.archive import archivable_posts, archive_post
+
+
+class Command(BaseCommand):
+    help = (
+        "Move donations, comments and ratings of campaigns that ended long ago into the archive "
+        "tables. Each chunk commits on its own, so an interrupted run can just be started again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Archive campaigns that ended more than this many days ago.")
+        parser.add_argument('--chunk-size', type=int)
+        parser.add_argument('--limit', type=int, help="Archive at most this many campaigns.")
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        age = timedelta(days=options['days']) if options['days'] is not None else None
+        posts = archivable_posts(age)
+        if options['limit']:
+            posts = posts[:options['limit']]
+
+        if options['dry_run']:
+            for post in posts:
+                self.stdout.write(f"Would archive post {post.pk} ({post.title})")
+            return
+
+        archived = 0
+        for post in list(posts):
+            moved = archive_post(post, options['chunk_size'])
+            archived += 1
+            self.stdout.write(
+                f"Post {post.pk}: {moved['donations']} donations, {moved['comments']} comments, "
+                f"{moved['ratings']} ratings archived"
+            )
+        self.stdout.write(f"Archived {archived} campaign(s).")
@@ -0,0 +1,55 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from funding.management.commands.bench_renderers import Command as RendererBenchmark
+from project.middleware import CompressedCache, brotli, compress
+from project.renderers import FastJSONRenderer
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure bytes saved and CPU time of gzip and brotli on seeded post, comment and "
+        "donation list payloads, and the cost of a compressed-cache hit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=12)
+        parser.add_argument('--comments', type=int, default=20, help="Comments per post.")
+        parser.add_argument('--donations', type=int, default=50, help="Donations per post.")
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if brotli is None:
+            self.stderr.write("brotli is not installed; only gzip is measured.")
+
+        with transaction.atomic():
+            payloads = RendererBenchmark().seed(options['posts'], options['comments'], options['donations'])
+            transaction.set_rollback(True)
+
+        encodings = ['gzip'] + (['br'] if brotli is not None else [])
+        self.stdout.write(f"{'payload':<10} {'plain KiB':>9} {'coding':<6} {'KiB':>8} {'saved':>7} {'compress ms':>12} {'cached ms':>10}")
+        for name, data in payloads.items():
+            body = FastJSONRenderer().render(data)
+            for encoding in encodings:
+                compressed = compress(body, encoding)
+                seconds = self.time(lambda: compress(body, encoding), options['repeat'])
+                cache = CompressedCache(settings.COMPRESSION_CACHE_BYTES)
+                cache.set((encoding, hashlib.blake2b(body, digest_size=16).digest()), compressed)
+                hit = self.time(
+                    lambda: cache.get((encoding, hashlib.blake2b(body, digest_size=16).digest())), options['repeat'],
+                )
+                self.stdout.write(
+                    f"{name:<10} {len(body) / 1024:9.1f} {encoding:<6} {len(compressed) / 1024:8.1f} "
+                    f"{1 - len(compressed) / len(body):7.1%} {seconds * 1000:12.3f} {hit * 1000:10.3f}"
+                )
+
+    def time(self, func, repeat):
+        func()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - start) / repeat
@@ -0,0 +1,90 @@
+import statistics
+import threading
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from account.models import User
+from funding import feed, ingest, leaderboards, progress
+from funding.models import Donation, Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare one-transaction-per-donation writes with group commit under a burst "
+        "of concurrent donations to one campaign. Writes to the configured database "
+        "and removes the benchmark rows afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=32, help="Concurrent donating threads.")
+        parser.add_argument('--donations', type=int, default=50, help="Donations per client.")
+
+    def handle(self, *args, **options):
+        author, author_created = User.objects.get_or_create(
+            username='bench-author', defaults={'email': 'bench-author@rafiq.local'},
+        )
+        donor, donor_created = User.objects.get_or_create(
+            username='bench-donor', defaults={'email': 'bench-donor@rafiq.local'},
+        )
+        post = None
+        try:
+            post = Post.objects.create(
+                title="Donation benchmark", content="-", author=author, target_amount=Decimal('1000000'),
+            )
+            for name, write in (('per-request', self.write_direct), ('group commit', ingest.save)):
+                self.run(name, write, post, donor, options['clients'], options['donations'])
+        finally:
+            with transaction.atomic():
+                if post is not None:
+                    post.delete()
+                User.objects.filter(
+                    pk__in=[user.pk for user, created in ((author, author_created), (donor, donor_created)) if created],
+                ).delete()
+
+    def write_direct(self, donation):
+        # The same side effects as the group-commit writer, one transaction each.
+        with transaction.atomic():
+            donation.save()
+            leaderboards.record_donations([donation])
+            feed.donation_created(donation)
+            progress.donation_changed(donation.post_id)
+        return donation
+
+    def run(self, name, write, post, donor, clients, per_client):
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def client():
+            own, failed = [], []
+            for _ in range(per_client):
+                start = time.perf_counter()
+                try:
+                    write(Donation(post=post, user=donor, amount=Decimal('10.00')))
+                except Exception as exc:
+                    failed.append(type(exc).__name__)
+                else:
+                    own.append(time.perf_counter() - start)
+            connection.close()
+            with lock:
+                latencies.extend(own)
+                errors.extend(failed)
+
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0
+        self.stdout.write(
+            f"{name:<13} {len(latencies) / elapsed:8.0f} donations/s  "
+            f"p50 {statistics.median(latencies) * 1000 if latencies else 0:7.1f} ms  "
+            f"p99 {p99 * 1000:7.1f} ms  errors {len(errors)}"
+            + (f" ({', '.join(sorted(set(errors)))})" if errors else "")
+        )
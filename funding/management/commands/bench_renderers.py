@@ -0,0 +1,79 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from account.models import User
+from funding.models import Category, Comment, Donation, Post, Tag
+from funding.serializers import CommentSerializer, DonationSerializer, PostSerializer
+from project.renderers import FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    help = "Compare render times of the stdlib and orjson JSON renderers on seeded payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=12)
+        parser.add_argument('--comments', type=int, default=20, help="Comments per post.")
+        parser.add_argument('--donations', type=int, default=50, help="Donations per post.")
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write("orjson is not installed; FastJSONRenderer will use the stdlib fallback.")
+
+        # Seed inside a transaction that is always rolled back.
+        with transaction.atomic():
+            payloads = self.seed(options['posts'], options['comments'], options['donations'])
+            transaction.set_rollback(True)
+
+        for name, data in payloads.items():
+            before = self.time_render(JSONRenderer(), data, options['repeat'])
+            after = self.time_render(FastJSONRenderer(), data, options['repeat'])
+            size = len(FastJSONRenderer().render(data))
+            self.stdout.write(
+                f"{name:<10} {size / 1024:8.1f} KiB  "
+                f"stdlib {before * 1000:8.3f} ms  "
+                f"fast {after * 1000:8.3f} ms  "
+                f"x{before / after:5.1f}"
+            )
+
+    def seed(self, posts, comments, donations):
+        author = User.objects.create(username='bench-author', email='bench-author@rafiq.local')
+        donor = User.objects.create(username='bench-donor', email='bench-donor@rafiq.local')
+        category = Category.objects.create(name='bench-category')
+        tags = [Tag.objects.create(name=f'bench-tag-{i}') for i in range(3)]
+
+        for i in range(posts):
+            post = Post.objects.create(
+                title=f"Campaign {i} — رفيق",
+                content="Help us reach our goal. " * 20,
+                author=author,
+                category=category,
+                target_amount=Decimal('25000.00'),
+            )
+            post.tags.set(tags)
+            Comment.objects.bulk_create(
+                Comment(user=donor, post=post, content=f"Comment {j} on campaign {i}")
+                for j in range(comments)
+            )
+            Donation.objects.bulk_create(
+                Donation(user=donor, post=post, amount=Decimal('12.50') + j, message="Good luck!")
+                for j in range(donations)
+            )
+
+        queryset = Post.objects.filter(author=author).order_by('-created_at')
+        return {
+            'posts': PostSerializer(queryset, many=True).data,
+            'comments': CommentSerializer(Comment.objects.filter(user=donor), many=True).data,
+            'donations': DonationSerializer(Donation.objects.filter(user=donor), many=True).data,
+        }
+
+    def time_render(self, renderer, data, repeat):
+        renderer.render(data)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            renderer.render(data)
+        return (time.perf_counter() - start) / repeat
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from funding.similarity import METRICS, TOP_K, build_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the precomputed similar-campaigns table from post tags and categories."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=TOP_K)
+        parser.add_argument('--metric', choices=METRICS, default='jaccard')
+
+    def handle(self, *args, **options):
+        try:
+            written = build_index(top_k=options['top_k'], metric=options['metric'])
+        except ImportError as exc:
+            raise CommandError(f"build_similarity_index needs numpy and scipy: {exc}")
+        self.stdout.write(f"Wrote {written} neighbour rows.")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from funding.media import dedup_existing_media
+
+
+class Command(BaseCommand):
+    help = "Move existing post images and profile pictures into content-addressed blob storage."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be reclaimed.")
+
+    def handle(self, *args, **options):
+        files, freed = dedup_existing_media(dry_run=options['dry_run'], log=self.stdout.write)
+        verb = "Would free" if options['dry_run'] else "Freed"
+        self.stdout.write(f"Processed {files} file(s). {verb} {freed / 1024:.1f} KiB.")
@@ -0,0 +1,77 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Print cross-campaign reports (funding by category, donation size histogram, time to "
+        "goal) computed from the analytics snapshot, without querying the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('reports', nargs='*', help="category, histogram and/or time-to-goal (default: all).")
+        parser.add_argument('--dir', help="Snapshot directory (default: ANALYTICS_SNAPSHOT_DIR).")
+        parser.add_argument('--edges', help="Histogram bucket edges, e.g. 1,10,100,1000.")
+        parser.add_argument('--json', action='store_true', help="Print the reports as one JSON object.")
+
+    def handle(self, *args, **options):
+        try:
+            from funding import reports
+            from funding.snapshots import Snapshot
+        except ImportError as exc:
+            raise CommandError(f"donation_report needs numpy: {exc}")
+
+        names = options['reports'] or list(reports.REPORTS)
+        unknown = set(names) - set(reports.REPORTS)
+        if unknown:
+            raise CommandError(f"Unknown reports: {', '.join(sorted(unknown))}")
+        try:
+            snapshot = Snapshot(options['dir'])
+        except (FileNotFoundError, ValueError) as exc:
+            raise CommandError(exc)
+
+        results = {}
+        for name in names:
+            if name == 'histogram' and options['edges']:
+                try:
+                    edges = sorted(int(edge) for edge in options['edges'].split(','))
+                except ValueError:
+                    raise CommandError("--edges takes comma-separated whole amounts.")
+                results[name] = reports.donation_histogram(snapshot, edges)
+            else:
+                results[name] = reports.REPORTS[name](snapshot)
+
+        if options['json']:
+            self.stdout.write(json.dumps({'generated_at': snapshot.manifest['generated_at'], **results}, indent=2))
+            return
+        self.stdout.write(f"Snapshot of {snapshot.manifest['generated_at']}")
+        for name, result in results.items():
+            self.stdout.write(f"\n{name}")
+            getattr(self, 'print_' + name.replace('-', '_'))(result)
+
+    def print_category(self, rows):
+        self.stdout.write(f"{'category':<24} {'posts':>6} {'donations':>9} {'raised':>14} {'share':>7} {'funded':>7}")
+        for row in rows:
+            self.stdout.write(
+                f"{row['category'][:24]:<24} {row['posts']:>6} {row['donations']:>9} {row['raised']:>14,.2f} "
+                f"{row['share']:>7.1%} {row['funded_rate']:>7.1%}"
+            )
+
+    def print_histogram(self, rows):
+        self.stdout.write(f"{'amount':<16} {'donations':>9} {'total':>14}")
+        for row in rows:
+            bucket = f"{row['min']}-{row['max']}" if row['max'] is not None else f"{row['min']}+"
+            self.stdout.write(f"{bucket:<16} {row['donations']:>9} {row['total']:>14,.2f}")
+
+    def print_time_to_goal(self, summary):
+        self.stdout.write(
+            f"{summary['funded']} of {summary['campaigns']} campaigns reached their target ({summary['funded_rate']:.1%})."
+        )
+        if summary['funded']:
+            self.stdout.write(
+                f"Days to goal: median {summary['median_days']}, p25 {summary['p25_days']}, "
+                f"p75 {summary['p75_days']}, p90 {summary['p90_days']}, mean {summary['mean_days']}."
+            )
+        for row in summary['by_category']:
+            self.stdout.write(f"  {row['category'][:24]:<24} {row['funded']:>6} funded, median {row['median_days']} days")
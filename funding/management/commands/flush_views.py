@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from funding import counters
+from funding.models import Post
+
+
+class Command(BaseCommand):
+    help = "Write every post's pending view count from the shared cache to the database."
+
+    def handle(self, *args, **options):
+        post_ids = Post.objects.values_list('id', flat=True).iterator()
+        written = 0
+        chunk = []
+        for post_id in post_ids:
+            chunk.append(post_id)
+            if len(chunk) == 1000:
+                written += self.flush(chunk, written)
+                chunk = []
+        if chunk:
+            written += self.flush(chunk, written)
+        self.stdout.write(f"Wrote {written} pending view(s).")
+
+    def flush(self, post_ids, written):
+        count = counters.flush(post_ids)
+        if count is None:
+            raise CommandError(
+                f"Another process is flushing view counts; stopped after writing {written} view(s). "
+                "The rest stay pending for the next flush."
+            )
+        return count
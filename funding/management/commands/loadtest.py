@@ -0,0 +1,308 @@
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from decimal import Decimal
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from account.models import User
+from funding.models import Post
+
+USER_PREFIX = 'loadtest-'
+DEFAULT_MIX = 'feed=45,post=20,donate=15,comment=12,rate=8'
+
+
+class HTTPConnection:
+    """Minimal keep-alive HTTP/1.1 client over asyncio streams."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None, headers=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode() if body is not None else b''
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}', f'Content-Length: {len(payload)}']
+        if body is not None:
+            lines.append('Content-Type: application/json')
+        lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + payload)
+        try:
+            return await self._read_response()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            raise
+
+    async def _read_response(self):
+        status_line = await self.reader.readuntil(b'\r\n')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size = int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif 'content-length' in headers:
+            await self.reader.readexactly(int(headers['content-length']))
+        else:
+            await self.reader.read()
+            headers['connection'] = 'close'
+
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+        self.reader = self.writer = None
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, endpoint, seconds, ok):
+        self.latencies[endpoint].append(seconds)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    @property
+    def total(self):
+        return sum(len(values) for values in self.latencies.values())
+
+    @property
+    def error_count(self):
+        return sum(self.errors.values())
+
+    def all_latencies(self):
+        return sorted(value for values in self.latencies.values() for value in values)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Ramp concurrent virtual users against a locally started server (or --url) with a mix of "
+        "anonymous reads, donations, comments and ratings, and report throughput, latency "
+        "percentiles and error rates per stage and endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="Target an already running http:// server instead of starting one.")
+        parser.add_argument('--server', choices=['wsgi', 'asgi'], default='wsgi',
+                            help="wsgi: gunicorn if installed, else runserver. asgi: uvicorn.")
+        parser.add_argument('--workers', type=int, default=1, help="Worker processes for gunicorn/uvicorn.")
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--users', type=int, default=50, help="Seeded users.")
+        parser.add_argument('--posts', type=int, default=20, help="Seeded campaigns.")
+        parser.add_argument('--stages', default='1,5,10,25,50,100', help="Concurrency levels to ramp through.")
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds per stage.")
+        parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Endpoint weights, default {DEFAULT_MIX}.")
+        parser.add_argument('--timeout', type=float, default=10.0,
+                            help="Seconds before a request counts as an error and its connection is dropped.")
+        parser.add_argument('--max-error-rate', type=float, default=0.01)
+        parser.add_argument('--keep-data', action='store_true', help="Do not delete the seeded rows afterwards.")
+
+    def handle(self, *args, **options):
+        try:
+            stages = [int(level) for level in options['stages'].split(',')]
+            mix = {name: int(weight) for name, weight in (item.split('=') for item in options['mix'].split(','))}
+        except ValueError:
+            raise CommandError("--stages takes integers and --mix takes name=weight pairs.")
+        unknown = set(mix) - {'feed', 'post', 'donate', 'comment', 'rate'}
+        if unknown:
+            raise CommandError(f"Unknown endpoints in --mix: {', '.join(sorted(unknown))}")
+        if options['url']:
+            target = urlsplit(options['url'])
+            # The client speaks plain HTTP/1.1 only; https would just fail every request.
+            if target.scheme != 'http' or not target.hostname:
+                raise CommandError("--url must be an http:// URL with a host.")
+            host, port = target.hostname, target.port or 80
+
+        tokens, post_ids = self.seed(options['users'], options['posts'])
+        server = None
+        try:
+            if not options['url']:
+                host, port = '127.0.0.1', options['port']
+                server = self.start_server(options['server'], port, options['workers'])
+            results = asyncio.run(self.ramp(
+                host, port, stages, options['duration'], options['timeout'], mix, tokens, post_ids,
+            ))
+            self.report(results, options['max_error_rate'])
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=10)
+            if not options['keep_data']:
+                self.cleanup()
+
+    def seed(self, users, posts):
+        self.cleanup()
+        User.objects.bulk_create(
+            User(username=f'{USER_PREFIX}{i}', email=f'{USER_PREFIX}{i}@rafiq.local', verified=True, password='!')
+            for i in range(users)
+        )
+        seeded = list(User.objects.filter(username__startswith=USER_PREFIX).order_by('id'))
+        Post.objects.bulk_create(
+            Post(title=f"Load test campaign {i}", content="Load test. " * 50, author=seeded[i % len(seeded)],
+                 target_amount=Decimal('50000'))
+            for i in range(posts)
+        )
+        post_ids = list(Post.objects.filter(author__in=seeded).values_list('id', flat=True))
+        tokens = [str(RefreshToken.for_user(user).access_token) for user in seeded]
+        self.stdout.write(f"Seeded {len(seeded)} users and {len(post_ids)} campaigns.")
+        return tokens, post_ids
+
+    def cleanup(self):
+        seeded = User.objects.filter(username__startswith=USER_PREFIX)
+        with transaction.atomic():
+            Post.objects.filter(author__in=seeded).delete()
+            seeded.delete()
+
+    def start_server(self, kind, port, workers):
+        manage = os.path.join(settings.BASE_DIR, 'manage.py')
+        bind = f'127.0.0.1:{port}'
+        if kind == 'asgi':
+            if not self.importable('uvicorn'):
+                raise CommandError("--server asgi needs uvicorn installed.")
+            command = [sys.executable, '-m', 'uvicorn', 'project.asgi:application', '--host', '127.0.0.1',
+                       '--port', str(port), '--workers', str(workers), '--log-level', 'warning']
+        elif self.importable('gunicorn'):
+            command = [sys.executable, '-m', 'gunicorn', 'project.wsgi:application', '--bind', bind,
+                       '--workers', str(workers), '--threads', '4']
+        else:
+            command = [sys.executable, manage, 'runserver', '--noreload', bind]
+
+        self.stdout.write(f"Starting {' '.join(command[1:4])} on {bind}")
+        process = subprocess.Popen(command, cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f"The server exited with status {process.returncode}.")
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+                return process
+            except OSError:
+                time.sleep(0.2)
+        process.terminate()
+        raise CommandError("The server did not start listening within 30 seconds.")
+
+    def importable(self, module):
+        return importlib.util.find_spec(module) is not None
+
+    async def ramp(self, host, port, stages, duration, timeout, mix, tokens, post_ids):
+        names, weights = zip(*mix.items())
+        unrated = {token: set(post_ids) for token in tokens}
+        results = []
+        for level in stages:
+            stats = Stats()
+            stop_at = time.monotonic() + duration
+            start = time.monotonic()
+            await asyncio.gather(*(
+                self.virtual_user(
+                    host, port, stop_at, timeout, names, weights, tokens[i % len(tokens)], post_ids, unrated, stats,
+                )
+                for i in range(level)
+            ))
+            elapsed = time.monotonic() - start
+            results.append((level, elapsed, stats))
+            self.stdout.write(
+                f"  {level:>4} users: {stats.total / elapsed:8.1f} req/s, "
+                f"p99 {percentile(stats.all_latencies(), 0.99) * 1000:8.1f} ms, {stats.error_count} errors"
+            )
+        return results
+
+    async def virtual_user(self, host, port, stop_at, timeout, names, weights, token, post_ids, unrated, stats):
+        connection = HTTPConnection(host, port)
+        auth = {'Authorization': f'Bearer {token}'}
+        rng = random.Random()
+        try:
+            while time.monotonic() < stop_at:
+                endpoint = rng.choices(names, weights)[0]
+                post_id = rng.choice(post_ids)
+                if endpoint == 'feed':
+                    request = ('GET', '/funding/posts/', None, None)
+                elif endpoint == 'post':
+                    request = ('GET', f'/funding/posts/{post_id}/', None, None)
+                elif endpoint == 'donate':
+                    request = ('POST', '/funding/donations/', {'post': post_id, 'amount': '10.00'}, auth)
+                elif endpoint == 'comment':
+                    request = ('POST', '/funding/comments/', {'post': post_id, 'content': 'Load test comment'}, auth)
+                elif unrated[token]:
+                    request = ('POST', '/funding/ratings/', {'post': unrated[token].pop(), 'value': rng.randint(1, 5)}, auth)
+                else:
+                    # This user has rated every campaign; keep to the rest of the mix.
+                    remaining = [(name, weight) for name, weight in zip(names, weights) if name != 'rate']
+                    if not remaining:
+                        return
+                    names, weights = zip(*remaining)
+                    continue
+
+                start = time.perf_counter()
+                try:
+                    status = await asyncio.wait_for(connection.request(*request), timeout)
+                except (OSError, asyncio.IncompleteReadError):
+                    status = 0
+                except asyncio.TimeoutError:
+                    # The response may still arrive; the connection can't be reused.
+                    await connection.close()
+                    status = 0
+                stats.record(endpoint, time.perf_counter() - start, 200 <= status < 300)
+        finally:
+            await connection.close()
+
+    def report(self, results, max_error_rate):
+        self.stdout.write("")
+        self.stdout.write(f"{'users':>5} {'endpoint':<8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        saturation = None
+        best = 0.0
+        for level, elapsed, stats in results:
+            for endpoint in sorted(stats.latencies):
+                values = sorted(stats.latencies[endpoint])
+                self.stdout.write(
+                    f"{level:>5} {endpoint:<8} {len(values) / elapsed:8.1f} "
+                    f"{percentile(values, 0.50) * 1000:8.1f} {percentile(values, 0.95) * 1000:8.1f} "
+                    f"{percentile(values, 0.99) * 1000:8.1f} {stats.errors[endpoint] / len(values):7.1%}"
+                )
+            throughput = stats.total / elapsed
+            error_rate = stats.error_count / stats.total if stats.total else 1.0
+            # Saturated once more users stop buying throughput (<5% gain) or errors climb.
+            if saturation is None and (error_rate > max_error_rate or (best and throughput < best * 1.05)):
+                saturation = level
+            best = max(best, throughput)
+
+        self.stdout.write("")
+        if saturation is None:
+            self.stdout.write(f"No saturation up to {results[-1][0]} users; peak {best:.1f} req/s.")
+        else:
+            self.stdout.write(f"Saturated at {saturation} concurrent users; peak {best:.1f} req/s.")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from funding import feed
+from funding.models import CampaignEvent
+
+
+class Command(BaseCommand):
+    help = "Fan out feed events the background worker did not get to, and prune old feed rows."
+
+    def handle(self, *args, **options):
+        pending = CampaignEvent.objects.filter(fanout=CampaignEvent.FANOUT_PENDING).order_by('id')
+        processed = 0
+        for event in pending.iterator(chunk_size=500):
+            feed.fan_out(event)
+            processed += 1
+        pruned = feed.prune()
+        self.stdout.write(f"Fanned out {processed} event(s); pruned {pruned} expired event(s).")
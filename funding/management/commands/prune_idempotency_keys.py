@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from funding import idempotency
+
+
+class Command(BaseCommand):
+    help = "Delete expired idempotency keys."
+
+    def handle(self, *args, **options):
+        deleted = idempotency.prune()
+        self.stdout.write(f"Deleted {deleted} expired idempotency key(s).")
@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from funding.uploads import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Delete resumable uploads that have been idle longer than RESUMABLE_UPLOAD_MAX_AGE."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age-hours', type=float, help="Override RESUMABLE_UPLOAD_MAX_AGE.")
+
+    def handle(self, *args, **options):
+        max_age = options['max_age_hours']
+        purged = purge_stale_uploads(timedelta(hours=max_age) if max_age is not None else None)
+        self.stdout.write(f"Purged {purged} stale upload(s).")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from funding.leaderboards import rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    help = "Check the donor leaderboard tables against the raw donations, optionally rebuilding them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="Replace the tables with recomputed rows.")
+
+    def handle(self, *args, **options):
+        mismatches = rebuild_leaderboards(fix=options['fix'])
+        for scope, period, donor, stored, expected in mismatches[:50]:
+            self.stdout.write(f"{scope} {period} {donor}: stored={stored} expected={expected}")
+        if len(mismatches) > 50:
+            self.stdout.write(f"... and {len(mismatches) - 50} more")
+
+        if not mismatches:
+            self.stdout.write("Leaderboards match the donations.")
+        elif options['fix']:
+            self.stdout.write(f"Rebuilt leaderboards ({len(mismatches)} row(s) differed).")
+        else:
+            self.stdout.write(f"{len(mismatches)} row(s) differ; run with --fix to rebuild.")
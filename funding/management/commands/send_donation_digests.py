@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from funding import digests
+
+
+class Command(BaseCommand):
+    help = (
+        "Email campaign authors a summary of the donations they received since their last "
+        "digest, for every author whose hourly/daily/weekly window has passed. Run it hourly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Count due digests without sending them.")
+
+    def handle(self, *args, **options):
+        sent = digests.send_digests(dry_run=options['dry_run'])
+        verb = "Would send" if options['dry_run'] else "Sent"
+        self.stdout.write(f"{verb} {sent} donation digest(s).")
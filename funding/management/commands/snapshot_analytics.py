@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Append new donations to the columnar analytics snapshot (.npy chunks plus a manifest) "
+        "and rewrite its posts and categories. Point --database at a replica to keep the load "
+        "off the primary; --full rebuilds the snapshot to pick up edited or deleted donations."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help="Snapshot directory (default: ANALYTICS_SNAPSHOT_DIR).")
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--chunk-rows', type=int)
+        parser.add_argument('--full', action='store_true')
+
+    def handle(self, *args, **options):
+        try:
+            from funding.snapshots import write_snapshot
+        except ImportError as exc:
+            raise CommandError(f"snapshot_analytics needs numpy: {exc}")
+        try:
+            manifest = write_snapshot(options['dir'], options['database'], options['chunk_rows'], options['full'])
+        except ValueError as exc:
+            raise CommandError(exc)
+        self.stdout.write(
+            f"Added {manifest['added']} donation(s); the snapshot holds {manifest['donations']['rows']} "
+            f"donation(s) in {len(manifest['donations']['chunks'])} chunk(s) and {manifest['posts']['rows']} post(s)."
+        )
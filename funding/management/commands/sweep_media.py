@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from funding.media import sweep_orphan_blobs
+
+
+class Command(BaseCommand):
+    help = "Fix blob reference counts and delete media blobs nothing refers to."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=float, default=24,
+            help="Ignore blobs touched more recently than this (default: 24).",
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        deleted, freed = sweep_orphan_blobs(
+            grace=timedelta(hours=options['grace_hours']),
+            dry_run=options['dry_run'],
+            log=self.stdout.write,
+        )
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(f"{verb} {deleted} file(s), {freed / 1024:.1f} KiB.")
@@ -0,0 +1,154 @@
+import hashlib
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.db.models import Count
+from django.utils import timezone
+
+from account.models import User
+from .models import MediaBlob, PostImage
+from .storage import BLOB_PREFIX, blob_digest, media_storage
+
+# Every file field stored in the content-addressed storage.
+MEDIA_FIELDS = [(PostImage, 'image'), (User, 'profile_picture')]
+
+
+def blob_references():
+    """Count how many rows point at each blob digest."""
+    counts = Counter()
+    for model, field in MEDIA_FIELDS:
+        rows = (
+            model.objects.filter(**{f'{field}__startswith': f'{BLOB_PREFIX}/'})
+            .values(field).annotate(n=Count('pk')).order_by()
+        )
+        for row in rows:
+            digest = blob_digest(row[field])
+            if digest:
+                counts[digest] += row['n']
+    return counts
+
+
+def default_names():
+    """Files set as a field default: shared by rows created later, so never migrated or deleted."""
+    names = {model._meta.get_field(field).get_default() for model, field in MEDIA_FIELDS}
+    return {name for name in names if name}
+
+
+def is_referenced(name):
+    return any(model.objects.filter(**{field: name}).exists() for model, field in MEDIA_FIELDS)
+
+
+def file_digest(storage, name):
+    sha = hashlib.sha256()
+    with storage.open(name) as f:
+        for chunk in f.chunks():
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def dedup_existing_media(dry_run=False, log=print):
+    """
+    Move legacy (non content-addressed) files into blob storage, repoint the
+    rows at their blobs and delete the legacy copies.
+
+    Rows still pointing at a field default (such as the shared
+    'default.jpg' profile picture) are left alone.
+
+    Returns `(files, bytes_freed)`, where the bytes are net of the blobs the
+    migration creates.
+    """
+    storage = media_storage()
+    defaults = default_names()
+    seen, legacy, migrated, freed, added = set(), set(), 0, 0, 0
+
+    for model, field in MEDIA_FIELDS:
+        queryset = (
+            model.objects.exclude(**{f'{field}__startswith': f'{BLOB_PREFIX}/'})
+            .exclude(**{f'{field}__in': [''] + sorted(defaults)}).exclude(**{f'{field}__isnull': True})
+            .values_list('pk', field)
+        )
+        for pk, name in queryset.iterator(chunk_size=500):
+            if not storage.exists(name):
+                log(f"missing: {name} ({model._meta.label} {pk})")
+                continue
+
+            if name not in legacy:
+                # Each distinct content not yet stored becomes one new blob.
+                digest = file_digest(storage, name)
+                size = storage.size(name)
+                if digest not in seen and not MediaBlob.objects.filter(digest=digest).exists():
+                    added += size
+                seen.add(digest)
+                if dry_run:
+                    freed += size
+            if not dry_run:
+                with storage.open(name) as f:
+                    new_name = storage.save(name, f)
+                if not model.objects.filter(pk=pk, **{field: name}).update(**{field: new_name}):
+                    # The row changed under us; give the reference back.
+                    storage.release(new_name)
+            legacy.add(name)
+            migrated += 1
+
+    if not dry_run:
+        for name in legacy:
+            if not is_referenced(name) and storage.exists(name):
+                freed += storage.size(name)
+                storage.delete(name)
+
+    return migrated, freed - added
+
+
+def sweep_orphan_blobs(grace=timedelta(hours=24), dry_run=False, log=print):
+    """
+    Reconcile blob reference counts with the rows that actually use them and
+    delete unreferenced blobs and stray files.
+
+    Only blobs untouched for longer than `grace` are considered, so uploads
+    that are still being saved (file stored, row not yet committed) are safe.
+    Returns `(deleted, bytes_freed)`.
+    """
+    storage = media_storage()
+    cutoff = timezone.now() - grace
+    references = blob_references()
+    deleted = freed = 0
+
+    for blob in MediaBlob.objects.filter(updated_at__lt=cutoff).iterator(chunk_size=500):
+        actual = references.get(blob.digest, 0)
+        if actual == blob.refcount and actual:
+            continue
+        if actual:
+            log(f"refcount {blob.name}: {blob.refcount} -> {actual}")
+            if not dry_run:
+                MediaBlob.objects.filter(pk=blob.pk, updated_at=blob.updated_at).update(refcount=actual)
+            continue
+
+        log(f"orphan: {blob.name}")
+        deleted += 1
+        freed += blob.size
+        if not dry_run:
+            with storage.lock():
+                # Re-check under the lock in case the blob was just reused.
+                if MediaBlob.objects.filter(pk=blob.pk, updated_at__lt=cutoff).delete()[0]:
+                    if storage.exists(blob.name):
+                        storage.delete_file(blob.name)
+
+    root = storage.path(BLOB_PREFIX)
+    cutoff_ts = cutoff.timestamp()
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+            if filename == '.lock' or os.path.getmtime(path) >= cutoff_ts:
+                continue
+            digest = blob_digest(name)
+            if digest and (MediaBlob.objects.filter(digest=digest).exists() or references.get(digest)):
+                continue
+            log(f"stray file: {name}")
+            deleted += 1
+            freed += os.path.getsize(path)
+            if not dry_run:
+                os.remove(path)
+
+    return deleted, freed
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funding', '0004_media_blob_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostNeighbour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('neighbour', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='funding.post')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbours', to='funding.post')),
+            ],
+            options={
+                'unique_together': {('post', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funding', '0010_post_archived_at_post_archived_comment_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='views',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -1,6 +1,8 @@
+import uuid
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from account.models import User
+from .storage import media_storage
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -9,7 +11,7 @@ class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
 
 class Post(models.Model):
-    title = models.CharField(max_length=255)
+    title = models.CharField(max_length=255, db_index=True)
     content = models.TextField()
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='posts')
@@ -23,15 +25,25 @@ class Post(models.Model):
     end_time = models.DateTimeField(null=True, blank=True)
     is_canceled = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Written in batches by funding.counters, so it lags by up to VIEW_FLUSH_INTERVAL.
+    views = models.PositiveBigIntegerField(default=0)
+    # Totals of the rows moved to the archive tables (see funding.archive).
+    archived_at = models.DateTimeField(null=True, blank=True)
+    archived_donation_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    archived_donation_count = models.PositiveIntegerField(default=0)
+    archived_comment_count = models.PositiveIntegerField(default=0)
+    archived_rating_count = models.PositiveIntegerField(default=0)
+    archived_rating_sum = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.title
 
     @property
     def current_amount(self):
-        return self.donations.aggregate(
+        live = self.donations.aggregate(
             total=models.Sum('amount')
-        )['total'] or 0.00
+        )['total'] or 0
+        return live + self.archived_donation_total
 
     @property
     def funding_percentage(self):
@@ -45,8 +57,12 @@ class Post(models.Model):
 
     @property
     def average_rating(self):
-        avg = self.ratings.aggregate(avg=models.Avg('value'))['avg']
-        return round(avg, 2) if avg else 0.00
+        if not self.archived_rating_count:
+            avg = self.ratings.aggregate(avg=models.Avg('value'))['avg']
+            return round(avg, 2) if avg else 0.00
+        live = self.ratings.aggregate(total=models.Sum('value'), count=models.Count('id'))
+        total = (live['total'] or 0) + self.archived_rating_sum
+        return round(total / (live['count'] + self.archived_rating_count), 2)
     
 class PostImage(models.Model):
     post = models.ForeignKey(
@@ -54,7 +70,7 @@ class PostImage(models.Model):
         on_delete=models.CASCADE,
         related_name='images'
     )
-    image = models.ImageField(upload_to='post_images/')
+    image = models.ImageField(upload_to='post_images/', storage=media_storage)
 
     def __str__(self):
         return f"Image for {self.post.title}"
@@ -78,7 +94,8 @@ class Donation(models.Model):
     message = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     def __str__(self):
-        return f"{self.user.username} donated ${self.amount} to {self.post.title}"
+        donor = self.user.username if self.user else "Anonymous"
+        return f"{donor} donated ${self.amount} to {self.post.title}"
     
 class Rating(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ratings')
@@ -89,4 +106,209 @@ class Rating(models.Model):
     class Meta:
         unique_together = ('user', 'post')
     def __str__(self):
-        return f"{self.user.username} rated {self.post.title} as {self.value}"
\ No newline at end of file
+        return f"{self.user.username} rated {self.post.title} as {self.value}"
+
+
+class Upload(models.Model):
+    TARGET_POST_IMAGE = 'post_image'
+    TARGET_PROFILE_PICTURE = 'profile_picture'
+    TARGET_CHOICES = [
+        (TARGET_POST_IMAGE, 'Post image'),
+        (TARGET_PROFILE_PICTURE, 'Profile picture'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='uploads')
+    target = models.CharField(max_length=20, choices=TARGET_CHOICES)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, null=True, blank=True, related_name='uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.offset}/{self.size} bytes)"
+
+
+class MediaBlob(models.Model):
+    digest = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
+
+
+class PostNeighbour(models.Model):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='neighbours')
+    neighbour = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = ('post', 'rank')
+
+    def __str__(self):
+        return f"{self.post_id} -> {self.neighbour_id} ({self.score:.3f})"
+
+
+class DonorLeaderboardEntry(models.Model):
+    # scope is "global" or "post:<id>"; period is "all" or a "YYYY-MM" month.
+    # Anonymous donations (no user) share the "anonymous" donor_key.
+    scope = models.CharField(max_length=32)
+    period = models.CharField(max_length=7, default='all')
+    donor_key = models.CharField(max_length=32)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    donation_count = models.PositiveIntegerField(default=0)
+    last_donated_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('scope', 'period', 'donor_key')
+        indexes = [models.Index(fields=['scope', 'period', '-total'], name='leaderboard_rank_idx')]
+
+    def __str__(self):
+        return f"{self.donor_key} in {self.scope}/{self.period}: {self.total}"
+
+
+class CampaignEvent(models.Model):
+    VERB_COMMENT = 'comment'
+    VERB_MILESTONE = 'milestone'
+    VERB_IMAGE = 'image'
+    VERB_CHOICES = [
+        (VERB_COMMENT, 'New comment'),
+        (VERB_MILESTONE, 'Funding milestone'),
+        (VERB_IMAGE, 'New images'),
+    ]
+
+    # pending: waiting for the fan-out worker; done: copied to follower
+    # timelines; pull: too many followers, read from here at feed time.
+    FANOUT_PENDING = 'pending'
+    FANOUT_DONE = 'done'
+    FANOUT_PULL = 'pull'
+    FANOUT_CHOICES = [
+        (FANOUT_PENDING, 'Pending'),
+        (FANOUT_DONE, 'Done'),
+        (FANOUT_PULL, 'Pull'),
+    ]
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='events')
+    verb = models.CharField(max_length=20, choices=VERB_CHOICES)
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    object_id = models.PositiveBigIntegerField(null=True, blank=True)
+    data = models.JSONField(default=dict, blank=True)
+    fanout = models.CharField(max_length=10, choices=FANOUT_CHOICES, default=FANOUT_PENDING)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', '-id'], name='event_pull_idx',
+                condition=~models.Q(fanout='done'),
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'object_id'], name='unique_post_milestone',
+                condition=models.Q(verb='milestone'),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.verb} on {self.post_id}"
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline')
+    event = models.ForeignKey(CampaignEvent, on_delete=models.CASCADE, related_name='timeline_entries')
+
+    class Meta:
+        unique_together = ('user', 'event')
+
+    def __str__(self):
+        return f"{self.event} for {self.user_id}"
+
+
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True)
+    locked_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+
+    def __str__(self):
+        return f"{self.key} for {self.user_id}"
+
+
+# Cold copies of rows from ended campaigns. They keep the original ids so
+# references (feed events, replies) stay meaningful.
+class ArchivedDonation(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='archived_donations')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    message = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived donation {self.id} to {self.post_id}"
+
+
+class ArchivedComment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='archived_comments')
+    # Replies are archived before their parents, so no database constraint.
+    parent = models.ForeignKey(
+        'self', null=True, blank=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name='replies',
+    )
+    content = models.TextField()
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived comment {self.id} on {self.post_id}"
+
+
+class ArchivedRating(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='archived_ratings')
+    value = models.IntegerField()
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived rating {self.id} on {self.post_id}"
+
+
+class DigestPreference(models.Model):
+    FREQUENCY_OFF = 'off'
+    FREQUENCY_HOURLY = 'hourly'
+    FREQUENCY_DAILY = 'daily'
+    FREQUENCY_WEEKLY = 'weekly'
+    FREQUENCY_CHOICES = [
+        (FREQUENCY_OFF, 'Off'),
+        (FREQUENCY_HOURLY, 'Hourly'),
+        (FREQUENCY_DAILY, 'Daily'),
+        (FREQUENCY_WEEKLY, 'Weekly'),
+    ]
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='digest_preference')
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default=FREQUENCY_DAILY)
+    # Donations up to this id have been reported to the author.
+    last_donation_id = models.BigIntegerField(default=0)
+    last_sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user.username}: {self.frequency} donation digest"
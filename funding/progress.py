@@ -0,0 +1,207 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot(post_id):
+    """Progress figures for one post, from a single aggregate query."""
+    row = (
+        Post.objects.filter(pk=post_id)
+        .annotate(total=Sum('donations__amount'), count=Count('donations'))
+        .values('target_amount', 'total', 'count', 'archived_donation_total', 'archived_donation_count').first()
+    )
+    if row is None:
+        return None
+    total = (row['total'] or Decimal('0')) + row['archived_donation_total']
+    target = row['target_amount']
+    return {
+        'post': post_id,
+        'current_amount': total,
+        'funding_percentage': round(total / target * 100, 2) if target > 0 else 0.00,
+        'donation_count': row['count'] + row['archived_donation_count'],
+    }
+
+
+class Subscription:
+    def __init__(self, loop):
+        self.loop = loop
+        self.event = asyncio.Event()
+        self.latest = None
+
+
+class Broker:
+    """
+    In-process fan-out to the streams open in this worker. Only the latest
+    snapshot per subscriber is kept, so a burst of donations wakes each
+    stream once and it sends whatever is current when it gets to run.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, post_id):
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[post_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, post_id, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(post_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[post_id]
+
+    def deliver(self, post_id, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(post_id, ()))
+        by_loop = defaultdict(list)
+        for subscription in subscribers:
+            subscription.latest = data
+            by_loop[subscription.loop].append(subscription.event)
+        # One thread-safe callback per event loop, however many streams it serves.
+        for loop, events in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_set_all, events)
+            except RuntimeError:
+                pass  # The loop has shut down.
+
+
+def _set_all(events):
+    for event in events:
+        event.set()
+
+
+broker = Broker()
+
+
+class LocalBackend:
+    """Delivers updates to streams in the publishing process only."""
+
+    def publish(self, post_id, data):
+        broker.deliver(post_id, data)
+
+    def start(self):
+        pass
+
+
+class RedisBackend:
+    """
+    Publishes updates on a Redis channel per post so every worker process
+    receives them; each process runs one listener thread feeding its broker.
+    """
+
+    def __init__(self):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured("RedisBackend requires the 'redis' package.")
+        self.client = redis.Redis.from_url(settings.PROGRESS_REDIS_URL)
+        self.prefix = settings.PROGRESS_REDIS_PREFIX
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def publish(self, post_id, data):
+        self.client.publish(f'{self.prefix}{post_id}', data)
+
+    def start(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='progress-redis', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(f'{self.prefix}*')
+        for message in pubsub.listen():
+            try:
+                post_id = int(message['channel'].decode()[len(self.prefix):])
+            except (ValueError, AttributeError):
+                continue
+            broker.deliver(post_id, message['data'].decode())
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = import_string(settings.PROGRESS_BACKEND)()
+    return _backend
+
+
+def encode(data):
+    return json.dumps(data, cls=JSONEncoder)
+
+
+def publish(post_id):
+    data = snapshot(post_id)
+    if data is not None:
+        get_backend().publish(post_id, encode(data))
+
+
+def donation_changed(post_id):
+    """Push the post's new progress to open streams once the transaction commits."""
+    def send():
+        try:
+            publish(post_id)
+        except Exception:
+            logger.exception("Publishing progress for post %s failed", post_id)
+
+    transaction.on_commit(send)
+
+
+def _message(data):
+    return f'event: progress\ndata: {data}\n\n'
+
+
+async def stream(post_id, subscription, initial):
+    """
+    Server-sent events for one post: the current snapshot, then one message
+    per change at most every PROGRESS_MIN_INTERVAL seconds, and a comment
+    line every PROGRESS_KEEPALIVE seconds so proxies keep the connection open.
+
+    `subscription` must be taken before `initial` is read, so nothing
+    committed in between is missed.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        last = encode(initial)
+        yield f'retry: {settings.PROGRESS_RETRY_MS}\n' + _message(last)
+        sent_at = loop.time()
+        while True:
+            try:
+                await asyncio.wait_for(subscription.event.wait(), settings.PROGRESS_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            delay = settings.PROGRESS_MIN_INTERVAL - (loop.time() - sent_at)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            subscription.event.clear()
+            data = subscription.latest
+            if data != last:
+                last = data
+                sent_at = loop.time()
+                yield _message(data)
+    finally:
+        broker.unsubscribe(post_id, subscription)
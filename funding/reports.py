@@ -0,0 +1,142 @@
+"""
+Cross-campaign reports computed with NumPy from the columnar snapshots
+written by funding.snapshots, so they never query the database.
+"""
+import numpy as np
+
+from .snapshots import MISSING
+
+# Donation size buckets, in currency units; the last one is open-ended.
+DEFAULT_EDGES = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+DAY = 24 * 60 * 60
+
+
+def _donation_post_index(snapshot):
+    """Row of each donation's post in the posts table (sorted by id), and which donations have one."""
+    post_ids = snapshot.posts['id']
+    donation_posts = snapshot.donations['post_id']
+    index = np.searchsorted(post_ids, donation_posts)
+    index[index == len(post_ids)] = 0
+    known = post_ids[index] == donation_posts if len(post_ids) else np.zeros(len(donation_posts), dtype=bool)
+    return index, known
+
+
+def raised_per_post(snapshot):
+    index, known = _donation_post_index(snapshot)
+    size = len(snapshot.posts['id'])
+    amounts = snapshot.donations['amount_cents'][known]
+    return (
+        np.bincount(index[known], weights=amounts, minlength=size).astype(np.int64),
+        np.bincount(index[known], minlength=size),
+    )
+
+
+def funding_by_category(snapshot):
+    """Posts, donations, amount raised and share of campaigns that reached their target, per category."""
+    raised, donations = raised_per_post(snapshot)
+    target = snapshot.posts['target_cents']
+    categories, codes = np.unique(snapshot.posts['category_id'], return_inverse=True)
+    size = len(categories)
+    totals = np.bincount(codes, weights=raised, minlength=size)
+    funded = np.bincount(codes, weights=(raised >= target) & (target > 0), minlength=size)
+    posts = np.bincount(codes, minlength=size)
+    counts = np.bincount(codes, weights=donations, minlength=size)
+    grand_total = totals.sum()
+
+    rows = []
+    for position, category_id in enumerate(categories.tolist()):
+        rows.append({
+            'category': snapshot.categories.get(category_id, 'Uncategorized' if category_id == MISSING else str(category_id)),
+            'posts': int(posts[position]),
+            'donations': int(counts[position]),
+            'raised': round(totals[position] / 100, 2),
+            'share': round(totals[position] / grand_total, 4) if grand_total else 0.0,
+            'funded_posts': int(funded[position]),
+            'funded_rate': round(funded[position] / posts[position], 4),
+        })
+    return sorted(rows, key=lambda row: -row['raised'])
+
+
+def donation_histogram(snapshot, edges=DEFAULT_EDGES):
+    """Number and total of donations per size bucket."""
+    amounts = snapshot.donations['amount_cents']
+    bounds = np.asarray(edges, dtype=np.int64) * 100
+    bucket = np.searchsorted(bounds, amounts, side='right')
+    size = len(bounds) + 1
+    counts = np.bincount(bucket, minlength=size)
+    totals = np.bincount(bucket, weights=amounts, minlength=size)
+
+    rows = []
+    for position in range(size):
+        if position == 0 and not counts[0]:
+            continue  # Nothing can be below the minimum donation.
+        rows.append({
+            'min': edges[position - 1] if position else 0,
+            'max': edges[position] if position < len(edges) else None,
+            'donations': int(counts[position]),
+            'total': round(totals[position] / 100, 2),
+        })
+    return rows
+
+
+def time_to_goal(snapshot):
+    """
+    How long campaigns that reached their target took, from creation to the
+    donation that crossed it. Donations are sorted by post and time once, and
+    running totals within each post come from a single cumulative sum.
+    """
+    index, known = _donation_post_index(snapshot)
+    target = snapshot.posts['target_cents']
+    # A campaign without a target can't be funded; its donations would
+    # otherwise "reach" it at once.
+    known[known] &= target[index[known]] > 0
+    index = index[known]
+    amounts = snapshot.donations['amount_cents'][known]
+    times = snapshot.donations['created_at'][known]
+
+    order = np.lexsort((snapshot.donations['id'][known], times, index))
+    index, amounts, times = index[order], amounts[order], times[order]
+    running = np.cumsum(amounts)
+    starts = np.flatnonzero(np.r_[True, index[1:] != index[:-1]]) if len(index) else np.empty(0, dtype=np.int64)
+    before = np.r_[0, running][starts]
+    running -= np.repeat(before, np.diff(np.r_[starts, len(index)]))
+
+    reached = np.flatnonzero(running >= target[index])
+    first = reached[np.r_[True, index[reached][1:] != index[reached][:-1]]] if len(reached) else reached
+    funded_posts = index[first]
+    days = (times[first] - snapshot.posts['created_at'][funded_posts]) / DAY
+
+    eligible = int((target > 0).sum())
+    summary = {
+        'campaigns': eligible,
+        'funded': len(first),
+        'funded_rate': round(len(first) / eligible, 4) if eligible else 0.0,
+    }
+    if len(days):
+        p25, median, p75, p90 = np.percentile(days, [25, 50, 75, 90])
+        summary.update({
+            'mean_days': round(float(days.mean()), 2),
+            'p25_days': round(float(p25), 2),
+            'median_days': round(float(median), 2),
+            'p75_days': round(float(p75), 2),
+            'p90_days': round(float(p90), 2),
+        })
+
+    categories = snapshot.posts['category_id'][funded_posts]
+    by_category = []
+    for category_id in np.unique(categories).tolist():
+        selected = days[categories == category_id]
+        by_category.append({
+            'category': snapshot.categories.get(category_id, 'Uncategorized' if category_id == MISSING else str(category_id)),
+            'funded': len(selected),
+            'median_days': round(float(np.median(selected)), 2),
+        })
+    summary['by_category'] = sorted(by_category, key=lambda row: row['median_days'])
+    return summary
+
+
+REPORTS = {
+    'category': funding_by_category,
+    'histogram': donation_histogram,
+    'time-to-goal': time_to_goal,
+}
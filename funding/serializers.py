@@ -1,33 +1,107 @@
 from decimal import Decimal
+from django.conf import settings
+from django.db import models, transaction
 from django.utils import timezone
 from rest_framework import serializers
-from .models import Post, PostImage, Donation, Comment, Category, Tag, Rating
-from account.serializers import UserProfileSerializer
+from .models import (
+    Post, PostImage, Donation, Comment, Category, Tag, Rating, Upload, PostNeighbour, DonorLeaderboardEntry,
+    CampaignEvent, ArchivedComment, ArchivedDonation, ArchivedRating, DigestPreference,
+)
+from . import archive, loaders
+from .similarity import schedule_update
+from .utiles import create_post_images, delete_stored_images, store_post_images
+from account import fragments
+
+class CommentListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        comments = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        fragments.prime(self.context, [comment.user_id for comment in comments])
+        return super().to_representation(comments)
+
 
 class CommentSerializer(serializers.ModelSerializer):
-    user = UserProfileSerializer(read_only=True)
+    user = serializers.SerializerMethodField(read_only=True)
     replies = serializers.SerializerMethodField()
 
     class Meta:
         model = Comment
         fields = ['id', 'user', 'post', 'parent', 'content', 'created_at', 'replies']
         read_only_fields = ['id', 'user', 'created_at', 'replies']
+        list_serializer_class = CommentListSerializer
+
+    def get_user(self, obj):
+        return fragments.fragment_for(self.context, obj.user_id)
 
     def get_replies(self, obj):
         depth = self.context.get('depth', 3)
         if depth <= 0:
             return []
-        children = obj.replies.all().order_by('created_at')
-        serializer = CommentSerializer(children, many=True, context={'depth': depth - 1})
+        loader = self.context.get(loaders.CONTEXT_KEY)
+        children = loader.replies(obj) if loader else obj.replies.all().order_by('created_at')
+        context = {'depth': depth - 1, fragments.CONTEXT_KEY: self.context.setdefault(fragments.CONTEXT_KEY, {})}
+        if loader:
+            context[loaders.CONTEXT_KEY] = loader
+        serializer = type(self)(children, many=True, context=context)
         return serializer.data
 
 
+class ArchivedCommentSerializer(CommentSerializer):
+    class Meta(CommentSerializer.Meta):
+        model = ArchivedComment
+
+
+def serialize_comments(comments, context):
+    """Serialize a mix of live and archived comments, keeping their order."""
+    fragments.prime(context, [comment.user_id for comment in comments])
+    return [
+        (ArchivedCommentSerializer if isinstance(comment, ArchivedComment) else CommentSerializer)(
+            comment, context=context,
+        ).data
+        for comment in comments
+    ]
+
+
 class PostImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = PostImage
         fields = ['id', 'image','post']
         read_only_fields = ['id']
 
+
+class PostImageBulkSerializer(serializers.Serializer):
+    post = serializers.PrimaryKeyRelatedField(queryset=Post.objects.all())
+    images = serializers.ListField(child=serializers.FileField(), allow_empty=False)
+
+    def validate_post(self, post):
+        if post.author_id != self.context['request'].user.id:
+            raise serializers.ValidationError("You can only add images to your own posts.")
+        return post
+
+class UploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Upload
+        fields = ['id', 'target', 'post', 'filename', 'size', 'offset', 'created_at']
+        read_only_fields = ['id', 'offset', 'created_at']
+
+    def validate_size(self, value):
+        if value > settings.RESUMABLE_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Uploads are limited to {settings.RESUMABLE_UPLOAD_MAX_SIZE} bytes."
+            )
+        return value
+
+    def validate(self, attrs):
+        post = attrs.get('post')
+        if attrs['target'] == Upload.TARGET_POST_IMAGE:
+            if post is None:
+                raise serializers.ValidationError({'post': 'This field is required for post images.'})
+            if post.author_id != self.context['request'].user.id:
+                raise serializers.ValidationError({'post': 'You can only add images to your own posts.'})
+        elif post is not None:
+            raise serializers.ValidationError({'post': 'Profile picture uploads cannot target a post.'})
+        return attrs
+
+
 class DonationSerializer(serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
     post_author = serializers.StringRelatedField(source='post.author', read_only=True)
@@ -47,6 +121,51 @@ class DonationSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at']
 
+class ArchivedDonationSerializer(DonationSerializer):
+    class Meta(DonationSerializer.Meta):
+        model = ArchivedDonation
+
+
+def serialize_donations(donations):
+    """Serialize a mix of live and archived donations, keeping their order."""
+    return [
+        (ArchivedDonationSerializer if isinstance(donation, ArchivedDonation) else DonationSerializer)(donation).data
+        for donation in donations
+    ]
+
+
+class DigestPreferenceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DigestPreference
+        fields = ['frequency', 'last_sent_at']
+        read_only_fields = ['last_sent_at']
+
+
+class LeaderboardEntrySerializer(serializers.ModelSerializer):
+    user = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DonorLeaderboardEntry
+        fields = ['user', 'total', 'donation_count', 'last_donated_at']
+
+    def get_user(self, obj):
+        if obj.user is None:
+            return {'id': None, 'username': 'Anonymous'}
+        return {'id': obj.user.id, 'username': obj.user.username}
+
+
+class CampaignEventSerializer(serializers.ModelSerializer):
+    post = serializers.SerializerMethodField()
+    actor = serializers.StringRelatedField()
+
+    class Meta:
+        model = CampaignEvent
+        fields = ['id', 'verb', 'post', 'actor', 'object_id', 'data', 'created_at']
+
+    def get_post(self, obj):
+        return {'id': obj.post.id, 'title': obj.post.title}
+
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
@@ -74,14 +193,60 @@ class RatingSerializer(serializers.ModelSerializer):
         user = self.context['request'].user
         post = validated_data.get('post')
 
-        if Rating.objects.filter(user=user, post=post).exists():
+        if (Rating.objects.filter(user=user, post=post).exists()
+                or ArchivedRating.objects.filter(user=user, post=post).exists()):
             raise serializers.ValidationError("You have already rated this post.")
 
         validated_data['user'] = user
         return super().create(validated_data)
 
+
+class ArchivedRatingSerializer(serializers.ModelSerializer):
+    user = serializers.StringRelatedField(read_only=True)
+
+    class Meta:
+        model = ArchivedRating
+        fields = RatingSerializer.Meta.fields
+
+class SimilarPostSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='neighbour.id')
+    title = serializers.CharField(source='neighbour.title')
+    category = serializers.SerializerMethodField()
+    target_amount = serializers.DecimalField(source='neighbour.target_amount', max_digits=10, decimal_places=2)
+    end_time = serializers.DateTimeField(source='neighbour.end_time')
+
+    class Meta:
+        model = PostNeighbour
+        fields = ['id', 'title', 'category', 'target_amount', 'end_time', 'score']
+
+    def get_category(self, obj):
+        category = obj.neighbour.category
+        return {'id': category.id, 'name': category.name} if category else None
+
+
+def prime_post_users(context, posts):
+    # Authors and commenters of the whole page in one cache round trip.
+    loader = context.get(loaders.CONTEXT_KEY)
+    if loader is not None:
+        fragments.prime(context, loader.user_ids(posts))
+        return
+    post_ids = [post.pk for post in posts]
+    commenters = list(Comment.objects.filter(post_id__in=post_ids).values_list('user_id', flat=True).distinct())
+    archived_ids = [post.pk for post in posts if post.archived_comment_count]
+    if archived_ids:
+        commenters += ArchivedComment.objects.filter(post_id__in=archived_ids).values_list('user_id', flat=True).distinct()
+    fragments.prime(context, [post.author_id for post in posts] + commenters)
+
+
+class PostListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        posts = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        prime_post_users(self.context, posts)
+        return super().to_representation(posts)
+
+
 class PostSerializer(serializers.ModelSerializer):
-    author = serializers.StringRelatedField(read_only=True)
+    author = serializers.SerializerMethodField(read_only=True)
     user_image = serializers.SerializerMethodField(read_only=True)
     images = serializers.ListField(child=serializers.ImageField(), write_only=True, required=False)
     image_urls = PostImageSerializer(source='images', many=True, read_only=True)  
@@ -111,41 +276,66 @@ class PostSerializer(serializers.ModelSerializer):
             'start_time', 'end_time', 'is_canceled',
             'images', 'image_urls',
             'comments', 'donations',
-            'current_amount', 'funding_percentage', 'average_rating',
+            'current_amount', 'funding_percentage', 'average_rating', 'views',
         ]
         read_only_fields = [
             'id', 'author', 'created_at','user_image',
             'category', 'tags',
             'image_urls',
             'comments', 'donations',
-            'current_amount', 'funding_percentage', 'average_rating',
+            'current_amount', 'funding_percentage', 'average_rating', 'views',
         ]
+        list_serializer_class = PostListSerializer
+
+    def to_representation(self, instance):
+        if self.parent is None:
+            prime_post_users(self.context, [instance])
+        return super().to_representation(instance)
+
+    def get_author(self, obj):
+        author = fragments.fragment_for(self.context, obj.author_id)
+        return author['username'] if author else None
 
     def get_user_image(self, obj):
-        request = self.context.get('request')
-        if obj.author and obj.author.profile_picture:
-            image_url = obj.author.profile_picture.url
-            if request is not None:
-                return request.build_absolute_uri(image_url)
-            return image_url
-        return None
+        author = fragments.fragment_for(self.context, obj.author_id)
+        return author['profile_picture'] if author else None
 
     def get_comments(self, obj):
+        loader = self.context.get(loaders.CONTEXT_KEY)
+        if loader is not None:
+            context = {
+                fragments.CONTEXT_KEY: self.context.setdefault(fragments.CONTEXT_KEY, {}),
+                loaders.CONTEXT_KEY: loader,
+            }
+            return serialize_comments(loader.comments(obj), context)
         top_level = obj.comments.filter(parent__isnull=True).order_by('created_at')
-        return CommentSerializer(top_level, many=True).data
+        context = {fragments.CONTEXT_KEY: self.context.setdefault(fragments.CONTEXT_KEY, {})}
+        if obj.archived_comment_count:
+            archived = obj.archived_comments.filter(parent__isnull=True)
+            return serialize_comments(archive.merge_by_created(archived, top_level), context)
+        return CommentSerializer(top_level, many=True, context=context).data
 
     def get_donations(self, obj):
-        return DonationSerializer(obj.donations.all(), many=True).data
+        loader = self.context.get(loaders.CONTEXT_KEY)
+        if loader is not None:
+            return serialize_donations(loader.donations(obj))
+        donations = DonationSerializer(obj.donations.all(), many=True).data
+        if obj.archived_donation_count:
+            archived = ArchivedDonationSerializer(obj.archived_donations.order_by('id'), many=True).data
+            return archived + donations
+        return donations
 
     def get_current_amount(self, obj):
-        return obj.current_amount
+        loader = self.context.get(loaders.CONTEXT_KEY)
+        return loader.current_amount(obj) if loader else obj.current_amount
 
     def get_average_rating(self, obj):
-        return obj.average_rating
+        loader = self.context.get(loaders.CONTEXT_KEY)
+        return loader.average_rating(obj) if loader else obj.average_rating
 
     def get_funding_percentage(self, obj):
         if obj.target_amount:
-            return round((Decimal(obj.current_amount) / obj.target_amount) * 100, 2)
+            return round((Decimal(self.get_current_amount(obj)) / obj.target_amount) * 100, 2)
         return 0
 
     def get_category(self, obj):
@@ -173,11 +363,24 @@ class PostSerializer(serializers.ModelSerializer):
 
         validated_data['author'] = self.context['request'].user
 
-        post = Post.objects.create(**validated_data)
-        post.tags.set(tags_data)
-
-        for image_file in images_data:
-            PostImage.objects.create(post=post, image=image_file)
+        # Files are stored before the transaction: the storage threads use
+        # their own connections and would otherwise wait on its write lock.
+        stored, errors = store_post_images(images_data)
+        if errors:
+            delete_stored_images(stored)
+            raise serializers.ValidationError({'images': errors})
+
+        # The post, its tags and images commit together; the similarity, feed
+        # and typeahead work all waits for that commit.
+        try:
+            with transaction.atomic():
+                post = Post.objects.create(**validated_data)
+                post.tags.set(tags_data)
+                create_post_images(post, stored)
+                schedule_update(post)
+        except Exception:
+            delete_stored_images(stored)
+            raise
 
         return post
 
@@ -187,9 +390,12 @@ class PostSerializer(serializers.ModelSerializer):
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
+        # Only the fields sent: a full save would write back `views` as loaded,
+        # dropping the views funding.counters flushed in the meantime.
+        instance.save(update_fields=list(validated_data))
 
         if tags_data is not None:
             instance.tags.set(tags_data)
+        schedule_update(instance)
 
         return instance
@@ -0,0 +1,88 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from account.models import User
+from . import leaderboards, similarity, typeahead
+from .models import Category, Post, PostImage, Tag
+
+# File fields whose file can be replaced on an existing row.
+REPLACEABLE_MEDIA = {User: 'profile_picture', PostImage: 'image'}
+
+
+def release_media(field_file):
+    # Drop the blob reference once the row change is committed; a rolled back
+    # delete must keep its file.
+    storage, name = field_file.storage, field_file.name
+    if name and hasattr(storage, 'release'):
+        transaction.on_commit(lambda: storage.release(name))
+
+
+@receiver(post_delete, sender=PostImage)
+def release_post_image(sender, instance, **kwargs):
+    release_media(instance.image)
+
+
+@receiver(pre_delete, sender=Post)
+def forget_post_leaderboards(sender, instance, **kwargs):
+    # Runs inside the delete's transaction, before the donations cascade away.
+    leaderboards.forget_post(instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def forget_donor_leaderboards(sender, instance, **kwargs):
+    leaderboards.forget_donor(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def release_profile_picture(sender, instance, **kwargs):
+    release_media(instance.profile_picture)
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=PostImage)
+def remember_replaced_media(sender, instance, update_fields=None, **kwargs):
+    field = REPLACEABLE_MEDIA[sender]
+    if instance.pk is None or (update_fields is not None and field not in update_fields):
+        return
+    old = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+    # A new file still carries its upload name here; it is stored (and gets
+    # its blob name) after this signal.
+    if old and old != getattr(instance, field).name:
+        instance._replaced_media = old
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=PostImage)
+def release_replaced_media(sender, instance, **kwargs):
+    old = instance.__dict__.pop('_replaced_media', None)
+    if old is None:
+        return
+    field = REPLACEABLE_MEDIA[sender]
+    field_file = getattr(instance, field)
+    if field_file.name != old:
+        release_media(getattr(sender(**{field: old}), field))
+    elif hasattr(field_file.storage, 'release'):
+        # Same content as before: storing it took a second reference to the
+        # blob the row already held. The row keeps that blob whether or not
+        # the transaction commits, so the extra reference goes now.
+        field_file.storage.release(old)
+
+
+@receiver(post_save, sender=Post)
+def remove_canceled_post_neighbours(sender, instance, update_fields=None, **kwargs):
+    # Canceled campaigns shouldn't be recommended until the next full rebuild.
+    if instance.is_canceled and (update_fields is None or 'is_canceled' in update_fields):
+        similarity.remove_posts([instance.pk])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_typeahead(sender, **kwargs):
+    # Names and post counts only change on these; the index rebuilds on next use.
+    transaction.on_commit(typeahead.invalidate)
@@ -0,0 +1,244 @@
+import logging
+import math
+import queue
+import threading
+
+from django.db import close_old_connections, transaction
+from django.db.models import Count
+
+from .models import Post, PostNeighbour
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 10
+# Weight of the shared-category feature relative to a single shared tag.
+CATEGORY_WEIGHT = 2.0
+# Posts scored per sparse matrix product during a full build.
+BLOCK_SIZE = 1024
+# Candidate limits for incremental updates: posts sharing the most tags, and
+# the most recent posts of the same category.
+TAG_CANDIDATES = 2000
+CATEGORY_CANDIDATES = 500
+METRICS = ('jaccard', 'cosine')
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def build_index(top_k=TOP_K, metric='jaccard'):
+    """
+    Rebuild the neighbours table from scratch.
+
+    Each post is a sparse row over its tags plus one column for its category
+    (weighted by CATEGORY_WEIGHT); overlaps for a block of posts against all
+    posts come from one sparse matrix product. Returns the number of rows written.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    posts = list(Post.objects.filter(is_canceled=False).values_list('id', 'category_id'))
+    if not posts:
+        PostNeighbour.objects.all().delete()
+        return 0
+
+    post_ids = np.array([post_id for post_id, _ in posts], dtype=np.int64)
+    row_of = {post_id: row for row, post_id in enumerate(post_ids.tolist())}
+    links = Post.tags.through.objects.filter(post_id__in=row_of).values_list('post_id', 'tag_id')
+
+    tag_col, rows, cols, weights = {}, [], [], []
+    for post_id, tag_id in links.iterator(chunk_size=10000):
+        rows.append(row_of[post_id])
+        cols.append(tag_col.setdefault(tag_id, len(tag_col)))
+        weights.append(1.0)
+    category_col = {}
+    for row, (_, category_id) in enumerate(posts):
+        if category_id is not None:
+            rows.append(row)
+            cols.append(len(tag_col) + category_col.setdefault(category_id, len(category_col)))
+            weights.append(CATEGORY_WEIGHT)
+
+    shape = (len(posts), len(tag_col) + len(category_col))
+    weighted = sparse.csr_matrix((np.array(weights), (rows, cols)), shape=shape)
+    binary = weighted.copy()
+    binary.data[:] = 1.0
+    weighted_t = weighted.T.tocsr()
+    sizes = np.asarray(weighted.sum(axis=1)).ravel()
+    norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+
+    neighbours = []
+    for start in range(0, len(posts), BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, len(posts))
+        if metric == 'cosine':
+            block = (weighted[start:stop] @ weighted_t).tocsr()
+        else:
+            block = (binary[start:stop] @ weighted_t).tocsr()
+
+        counts = np.diff(block.indptr)
+        block_rows = np.repeat(np.arange(start, stop), counts)
+        block_cols = block.indices
+        shared = block.data
+        if metric == 'cosine':
+            scores = shared / (norms[block_rows] * norms[block_cols])
+        else:
+            scores = shared / (sizes[block_rows] + sizes[block_cols] - shared)
+        scores[block_rows == block_cols] = -1.0
+
+        for offset in range(stop - start):
+            lo, hi = block.indptr[offset], block.indptr[offset + 1]
+            if hi - lo <= 1:
+                continue
+            row_scores = scores[lo:hi]
+            k = min(top_k, hi - lo - 1)
+            best = np.argpartition(-row_scores, k - 1)[:k]
+            best = best[np.argsort(-row_scores[best], kind='stable')]
+            post_id = int(post_ids[start + offset])
+            for rank, index in enumerate(best):
+                if row_scores[index] > 0:
+                    neighbours.append(PostNeighbour(
+                        post_id=post_id,
+                        neighbour_id=int(post_ids[block_cols[lo + index]]),
+                        score=float(row_scores[index]),
+                        rank=rank,
+                    ))
+
+    with transaction.atomic():
+        PostNeighbour.objects.all().delete()
+        PostNeighbour.objects.bulk_create(neighbours, batch_size=2000)
+    return len(neighbours)
+
+
+def _similarity(metric, shared, size_a, size_b, shared_sq, norm_sq_a, norm_sq_b):
+    if metric == 'cosine':
+        return shared_sq / math.sqrt(norm_sq_a * norm_sq_b) if norm_sq_a and norm_sq_b else 0.0
+    union = size_a + size_b - shared
+    return shared / union if union else 0.0
+
+
+def _rewrite(post_id, ranked, top_k):
+    PostNeighbour.objects.filter(post_id=post_id).delete()
+    PostNeighbour.objects.bulk_create(
+        PostNeighbour(post_id=post_id, neighbour_id=neighbour_id, score=score, rank=rank)
+        for rank, (score, neighbour_id) in enumerate(ranked[:top_k])
+    )
+
+
+def update_post(post_id, top_k=TOP_K, metric='jaccard'):
+    """
+    Compute neighbours for one post without a full rebuild, using the same
+    weighting as `build_index`, and slot the post into the lists of the posts
+    it is closest to.
+    """
+    through = Post.tags.through
+    own_tags = through.objects.filter(post_id=post_id).values('tag_id')
+    shared_tags = dict(
+        through.objects.filter(tag_id__in=own_tags).exclude(post_id=post_id)
+        .values('post_id').annotate(n=Count('id')).order_by('-n')
+        .values_list('post_id', 'n')[:TAG_CANDIDATES]
+    )
+    candidates = set(shared_tags)
+    category_id = Post.objects.filter(pk=post_id).values_list('category_id', flat=True).first()
+    if category_id is not None:
+        candidates.update(
+            Post.objects.filter(category_id=category_id).exclude(pk=post_id)
+            .order_by('-created_at').values_list('id', flat=True)[:CATEGORY_CANDIDATES]
+        )
+
+    info = {
+        pk: (category, n_tags)
+        for pk, category, n_tags in Post.objects.filter(id__in=candidates | {post_id}, is_canceled=False)
+        .annotate(n_tags=Count('tags')).values_list('id', 'category_id', 'n_tags')
+    }
+    if post_id not in info:
+        PostNeighbour.objects.filter(post_id=post_id).delete()
+        return
+
+    def vector(pk):
+        category, n_tags = info[pk]
+        has_category = category is not None
+        return (n_tags + (CATEGORY_WEIGHT if has_category else 0),
+                n_tags + (CATEGORY_WEIGHT ** 2 if has_category else 0))
+
+    own_size, own_norm_sq = vector(post_id)
+    scored = []
+    for candidate in candidates & info.keys():
+        size, norm_sq = vector(candidate)
+        same_category = category_id is not None and info[candidate][0] == category_id
+        tags = shared_tags.get(candidate, 0)
+        score = _similarity(
+            metric,
+            tags + (CATEGORY_WEIGHT if same_category else 0), own_size, size,
+            tags + (CATEGORY_WEIGHT ** 2 if same_category else 0), own_norm_sq, norm_sq,
+        )
+        if score > 0:
+            scored.append((score, candidate))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+
+    with transaction.atomic():
+        _rewrite(post_id, scored, top_k)
+
+        # Similarity is symmetric: offer this post to its closest candidates,
+        # replacing their weakest neighbour when it scores higher.
+        closest = {candidate: score for score, candidate in scored[:top_k * 10]}
+        current = {}
+        for row in PostNeighbour.objects.filter(post_id__in=closest).order_by('post_id', 'rank'):
+            current.setdefault(row.post_id, []).append((row.score, row.neighbour_id))
+
+        for candidate, score in closest.items():
+            listed = current.get(candidate, [])
+            ranked = [item for item in listed if item[1] != post_id]
+            if len(ranked) == len(listed) and len(ranked) >= top_k and ranked[top_k - 1][0] >= score:
+                continue
+            ranked.append((score, post_id))
+            ranked.sort(key=lambda item: (-item[0], item[1]))
+            _rewrite(candidate, ranked, top_k)
+
+
+def _run():
+    while True:
+        post_id = _queue.get()
+        close_old_connections()
+        try:
+            update_post(post_id)
+        except Exception:
+            logger.exception("Updating the neighbours of post %s failed", post_id)
+        finally:
+            _queue.task_done()
+
+
+def _enqueue(post_id):
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name='post-similarity', daemon=True)
+            _worker.start()
+    _queue.put(post_id)
+
+
+def remove_posts(post_ids):
+    """
+    Take canceled posts out of the neighbours table: their own lists and
+    every list they appear in. The posts that lost a neighbour are
+    recomputed in the background once the transaction commits.
+    """
+    rows = PostNeighbour.objects.filter(neighbour_id__in=post_ids)
+    affected = set(rows.values_list('post_id', flat=True)) - set(post_ids)
+    rows.delete()
+    PostNeighbour.objects.filter(post_id__in=post_ids).delete()
+
+    def refill():
+        for post_id in sorted(affected):
+            _enqueue(post_id)
+
+    if affected:
+        transaction.on_commit(refill)
+    return affected
+
+
+def schedule_update(post):
+    """
+    Update the post's neighbours in a background worker once the current
+    transaction commits, so saving a post neither waits for nor fails with
+    it. Posts a lost update misses are picked up by the next `build_index`.
+    """
+    transaction.on_commit(lambda: _enqueue(post.pk))
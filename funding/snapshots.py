@@ -0,0 +1,182 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ArchivedDonation, Category, Donation, Post
+
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+# Stored for null foreign keys and times.
+MISSING = -1
+# Donations younger than this are left for the next run, so rows whose
+# transaction commits after a higher id was already snapshotted are not skipped.
+SETTLE = timedelta(minutes=5)
+
+DONATION_COLUMNS = ('id', 'post_id', 'user_id', 'amount_cents', 'created_at')
+POST_COLUMNS = ('id', 'category_id', 'author_id', 'target_cents', 'created_at', 'end_time', 'is_canceled')
+
+
+def _epoch(value):
+    return int(value.timestamp()) if value is not None else MISSING
+
+
+def _cents(value):
+    return int((value * 100).to_integral_value())
+
+
+def empty_manifest():
+    return {
+        'version': FORMAT_VERSION,
+        'generated_at': None,
+        'donations': {'last_id': 0, 'rows': 0, 'chunks': []},
+        'posts': {'rows': 0, 'chunk': None},
+        'categories': {},
+    }
+
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return empty_manifest()
+    if manifest.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Snapshot format {manifest.get('version')} is not supported; rebuild it with --full.")
+    return manifest
+
+
+def _write_manifest(directory, manifest):
+    fd, path = tempfile.mkstemp(dir=directory, prefix='.manifest-')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path, os.path.join(directory, MANIFEST))
+
+
+def _write_chunk(directory, name, columns, rows):
+    """Write one column per .npy file into `directory/name`, appearing all at once."""
+    data = np.array(rows, dtype=np.int64).reshape(len(rows), len(columns))
+    staging = tempfile.mkdtemp(dir=directory, prefix='.chunk-')
+    for position, column in enumerate(columns):
+        np.save(os.path.join(staging, f'{column}.npy'), np.ascontiguousarray(data[:, position]))
+    os.replace(staging, os.path.join(directory, name))
+
+
+def _donation_rows(queryset, after, limit):
+    rows = queryset.filter(id__gt=after).order_by('id').values_list('id', 'post_id', 'user_id', 'amount', 'created_at')
+    return [
+        (pk, post_id, MISSING if user_id is None else user_id, _cents(amount), _epoch(created_at))
+        for pk, post_id, user_id, amount, created_at in rows[:limit]
+    ]
+
+
+def snapshot_donations(directory, manifest, database, chunk_size):
+    """
+    Append donations (live and archived; archived rows keep their ids) with
+    ids above the manifest's watermark as new chunks. Returns the rows added.
+    """
+    cutoff = timezone.now() - SETTLE
+    querysets = [
+        model.objects.using(database).filter(created_at__lt=cutoff) for model in (Donation, ArchivedDonation)
+    ]
+    added = 0
+    while True:
+        last_id = manifest['donations']['last_id']
+        rows = sorted(row for queryset in querysets for row in _donation_rows(queryset, last_id, chunk_size))[:chunk_size]
+        if not rows:
+            return added
+        name = f'donations-{rows[0][0]:012d}-{rows[-1][0]:012d}'
+        _write_chunk(directory, name, DONATION_COLUMNS, rows)
+        manifest['donations']['chunks'].append(name)
+        manifest['donations']['last_id'] = rows[-1][0]
+        manifest['donations']['rows'] += len(rows)
+        # Saved after every chunk, so an interrupted run resumes where it stopped.
+        _write_manifest(directory, manifest)
+        added += len(rows)
+
+
+def snapshot_posts(directory, manifest, database):
+    """Rewrite the posts table; posts change (category, end time, cancellation) and are few."""
+    rows = [
+        (pk, MISSING if category_id is None else category_id, author_id, _cents(target),
+         _epoch(created_at), _epoch(end_time), int(is_canceled))
+        for pk, category_id, author_id, target, created_at, end_time, is_canceled in
+        Post.objects.using(database).order_by('id').values_list(
+            'id', 'category_id', 'author_id', 'target_amount', 'created_at', 'end_time', 'is_canceled',
+        ).iterator(chunk_size=5000)
+    ]
+    previous = manifest['posts']['chunk']
+    name = f'posts-{timezone.now():%Y%m%d%H%M%S%f}'
+    _write_chunk(directory, name, POST_COLUMNS, rows)
+    manifest['posts'] = {'rows': len(rows), 'chunk': name}
+    manifest['categories'] = {
+        str(pk): name for pk, name in Category.objects.using(database).values_list('id', 'name')
+    }
+    return previous
+
+
+def write_snapshot(directory=None, database='default', chunk_size=None, full=False):
+    """
+    Bring the columnar snapshot in `directory` up to date: new donations are
+    appended as .npy chunks, posts and categories are rewritten. Donations
+    edited or deleted after they were snapshotted are only picked up by a
+    `full` rebuild. Returns the manifest.
+    """
+    directory = directory or settings.ANALYTICS_SNAPSHOT_DIR
+    chunk_size = chunk_size or settings.ANALYTICS_CHUNK_ROWS
+    os.makedirs(directory, exist_ok=True)
+    if full:
+        remove_snapshot(directory)
+
+    manifest = read_manifest(directory)
+    added = snapshot_donations(directory, manifest, database, chunk_size)
+    previous_posts = snapshot_posts(directory, manifest, database)
+    manifest['generated_at'] = timezone.now().isoformat()
+    _write_manifest(directory, manifest)
+    if previous_posts:
+        shutil.rmtree(os.path.join(directory, previous_posts), ignore_errors=True)
+    manifest['added'] = added
+    return manifest
+
+
+def remove_snapshot(directory):
+    """Delete the chunks and manifest of a snapshot, leaving anything else in `directory` alone."""
+    try:
+        manifest = read_manifest(directory)
+    except ValueError:
+        return
+    for chunk in manifest['donations']['chunks'] + [manifest['posts']['chunk']]:
+        if chunk:
+            shutil.rmtree(os.path.join(directory, chunk), ignore_errors=True)
+    if os.path.exists(os.path.join(directory, MANIFEST)):
+        os.remove(os.path.join(directory, MANIFEST))
+
+
+class Snapshot:
+    """Columns of a snapshot as NumPy arrays, memory-mapped from the chunk files."""
+
+    def __init__(self, directory=None):
+        self.directory = directory or settings.ANALYTICS_SNAPSHOT_DIR
+        self.manifest = read_manifest(self.directory)
+        if self.manifest['posts']['chunk'] is None:
+            raise FileNotFoundError(f"No snapshot in {self.directory}; run snapshot_analytics first.")
+        self.categories = {int(pk): name for pk, name in self.manifest['categories'].items()}
+        self.posts = self._load([self.manifest['posts']['chunk']], POST_COLUMNS)
+        self.donations = self._load(self.manifest['donations']['chunks'], DONATION_COLUMNS)
+
+    def _load(self, chunks, columns):
+        loaded = {}
+        for column in columns:
+            parts = [np.load(os.path.join(self.directory, chunk, f'{column}.npy'), mmap_mode='r') for chunk in chunks]
+            if not parts:
+                loaded[column] = np.empty(0, dtype=np.int64)
+            elif len(parts) == 1:
+                loaded[column] = parts[0]
+            else:
+                loaded[column] = np.concatenate(parts)
+        return loaded
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.core.files import locks
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+BLOB_PREFIX = 'blobs'
+BLOB_NAME_RE = re.compile(r'^blobs/[0-9a-f]{2}/[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})(\.[a-z0-9]{1,10})?$')
+
+
+def blob_digest(name):
+    match = BLOB_NAME_RE.match(name or '')
+    return match.group('digest') if match else None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File storage that keeps every unique file once, named by its SHA-256.
+
+    Saving a file that is already stored just bumps the reference count of its
+    `MediaBlob`; deleting a blob name releases one reference and removes the
+    file once nothing points at it any more.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Names are derived from content, so they never need de-duplicating.
+        return name
+
+    def blob_name(self, digest, original_name):
+        ext = os.path.splitext(original_name)[1].lower()
+        if not re.fullmatch(r'\.[a-z0-9]{1,10}', ext):
+            ext = ''
+        return f'{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+    @contextmanager
+    def lock(self):
+        # Serializes the reference-count/file bookkeeping (not the hashing)
+        # across threads and processes sharing this MEDIA_ROOT.
+        os.makedirs(self.path(BLOB_PREFIX), exist_ok=True)
+        with open(self.path(f'{BLOB_PREFIX}/.lock'), 'a') as lock_file:
+            # django.core.files.locks picks fcntl or the Windows API.
+            locks.lock(lock_file, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock_file)
+
+    def _save(self, name, content):
+        os.makedirs(self.path(BLOB_PREFIX), exist_ok=True)
+        sha = hashlib.sha256()
+        size = 0
+
+        # Hash while copying to a temp file so the upload is only read once.
+        with tempfile.NamedTemporaryFile(dir=self.path(BLOB_PREFIX), prefix='.tmp-', delete=False) as tmp:
+            if hasattr(content, 'seek'):
+                content.seek(0)
+            for chunk in content.chunks():
+                sha.update(chunk)
+                tmp.write(chunk)
+                size += len(chunk)
+
+        digest = sha.hexdigest()
+        name = self.blob_name(digest, name)
+        path = self.path(name)
+        try:
+            with self.lock():
+                self.acquire(digest, name, size)
+                if os.path.exists(path):
+                    os.remove(tmp.name)
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(tmp.name, path)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(path, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(tmp.name):
+                os.remove(tmp.name)
+            raise
+        return name
+
+    def acquire(self, digest, name, size):
+        MediaBlob = apps.get_model('funding', 'MediaBlob')
+        updated = MediaBlob.objects.filter(digest=digest).update(
+            refcount=F('refcount') + 1, updated_at=timezone.now()
+        )
+        if not updated:
+            try:
+                with transaction.atomic():
+                    MediaBlob.objects.create(digest=digest, name=name, size=size, refcount=1)
+            except IntegrityError:
+                MediaBlob.objects.filter(digest=digest).update(refcount=F('refcount') + 1)
+
+    def release(self, name):
+        """
+        Drop one reference to a blob, deleting the file when it was the last.
+        Names that are not blobs (legacy uploads) are left alone.
+        """
+        digest = blob_digest(name)
+        if digest is None:
+            return
+        MediaBlob = apps.get_model('funding', 'MediaBlob')
+        with self.lock():
+            MediaBlob.objects.filter(digest=digest, refcount__gt=0).update(
+                refcount=F('refcount') - 1, updated_at=timezone.now()
+            )
+            if MediaBlob.objects.filter(digest=digest, refcount=0).delete()[0]:
+                self.delete_file(name)
+
+    def delete_file(self, name):
+        super().delete(name)
+
+    def delete(self, name):
+        if blob_digest(name) is None:
+            self.delete_file(name)
+        else:
+            self.release(name)
+
+
+media_storage_instance = ContentAddressedStorage()
+
+
+def media_storage():
+    return media_storage_instance
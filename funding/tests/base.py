@@ -0,0 +1,81 @@
+import io
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from account.models import User
+from funding.models import Donation, Post
+
+
+def image_file(name='photo.png', color='red', size=(4, 4)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class FundingFixtureMixin:
+    """A campaign author, a donor and one of the author's campaigns."""
+    client_class = APIClient
+
+    @classmethod
+    def setUpClass(cls):
+        # Counted views are flushed by a background thread and at exit, by
+        # then against the development database; test_counters drives the
+        # shared counters directly instead.
+        cls.enterClassContext(mock.patch('funding.counters.record_view'))
+        super().setUpClass()
+
+    @classmethod
+    def create_fixture(cls):
+        cls.author = User.objects.create(username='author', email='author@rafiq.local')
+        cls.donor = User.objects.create(username='donor', email='donor@rafiq.local')
+        cls.post = cls.create_post()
+
+    @classmethod
+    def create_post(cls, title="Campaign", author=None, **fields):
+        fields.setdefault('content', "-")
+        fields.setdefault('target_amount', Decimal('100'))
+        return Post.objects.create(title=title, author=author or cls.author, **fields)
+
+    def donate(self, amount='10.00', post=None, user=None):
+        return Donation.objects.create(post=post or self.post, user=user or self.donor, amount=Decimal(amount))
+
+
+class TemporaryMediaMixin:
+    """Points MEDIA_ROOT and RESUMABLE_UPLOAD_DIR at a temporary directory removed after the class."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.media_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(
+            MEDIA_ROOT=cls.media_root, RESUMABLE_UPLOAD_DIR=os.path.join(cls.media_root, 'uploads_tmp'),
+        ))
+        super().setUpClass()
+
+
+class FundingTestCase(FundingFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixture()
+
+
+class FundingTransactionTestCase(FundingFixtureMixin, TransactionTestCase):
+    """
+    For code that writes from other threads (the upload pool, the ingest
+    writer), whose connections can't see a TestCase's open transaction.
+    Commits run their on_commit hooks here, so the feed and similarity
+    workers are kept from racing the table flush between tests.
+    """
+
+    def setUp(self):
+        for worker in ('funding.feed._enqueue', 'funding.similarity._enqueue'):
+            self.enterContext(mock.patch(worker))
+        self.create_fixture()
@@ -0,0 +1,49 @@
+from unittest import mock
+
+from django.contrib.admin.sites import site
+from django.test import RequestFactory
+
+from funding.models import Donation, Post, PostNeighbour
+
+from .base import FundingTestCase
+
+
+class LargeTableSearchTests(FundingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.posts = [cls.create_post(title) for title in ("Water well", "water pump", "Waterproof tents")]
+
+    def search(self, model, term):
+        queryset, _ = site._registry[model].get_search_results(RequestFactory().get('/'), model.objects.all(), term)
+        return set(queryset)
+
+    def test_prefix_search_is_case_sensitive(self):
+        self.assertEqual(self.search(Post, 'Water'), {self.posts[0], self.posts[2]})
+        self.assertEqual(self.search(Post, '"Water w"'), {self.posts[0]})
+
+    def test_exact_lookups_skip_terms_of_the_wrong_type(self):
+        donation = self.donate('5', post=self.posts[0])
+        self.assertEqual(self.search(Post, str(self.posts[1].pk)), {self.posts[1]})
+        self.assertEqual(self.search(Donation, 'donor@rafiq.local'), {donation})
+        self.assertEqual(self.search(Donation, str(self.posts[0].pk)), {donation})
+        self.assertEqual(self.search(Donation, 'donor'), set())
+
+
+class CancelCampaignsActionTests(FundingTestCase):
+    def test_canceled_campaigns_leave_the_neighbours_table(self):
+        other = self.create_post("Other")
+        PostNeighbour.objects.bulk_create([
+            PostNeighbour(post=self.post, neighbour=other, score=0.9, rank=0),
+            PostNeighbour(post=other, neighbour=self.post, score=0.9, rank=0),
+        ])
+        post_admin = site._registry[Post]
+        post_admin.message_user = mock.Mock()
+
+        with mock.patch('funding.similarity._enqueue'), mock.patch('funding.typeahead.invalidate') as invalidate, \
+                self.captureOnCommitCallbacks(execute=True):
+            post_admin.cancel_campaigns(RequestFactory().post('/'), Post.objects.filter(pk=other.pk))
+
+        self.assertTrue(Post.objects.get(pk=other.pk).is_canceled)
+        self.assertFalse(PostNeighbour.objects.exists())
+        invalidate.assert_called()
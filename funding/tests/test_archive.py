@@ -0,0 +1,94 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from funding import archive, leaderboards
+from funding.models import ArchivedComment, ArchivedDonation, ArchivedRating, Comment, Donation, Post, Rating
+
+from .base import FundingTestCase
+
+
+class ArchiveTests(FundingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        long_ago = timezone.now() - timedelta(days=400)
+        Post.objects.filter(pk=cls.post.pk).update(end_time=long_ago)
+        cls.post.end_time = long_ago
+
+    def fill(self):
+        self.donate('30')
+        self.donate('20')
+        comment = Comment.objects.create(post=self.post, user=self.donor, content="Good luck")
+        Comment.objects.create(post=self.post, user=self.author, parent=comment, content="Thanks")
+        Rating.objects.create(post=self.post, user=self.donor, value=4)
+        Rating.objects.create(post=self.post, user=self.author, value=5)
+
+    def test_only_campaigns_that_ended_long_ago_are_archivable(self):
+        recent = self.create_post("Recent", end_time=timezone.now() - timedelta(days=10))
+        canceled = self.create_post("Canceled", is_canceled=True)
+        Post.objects.filter(pk=canceled.pk).update(created_at=timezone.now() - timedelta(days=400))
+        archived = self.create_post("Archived", end_time=self.post.end_time, archived_at=timezone.now())
+
+        self.assertEqual(list(archive.archivable_posts()), [self.post, canceled])
+        self.assertNotIn(recent, archive.archivable_posts())
+        self.assertNotIn(archived, archive.archivable_posts())
+
+    def test_rows_move_in_chunks_and_totals_are_kept(self):
+        self.fill()
+        before = Post.objects.get(pk=self.post.pk)
+        amount, rating = before.current_amount, before.average_rating
+
+        moved = archive.archive_post(self.post, chunk_size=1)
+
+        self.assertEqual(moved, {'donations': 2, 'comments': 2, 'ratings': 2})
+        self.assertFalse(Donation.objects.exists() or Comment.objects.exists() or Rating.objects.exists())
+        self.assertEqual((ArchivedDonation.objects.count(), ArchivedComment.objects.count(), ArchivedRating.objects.count()), (2, 2, 2))
+        after = Post.objects.get(pk=self.post.pk)
+        self.assertIsNotNone(after.archived_at)
+        self.assertEqual((after.current_amount, after.average_rating), (amount, rating))
+        self.assertEqual(ArchivedComment.objects.get(content="Thanks").parent_id, ArchivedComment.objects.get(content="Good luck").pk)
+
+    def test_new_rows_are_counted_with_the_archive(self):
+        self.fill()
+        archive.archive_post(self.post)
+        self.donate('50')
+
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.current_amount, Decimal('100'))
+        self.assertEqual(post.funding_percentage, Decimal('100.00'))
+
+    def test_leaderboards_still_match_after_archiving(self):
+        with self.captureOnCommitCallbacks():
+            leaderboards.record_donations([self.donate('30'), self.donate('20')])
+        archive.archive_post(self.post)
+
+        self.assertEqual(leaderboards.rebuild_leaderboards(), [])
+
+    def test_archived_rows_are_still_served(self):
+        self.fill()
+        archive.archive_post(self.post)
+        self.donate('5')
+        self.client.force_authenticate(self.author)
+
+        detail = self.client.get(f'/funding/posts/{self.post.pk}/').json()
+        self.assertEqual([donation['amount'] for donation in detail['donations']], ['30.00', '20.00', '5.00'])
+        self.assertEqual([comment['content'] for comment in detail['comments']], ["Good luck"])
+        self.assertEqual(detail['comments'][0]['replies'][0]['content'], "Thanks")
+
+        comments = self.client.get('/funding/comments/', {'post_id': self.post.pk}).json()
+        self.assertEqual([comment['content'] for comment in comments['results']], ["Good luck"])
+
+    def test_command_archives_and_supports_a_dry_run(self):
+        self.fill()
+        out = StringIO()
+        call_command('archive_campaigns', '--dry-run', stdout=out)
+        self.assertIn(f"Would archive post {self.post.pk}", out.getvalue())
+        self.assertEqual(Donation.objects.count(), 2)
+
+        call_command('archive_campaigns', stdout=StringIO())
+        self.assertFalse(Donation.objects.exists())
+        self.assertFalse(archive.archivable_posts().exists())
@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from funding import archive
+from funding.models import Comment, Rating
+
+from .base import FundingTestCase
+
+
+class PostBatchTests(FundingTestCase):
+    url = '/funding/posts/batch/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.posts = [cls.post] + [cls.create_post(f"Campaign {i}") for i in range(1, 6)]
+
+    def setUp(self):
+        self.client.force_authenticate(self.donor)
+        for post in self.posts:
+            self.donate('10', post=post)
+            comment = Comment.objects.create(post=post, user=self.donor, content="Go")
+            Comment.objects.create(post=post, user=self.author, parent=comment, content="Thanks")
+            Rating.objects.create(post=post, user=self.donor, value=4)
+
+    def batch(self, ids):
+        return self.client.get(self.url, {'ids': ','.join(str(post_id) for post_id in ids)})
+
+    def test_posts_follow_the_requested_order_and_unknown_ids_are_listed(self):
+        missing = self.posts[-1].pk + 100
+        response = self.batch([self.posts[2].pk, self.posts[0].pk, missing, self.posts[2].pk])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([post['id'] for post in response.json()['results']], [self.posts[2].pk, self.posts[0].pk])
+        self.assertEqual(response.json()['missing'], [missing])
+
+    def test_batch_matches_the_detail_endpoint(self):
+        archive.archive_post(self.posts[1])
+        self.donate('5', post=self.posts[1])
+
+        results = self.batch([post.pk for post in self.posts[:3]]).json()['results']
+
+        for post, result in zip(self.posts, results):
+            with self.subTest(post=post.pk):
+                self.assertEqual(result, self.client.get(f'/funding/posts/{post.pk}/').json())
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        def queries(posts):
+            cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                self.assertEqual(self.batch([post.pk for post in posts]).status_code, 200)
+            return len(captured)
+
+        self.assertEqual(queries(self.posts[:2]), queries(self.posts))
+
+    @override_settings(POST_BATCH_MAX_IDS=3)
+    def test_bad_id_lists_are_rejected(self):
+        for ids in ('', '1,x', '1,2,3,4'):
+            with self.subTest(ids=ids):
+                self.assertEqual(self.client.get(self.url, {'ids': ids}).status_code, 400)
@@ -0,0 +1,112 @@
+import gzip
+import json
+import os
+import unittest
+from unittest import mock
+
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from project import middleware
+from project.middleware import CompressedCache, CompressionMiddleware, choose_encoding
+
+from .base import FundingTestCase
+
+PAYLOAD = {'results': [{'id': i, 'title': f"Campaign {i}", 'content': "Clean water for the village"} for i in range(100)]}
+
+
+class EncodingNegotiationTests(SimpleTestCase):
+    def test_gzip_when_brotli_is_unavailable(self):
+        with mock.patch.object(middleware, 'brotli', None):
+            self.assertEqual(choose_encoding('gzip, deflate, br'), 'gzip')
+            self.assertEqual(choose_encoding('*'), 'gzip')
+            self.assertIsNone(choose_encoding('br'))
+            self.assertIsNone(choose_encoding('gzip;q=0'))
+            self.assertIsNone(choose_encoding('*, gzip;q=0'))
+            self.assertIsNone(choose_encoding('identity'))
+            self.assertIsNone(choose_encoding(''))
+
+    @unittest.skipIf(middleware.brotli is None, "brotli is not installed")
+    def test_brotli_wins_ties_but_not_lower_quality(self):
+        self.assertEqual(choose_encoding('gzip, br'), 'br')
+        self.assertEqual(choose_encoding('gzip, br;q=0.5'), 'gzip')
+
+    def test_malformed_quality_values_are_skipped(self):
+        self.assertEqual(middleware.accepted_encodings('GZIP;q=0.8, br;q=0.5.1'), {'gzip': 0.8})
+
+
+class CompressedCacheTests(SimpleTestCase):
+    def test_least_recently_used_entries_are_evicted_by_size(self):
+        cache = CompressedCache(max_bytes=10)
+        cache.set('a', b'1234')
+        cache.set('b', b'1234')
+        cache.get('a')
+        cache.set('c', b'1234')
+        cache.set('huge', b'x' * 11)
+
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c'), cache.get('huge')), (b'1234', None, b'1234', None))
+        self.assertEqual(cache.size, 8)
+
+
+@override_settings(COMPRESSION_MIN_SIZE=200)
+class CompressionMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.enterContext(mock.patch.object(middleware, 'brotli', None))
+        self.request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+
+    def process(self, response, request=None):
+        return CompressionMiddleware(lambda request: response)(request or self.request)
+
+    def test_large_json_is_gzipped(self):
+        response = self.process(JsonResponse(PAYLOAD, headers={'ETag': '"v1"'}))
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(response['ETag'], 'W/"v1"')
+        self.assertEqual(json.loads(gzip.decompress(response.content)), PAYLOAD)
+
+    def test_clients_without_gzip_get_the_plain_body_but_a_vary_header(self):
+        plain = JsonResponse(PAYLOAD).content
+        response = self.process(JsonResponse(PAYLOAD), RequestFactory().get('/'))
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response.content, plain)
+
+    def test_responses_that_should_not_be_compressed_are_left_alone(self):
+        body = json.dumps(PAYLOAD).encode()
+        responses = {
+            'small': JsonResponse({'id': 1}),
+            'encoded': HttpResponse(gzip.compress(body), content_type='application/json', headers={'Content-Encoding': 'gzip'}),
+            'binary': HttpResponse(body, content_type='image/png'),
+            'incompressible': HttpResponse(os.urandom(4096), content_type='text/plain'),
+            'streaming': StreamingHttpResponse(iter([body]), content_type='application/json'),
+        }
+        for name, response in responses.items():
+            with self.subTest(name):
+                encoding = response.get('Content-Encoding')
+                self.assertEqual(self.process(response).get('Content-Encoding'), encoding)
+
+    def test_identical_bodies_are_compressed_once(self):
+        handler = CompressionMiddleware(lambda request: JsonResponse(PAYLOAD))
+        with mock.patch.object(middleware, 'compress', wraps=middleware.compress) as compress:
+            first, second = handler(self.request), handler(self.request)
+
+        compress.assert_called_once()
+        self.assertEqual(first.content, second.content)
+
+
+class CompressionEndpointTests(FundingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for i in range(20):
+            cls.create_post(f"Campaign {i}", content="Clean water for the village " * 5)
+
+    def test_list_responses_are_compressed_end_to_end(self):
+        response = self.client.get('/funding/posts/', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['results']), 12)
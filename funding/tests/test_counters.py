@@ -0,0 +1,57 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+
+from funding import counters
+from funding.models import Post
+from funding.serializers import PostSerializer
+
+from .base import FundingTestCase
+
+
+class PostViewCountTests(FundingTestCase):
+    def tearDown(self):
+        cache.delete(counters.LOCK_KEY)
+
+    def test_editing_a_post_keeps_views_flushed_meanwhile(self):
+        instance = Post.objects.get(pk=self.post.pk)
+        Post.objects.filter(pk=self.post.pk).update(views=5)
+
+        serializer = PostSerializer(instance, data={'title': "Renamed"}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.title, self.post.views), ("Renamed", 5))
+
+    def test_flush_leaves_a_lock_taken_after_its_own_expired(self):
+        cache.set(counters.KEY.format(self.post.pk), 3, None)
+
+        def expire_and_take_over(keys):
+            # The flush outlived VIEW_FLUSH_LOCK_TIMEOUT and another process took the lock.
+            cache.set(counters.LOCK_KEY, 'other', 60)
+            return cache.get_many(keys)
+
+        with mock.patch('funding.counters.cache', mock.Mock(wraps=cache)) as shared:
+            shared.get_many.side_effect = expire_and_take_over
+            self.assertEqual(counters.flush([self.post.pk]), 3)
+        self.assertEqual(cache.get(counters.LOCK_KEY), 'other')
+
+        cache.delete(counters.LOCK_KEY)
+        cache.set(counters.KEY.format(self.post.pk), 2, None)
+        self.assertEqual(counters.flush([self.post.pk]), 2)
+        self.assertIsNone(cache.get(counters.LOCK_KEY))
+
+    def test_flush_views_fails_while_another_flush_holds_the_lock(self):
+        cache.set(counters.KEY.format(self.post.pk), 3, None)
+        cache.set(counters.LOCK_KEY, 'other', 60)
+        self.assertIsNone(counters.flush([self.post.pk]))
+        with self.assertRaises(CommandError):
+            call_command('flush_views')
+
+        cache.delete(counters.LOCK_KEY)
+        call_command('flush_views', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 3)
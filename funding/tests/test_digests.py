@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.core import mail
+from django.test import override_settings
+from django.utils import timezone
+
+from funding import digests
+from funding.models import DigestPreference, Donation
+
+from .base import FundingTestCase
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class DonationDigestTests(FundingTestCase):
+    def test_second_run_sends_nothing_new(self):
+        self.donate()
+        self.assertEqual(digests.send_digests(), 1)
+        self.assertEqual(digests.send_digests(), 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+        preference = DigestPreference.objects.get(user=self.author)
+        self.assertEqual(preference.last_donation_id, Donation.objects.get().pk)
+
+    def test_new_donation_waits_for_the_window(self):
+        self.donate()
+        now = timezone.now()
+        digests.send_digests(now)
+        self.donate('5.00')
+
+        self.assertEqual(digests.send_digests(now + timedelta(hours=1)), 0)
+        self.assertEqual(digests.send_digests(now + timedelta(days=1)), 1)
+        self.assertEqual(digests.send_digests(now + timedelta(days=2)), 0)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn('1 new donation', mail.outbox[1].subject)
+
+    def test_frequency_is_respected(self):
+        self.donate()
+        now = timezone.now()
+        digests.send_digests(now)
+        DigestPreference.objects.filter(user=self.author).update(frequency=DigestPreference.FREQUENCY_WEEKLY)
+        self.donate()
+
+        self.assertEqual(digests.send_digests(now + timedelta(days=1)), 0)
+        self.assertEqual(digests.send_digests(now + timedelta(days=7)), 1)
+
+    def test_off_sends_nothing(self):
+        DigestPreference.objects.create(user=self.author, frequency=DigestPreference.FREQUENCY_OFF)
+        self.donate()
+        self.assertEqual(digests.send_digests(), 0)
+        self.assertEqual(mail.outbox, [])
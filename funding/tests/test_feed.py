@@ -0,0 +1,17 @@
+from funding import feed
+from funding.models import CampaignEvent
+
+from .base import FundingTestCase
+
+
+class MilestoneTests(FundingTestCase):
+    def test_milestones_crossed_within_a_burst_are_recorded(self):
+        self.donate('20')
+        burst = [self.donate('5') for _ in range(2)]
+
+        # The worker runs after both donations have committed.
+        for donation in burst:
+            feed.check_milestones(self.post.pk, donation.pk, donation.amount)
+
+        milestones = CampaignEvent.objects.filter(post=self.post, verb=CampaignEvent.VERB_MILESTONE)
+        self.assertEqual(list(milestones.values_list('object_id', flat=True)), [25])
@@ -0,0 +1,86 @@
+from datetime import timedelta
+
+from django.test import override_settings
+from django.utils import timezone
+
+from funding import idempotency
+from funding.models import Donation, IdempotencyKey
+
+from .base import FundingTestCase
+
+
+@override_settings(DONATION_GROUP_COMMIT=False)
+class IdempotentDonationTests(FundingTestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.donor)
+
+    def donate_with_key(self, key, amount='10.00'):
+        return self.client.post(
+            '/funding/donations/', {'post': self.post.pk, 'amount': amount},
+            format='json', headers={'Idempotency-Key': key},
+        )
+
+    def test_a_retry_replays_the_first_response(self):
+        first = self.donate_with_key('k1')
+        retry = self.donate_with_key('k1')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((retry.status_code, retry.json()), (201, first.json()))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Donation.objects.count(), 1)
+
+    def test_reusing_a_key_for_another_request_is_rejected(self):
+        self.donate_with_key('k1')
+
+        self.assertEqual(self.donate_with_key('k1', amount='99.00').status_code, 422)
+        self.assertEqual(Donation.objects.count(), 1)
+
+    def test_keys_belong_to_one_user(self):
+        self.donate_with_key('k1')
+        self.client.force_authenticate(self.author)
+
+        self.assertNotIn('Idempotent-Replayed', self.donate_with_key('k1'))
+        self.assertEqual(Donation.objects.count(), 2)
+
+    def test_a_failed_request_releases_its_key(self):
+        self.assertEqual(self.donate_with_key('k1', amount='not a number').status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        self.assertEqual(self.donate_with_key('k1').status_code, 201)
+
+    def test_a_retry_while_the_first_request_runs_is_a_conflict(self):
+        self.claim('k1')
+        response = self.donate_with_key('k1')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertFalse(Donation.objects.exists())
+
+    def test_a_stale_lock_is_taken_over(self):
+        self.claim('k1', locked_at=timezone.now() - timedelta(minutes=5))
+
+        self.assertEqual(self.donate_with_key('k1').status_code, 201)
+        self.assertEqual(Donation.objects.count(), 1)
+
+    def test_expired_keys_are_reusable_and_pruned(self):
+        self.donate_with_key('k1')
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertNotIn('Idempotent-Replayed', self.donate_with_key('k1', amount='20.00'))
+        self.assertEqual(Donation.objects.count(), 2)
+
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(idempotency.prune(), 1)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_key_length_is_checked(self):
+        self.assertEqual(self.donate_with_key('k' * 256).status_code, 400)
+
+    def claim(self, key, locked_at=None):
+        # A request with the same body that holds the key and hasn't finished.
+        first = self.donate_with_key(key)
+        Donation.objects.all().delete()
+        IdempotencyKey.objects.update(
+            status_code=None, response=None, locked_at=locked_at or timezone.now(),
+        )
+        return first
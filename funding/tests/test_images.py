@@ -0,0 +1,64 @@
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from funding.models import Category, PostImage
+
+from .base import FundingTransactionTestCase, TemporaryMediaMixin, image_file
+
+
+class BulkImageUploadTests(TemporaryMediaMixin, FundingTransactionTestCase):
+    url = '/funding/post-images/bulk/'
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.author)
+
+    def upload(self, *files, post=None):
+        return self.client.post(self.url, {'post': (post or self.post).pk, 'images': list(files)}, format='multipart')
+
+    def test_all_images_are_created(self):
+        response = self.upload(image_file('a.png', 'red'), image_file('b.png', 'blue'))
+
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(len(response.json()['created']), 2)
+        self.assertEqual(response.json()['errors'], [])
+        self.assertEqual(PostImage.objects.filter(post=self.post).count(), 2)
+
+    def test_rejected_files_are_reported_by_index(self):
+        not_an_image = SimpleUploadedFile('notes.png', b'plain text', content_type='image/png')
+        response = self.upload(image_file(), not_an_image)
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(len(response.json()['created']), 1)
+        self.assertEqual([(error['index'], error['name']) for error in response.json()['errors']], [(1, 'notes.png')])
+        self.assertEqual(PostImage.objects.filter(post=self.post).count(), 1)
+
+    def test_nothing_valid_is_a_bad_request(self):
+        response = self.upload(SimpleUploadedFile('notes.png', b'plain text', content_type='image/png'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PostImage.objects.exists())
+
+    def test_only_the_author_can_add_images(self):
+        self.client.force_authenticate(self.donor)
+        response = self.upload(image_file())
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('post', response.json())
+        self.assertFalse(PostImage.objects.exists())
+
+
+class PostCreateWithImagesTests(TemporaryMediaMixin, FundingTransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.author)
+
+    def create(self, *files):
+        category = Category.objects.create(name="Water")
+        data = {'title': "New", 'content': "-", 'target_amount': '50', 'category_id': category.pk, 'images': list(files)}
+        return self.client.post('/funding/posts/', data, format='multipart')
+
+    def test_post_and_images_are_created_together(self):
+        response = self.create(image_file('a.png', 'red'), image_file('b.png', 'blue'))
+
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(PostImage.objects.filter(post_id=response.json()['id']).count(), 2)
@@ -0,0 +1,74 @@
+from concurrent.futures import Future
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from funding import ingest, leaderboards
+from funding.models import Donation
+
+from .base import FundingTestCase, FundingTransactionTestCase
+
+
+class GroupCommitBatchTests(FundingTestCase):
+    def queued(self, amount='10.00'):
+        return Donation(post=self.post, user=self.donor, amount=Decimal(amount)), Future()
+
+    def test_a_batch_is_written_with_its_side_effects(self):
+        batch = [self.queued('10.00'), self.queued('5.00')]
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            ingest._commit(batch)
+
+        self.assertTrue(all(future.result().pk for _, future in batch))
+        self.assertEqual(Donation.objects.count(), 2)
+        [entry] = leaderboards.top_donors(leaderboards.post_scope(self.post.pk))
+        self.assertEqual((entry.total, entry.donation_count), (Decimal('15.00'), 2))
+        # The feed and the progress stream are notified after the commit.
+        self.assertEqual(len(callbacks), 3)
+
+    def test_a_bad_row_only_fails_its_own_request(self):
+        good, bad = self.queued(), self.queued()
+        bad[0].post_id = None
+
+        with self.assertLogs('funding.ingest', 'WARNING'):
+            ingest._commit([good, bad])
+
+        self.assertEqual(good[1].result().amount, Decimal('10.00'))
+        self.assertIsNotNone(bad[1].exception())
+        self.assertEqual(Donation.objects.count(), 1)
+
+
+class CommitTimeoutTests(SimpleTestCase):
+    def test_the_outcome_of_a_late_commit_is_reported(self):
+        future, callback = Future(), mock.Mock()
+        ingest.CommitTimeout(future, render=lambda donation: {'id': donation.pk}).when_done(callback)
+
+        future.set_result(Donation(pk=7))
+        callback.assert_called_once_with(201, {'id': 7})
+
+    def test_a_late_failure_is_reported_without_a_response(self):
+        future, callback = Future(), mock.Mock()
+        ingest.CommitTimeout(future).when_done(callback)
+
+        future.set_exception(RuntimeError("write failed"))
+        callback.assert_called_once_with()
+
+
+@override_settings(DONATION_GROUP_COMMIT=True, DONATION_BATCH_WAIT=0.2)
+class GroupCommitWriterTests(FundingTransactionTestCase):
+    def test_donations_queued_together_commit_in_one_batch(self):
+        with mock.patch('funding.ingest._write', wraps=ingest._write) as write:
+            futures = [ingest.submit(Donation(post=self.post, user=self.donor, amount=Decimal('1.00'))) for _ in range(5)]
+            donations = [future.result(timeout=10) for future in futures]
+
+        write.assert_called_once()
+        self.assertEqual(len({donation.pk for donation in donations}), 5)
+        self.assertEqual(Donation.objects.count(), 5)
+
+    def test_api_donations_are_acknowledged_after_the_batch_commits(self):
+        self.client.force_authenticate(self.donor)
+        response = self.client.post('/funding/donations/', {'post': self.post.pk, 'amount': '12.50'}, format='json')
+
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Donation.objects.get().pk, response.json()['id'])
@@ -0,0 +1,27 @@
+from django.db import transaction
+
+from funding import leaderboards
+from funding.models import DonorLeaderboardEntry
+
+from .base import FundingTestCase
+
+
+class LeaderboardCascadeTests(FundingTestCase):
+    def record(self, post, user, amount):
+        with transaction.atomic():
+            leaderboards.record_donations([self.donate(amount, post=post, user=user)])
+
+    def test_deleting_a_post_or_user_keeps_leaderboards_consistent(self):
+        other = self.create_post("B", author=self.donor)
+        self.record(self.post, self.donor, '10')
+        self.record(other, self.donor, '5')
+        self.record(other, self.author, '7')
+
+        self.post.delete()
+        self.assertEqual(leaderboards.rebuild_leaderboards(), [])
+        self.assertFalse(DonorLeaderboardEntry.objects.filter(scope=leaderboards.post_scope(self.post.pk)).exists())
+
+        self.author.delete()
+        self.assertEqual(leaderboards.rebuild_leaderboards(), [])
+        self.donor.delete()
+        self.assertEqual(leaderboards.rebuild_leaderboards(), [])
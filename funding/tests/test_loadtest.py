@@ -0,0 +1,110 @@
+import asyncio
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+from account.models import User
+from funding.management.commands import loadtest
+from funding.models import Post
+
+from .base import FundingTestCase
+
+
+class PercentileTests(SimpleTestCase):
+    def test_nearest_rank_on_sorted_values(self):
+        values = [float(i) for i in range(1, 101)]
+
+        self.assertEqual(loadtest.percentile(values, 0.50), 51.0)
+        self.assertEqual(loadtest.percentile(values, 0.99), 100.0)
+        self.assertEqual(loadtest.percentile(values, 1.0), 100.0)
+        self.assertEqual(loadtest.percentile([], 0.99), 0.0)
+
+    def test_stats_count_requests_and_errors_per_endpoint(self):
+        stats = loadtest.Stats()
+        stats.record('feed', 0.2, True)
+        stats.record('feed', 0.1, False)
+        stats.record('donate', 0.3, True)
+
+        self.assertEqual((stats.total, stats.error_count), (3, 1))
+        self.assertEqual(dict(stats.errors), {'feed': 1})
+        self.assertEqual(stats.all_latencies(), [0.1, 0.2, 0.3])
+
+
+class HTTPConnectionTests(SimpleTestCase):
+    responses = [
+        b'HTTP/1.1 200 OK\r\nContent-Length: 5\r\n\r\nhello',
+        b'HTTP/1.1 201 Created\r\nTransfer-Encoding: chunked\r\n\r\n3\r\nabc\r\n0\r\n\r\n',
+        b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n',
+    ]
+
+    def test_keep_alive_requests_until_the_server_closes(self):
+        connections = []
+
+        async def handle(reader, writer):
+            connections.append(writer)
+            for response in self.responses:
+                await reader.readuntil(b'\r\n\r\n')
+                writer.write(response)
+                await writer.drain()
+            writer.close()
+
+        async def main():
+            server = await asyncio.start_server(handle, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            client = loadtest.HTTPConnection('127.0.0.1', port)
+            try:
+                statuses = [await client.request('GET', '/') for _ in self.responses]
+                return statuses, client.writer
+            finally:
+                await client.close()
+                server.close()
+                await server.wait_closed()
+
+        statuses, writer = asyncio.run(main())
+
+        self.assertEqual(statuses, [200, 201, 404])
+        self.assertEqual(len(connections), 1)
+        self.assertIsNone(writer)
+
+
+class LoadtestReportTests(SimpleTestCase):
+    def stage(self, level, requests, errors=0):
+        stats = loadtest.Stats()
+        for i in range(requests):
+            stats.record('feed', 0.01, i >= errors)
+        return level, 1.0, stats
+
+    def report(self, results, max_error_rate=0.01):
+        command = loadtest.Command(stdout=StringIO())
+        command.report(results, max_error_rate)
+        return command.stdout.getvalue()
+
+    def test_saturation_when_throughput_stops_growing(self):
+        output = self.report([self.stage(1, 100), self.stage(5, 400), self.stage(10, 410)])
+        self.assertIn("Saturated at 10 concurrent users; peak 410.0 req/s.", output)
+
+    def test_saturation_when_errors_climb(self):
+        output = self.report([self.stage(1, 100), self.stage(5, 400, errors=40)])
+        self.assertIn("Saturated at 5 concurrent users", output)
+
+    def test_no_saturation(self):
+        output = self.report([self.stage(1, 100), self.stage(5, 400)])
+        self.assertIn("No saturation up to 5 users; peak 400.0 req/s.", output)
+
+
+class LoadtestSeedTests(FundingTestCase):
+    def test_seeded_rows_are_removed_and_others_kept(self):
+        command = loadtest.Command(stdout=StringIO())
+        tokens, post_ids = command.seed(users=3, posts=4)
+
+        self.assertEqual((len(tokens), len(post_ids)), (3, 4))
+        command.cleanup()
+        self.assertFalse(User.objects.filter(username__startswith=loadtest.USER_PREFIX).exists())
+        self.assertEqual(list(Post.objects.all()), [self.post])
+
+    def test_bad_options_are_rejected_before_seeding(self):
+        for options in ({'stages': '1,x'}, {'mix': 'feed=1,search=2'}, {'url': 'https://example.com'}):
+            with self.subTest(options=options), self.assertRaises(CommandError):
+                call_command('loadtest', stdout=StringIO(), **options)
+        self.assertFalse(User.objects.filter(username__startswith=loadtest.USER_PREFIX).exists())
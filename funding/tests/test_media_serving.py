@@ -0,0 +1,89 @@
+import os
+
+from django.core.files.base import ContentFile
+from django.test import override_settings
+from django.utils.http import http_date
+
+from funding.storage import media_storage
+
+from .base import FundingTestCase, TemporaryMediaMixin
+
+
+class MediaServingTests(TemporaryMediaMixin, FundingTestCase):
+    content = bytes(range(100))
+
+    def setUp(self):
+        self.name = media_storage().save('post_images/data.bin', ContentFile(self.content))
+        self.url = f'/media/{self.name}'
+
+    def get(self, url=None, **headers):
+        response = self.client.get(url or self.url, headers=headers)
+        self.addCleanup(response.close)
+        return response
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_blobs_are_served_with_immutable_validators(self):
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.get(**{'If-None-Match': response['ETag']}).status_code, 304)
+
+    def test_legacy_files_revalidate_by_modification_time(self):
+        path = os.path.join(self.media_root, 'legacy.txt')
+        with open(path, 'wb') as f:
+            f.write(b'legacy')
+        response = self.get('/media/legacy.txt')
+
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Last-Modified'], http_date(os.stat(path).st_mtime))
+        self.assertEqual(self.get('/media/legacy.txt', **{'If-Modified-Since': response['Last-Modified']}).status_code, 304)
+
+    def test_byte_range(self):
+        response = self.get(Range='bytes=10-19')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(self.body(response), self.content[10:20])
+
+    def test_open_ended_and_suffix_ranges(self):
+        self.assertEqual(self.body(self.get(Range='bytes=95-')), self.content[95:])
+        self.assertEqual(self.body(self.get(Range='bytes=-5')), self.content[-5:])
+        self.assertEqual(self.get(Range='bytes=90-500')['Content-Range'], 'bytes 90-99/100')
+
+    def test_invalid_range_is_ignored(self):
+        for header in ('bytes=20-10', 'bytes=0-1,5-6', 'items=0-1'):
+            with self.subTest(header=header):
+                response = self.get(Range=header)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.body(response), self.content)
+
+    def test_unsatisfiable_range(self):
+        response = self.get(Range='bytes=100-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_stale_if_range_gets_the_whole_file(self):
+        etag = self.get()['ETag']
+
+        self.assertEqual(self.get(Range='bytes=0-9', **{'If-Range': etag}).status_code, 206)
+        self.assertEqual(self.get(Range='bytes=0-9', **{'If-Range': '"stale"'}).status_code, 200)
+
+    def test_hidden_and_missing_files_are_not_found(self):
+        self.assertEqual(self.get('/media/blobs/.lock').status_code, 404)
+        self.assertEqual(self.get('/media/missing.png').status_code, 404)
+        self.assertEqual(self.get('/media/../manage.py').status_code, 404)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT='x-accel-redirect', MEDIA_ACCEL_PREFIX='/protected/')
+    def test_proxy_offload(self):
+        response = self.get()
+
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected/{self.name}')
+        self.assertEqual(response.content, b'')
+        self.assertIn('ETag', response)
@@ -0,0 +1,92 @@
+import asyncio
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from funding import progress
+from funding.models import Post
+
+from .base import FundingTestCase
+
+
+class ProgressSnapshotTests(FundingTestCase):
+    def test_snapshot_includes_archived_totals(self):
+        self.donate('15')
+        self.donate('5')
+        Post.objects.filter(pk=self.post.pk).update(archived_donation_total=Decimal('30'), archived_donation_count=3)
+
+        data = progress.snapshot(self.post.pk)
+
+        self.assertEqual(data['current_amount'], Decimal('50'))
+        self.assertEqual(data['funding_percentage'], Decimal('50.00'))
+        self.assertEqual(data['donation_count'], 5)
+
+    def test_unknown_post_has_no_snapshot(self):
+        self.assertIsNone(progress.snapshot(self.post.pk + 1))
+
+    def test_donations_publish_once_committed(self):
+        backend = mock.Mock()
+        with mock.patch('funding.progress.get_backend', return_value=backend):
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.donate('25')
+                progress.donation_changed(self.post.pk)
+            backend.publish.assert_not_called()
+            for callback in callbacks:
+                callback()
+
+        post_id, data = backend.publish.call_args.args
+        self.assertEqual(post_id, self.post.pk)
+        self.assertEqual(json.loads(data)['current_amount'], 25)
+
+    def test_stream_view_rejects_unknown_posts_and_other_methods(self):
+        self.assertEqual(self.client.get(f'/funding/posts/{self.post.pk + 1}/progress/stream/').status_code, 404)
+        self.assertEqual(self.client.post(f'/funding/posts/{self.post.pk}/progress/stream/').status_code, 405)
+
+
+@override_settings(PROGRESS_MIN_INTERVAL=0, PROGRESS_KEEPALIVE=60)
+class ProgressStreamTests(SimpleTestCase):
+    post_id = 1
+
+    def run_stream(self, scenario):
+        async def main():
+            subscription = progress.broker.subscribe(self.post_id)
+            events = progress.stream(self.post_id, subscription, {'post': self.post_id, 'donation_count': 0})
+            try:
+                return await scenario(events)
+            finally:
+                await events.aclose()
+
+        result = asyncio.run(main())
+        self.assertNotIn(self.post_id, progress.broker._subscribers)
+        return result
+
+    def test_initial_snapshot_then_changes(self):
+        async def scenario(events):
+            first = await anext(events)
+            progress.broker.deliver(self.post_id, '{"donation_count": 1}')
+            return first, await anext(events)
+
+        first, second = self.run_stream(scenario)
+
+        self.assertTrue(first.startswith('retry: '))
+        self.assertIn('data: {"post": 1, "donation_count": 0}', first)
+        self.assertEqual(second, 'event: progress\ndata: {"donation_count": 1}\n\n')
+
+    def test_a_burst_is_sent_as_the_latest_snapshot(self):
+        async def scenario(events):
+            await anext(events)
+            for count in (1, 2, 3):
+                progress.broker.deliver(self.post_id, f'{{"donation_count": {count}}}')
+            return await anext(events)
+
+        self.assertEqual(self.run_stream(scenario), 'event: progress\ndata: {"donation_count": 3}\n\n')
+
+    @override_settings(PROGRESS_KEEPALIVE=0.01)
+    def test_idle_streams_send_keepalives(self):
+        async def scenario(events):
+            await anext(events)
+            return await anext(events)
+
+        self.assertEqual(self.run_stream(scenario), ': keepalive\n\n')
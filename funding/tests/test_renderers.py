@@ -0,0 +1,63 @@
+import io
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from project.parsers import FastJSONParser
+from project.renderers import FastJSONRenderer
+
+from .base import FundingTestCase
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    data = {
+        'amount': Decimal('10.50'),
+        'created_at': datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+        'label': gettext_lazy("Campaign"),
+        'text': "line\u2028separator",
+        'nested': [{1: None, 'ok': True}],
+    }
+
+    def test_output_matches_the_stdlib_renderer(self):
+        self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_indented_output_uses_the_stdlib_renderer(self):
+        context = {'indent': 2}
+        self.assertEqual(
+            FastJSONRenderer().render(self.data, 'application/json', context),
+            JSONRenderer().render(self.data, 'application/json', context),
+        )
+
+    def test_falls_back_without_orjson(self):
+        with mock.patch('project.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+
+class FastJSONParserTests(SimpleTestCase):
+    body = '{"title": "Café", "amount": 10.5, "tags": [1, 2]}'.encode()
+
+    def test_parses_like_the_stdlib_parser(self):
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(self.body)), JSONParser().parse(io.BytesIO(self.body)))
+
+    def test_invalid_json_is_a_parse_error(self):
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"title": '))
+
+    def test_other_encodings_use_the_stdlib_parser(self):
+        body = '{"title": "Café"}'.encode('latin-1')
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(body), parser_context={'encoding': 'latin-1'}), {'title': "Café"})
+
+
+class JSONResponseTests(FundingTestCase):
+    def test_api_responses_are_rendered_by_the_fast_renderer(self):
+        response = self.client.get('/funding/posts/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+        self.assertEqual([post['title'] for post in response.json()['results']], ["Campaign"])
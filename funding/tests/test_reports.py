@@ -0,0 +1,147 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+import numpy as np
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from funding import reports, snapshots
+from funding.models import Category, Donation, Post
+from funding.snapshots import Snapshot, remove_snapshot, write_snapshot
+
+from .base import FundingTestCase
+
+
+class SnapshotTestCase(FundingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.start = timezone.now() - timedelta(days=30)
+        cls.water, cls.schools = Category.objects.create(name="Water"), Category.objects.create(name="Schools")
+        Post.objects.filter(pk=cls.post.pk).update(category=cls.water)
+        cls.school = cls.create_post("School", category=cls.schools, target_amount=Decimal('50'))
+        cls.no_target = cls.create_post("No target", category=cls.water, target_amount=Decimal('0'))
+        Post.objects.update(created_at=cls.start)
+
+    def setUp(self):
+        self.directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(ANALYTICS_SNAPSHOT_DIR=self.directory))
+
+    def donate_on(self, day, amount, post=None):
+        donation = self.donate(amount, post=post)
+        Donation.objects.filter(pk=donation.pk).update(created_at=self.start + timedelta(days=day))
+        return donation
+
+    def fill(self):
+        self.donate_on(1, '60')
+        self.donate_on(3, '50')
+        self.donate_on(2, '20', post=self.school)
+        self.donate_on(1, '5', post=self.no_target)
+
+
+class SnapshotTests(SnapshotTestCase):
+    def test_new_donations_are_appended_as_chunks(self):
+        self.fill()
+        manifest = write_snapshot(chunk_size=3)
+        self.assertEqual((manifest['added'], len(manifest['donations']['chunks'])), (4, 2))
+
+        recent = self.donate('7')
+        self.assertEqual(write_snapshot(chunk_size=3)['added'], 0)  # Not settled yet.
+        Donation.objects.filter(pk=recent.pk).update(created_at=self.start)
+        manifest = write_snapshot(chunk_size=3)
+
+        self.assertEqual((manifest['added'], manifest['donations']['rows'], len(manifest['donations']['chunks'])), (1, 5, 3))
+        self.assertEqual(len([name for name in os.listdir(self.directory) if name.startswith('posts-')]), 1)
+        snapshot = Snapshot()
+        self.assertEqual(snapshot.donations['amount_cents'].tolist(), [6000, 5000, 2000, 500, 700])
+        self.assertEqual(snapshot.posts['id'].tolist(), [self.post.pk, self.school.pk, self.no_target.pk])
+        self.assertEqual(snapshot.categories, {self.water.pk: "Water", self.schools.pk: "Schools"})
+
+    def test_full_rebuild_drops_deleted_donations(self):
+        self.fill()
+        write_snapshot()
+        Donation.objects.filter(post=self.school).delete()
+
+        self.assertEqual(write_snapshot()['donations']['rows'], 4)
+        self.assertEqual(write_snapshot(full=True)['donations']['rows'], 3)
+
+    def test_remove_leaves_other_files_alone(self):
+        write_snapshot()
+        other = os.path.join(self.directory, 'notes.txt')
+        open(other, 'w').close()
+
+        remove_snapshot(self.directory)
+
+        self.assertEqual(os.listdir(self.directory), ['notes.txt'])
+        with self.assertRaises(FileNotFoundError):
+            Snapshot()
+
+    def test_other_format_versions_are_refused(self):
+        with open(os.path.join(self.directory, snapshots.MANIFEST), 'w') as f:
+            json.dump({'version': snapshots.FORMAT_VERSION + 1}, f)
+
+        with self.assertRaises(ValueError):
+            write_snapshot()
+        with self.assertRaises(CommandError):
+            call_command('snapshot_analytics', stdout=StringIO())
+
+
+class ReportTests(SnapshotTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fill()
+        write_snapshot()
+        self.snapshot = Snapshot()
+
+    def test_raised_per_post(self):
+        raised, donations = reports.raised_per_post(self.snapshot)
+
+        np.testing.assert_array_equal(raised, [11000, 2000, 500])
+        np.testing.assert_array_equal(donations, [2, 1, 1])
+
+    def test_funding_by_category(self):
+        self.assertEqual(reports.funding_by_category(self.snapshot), [
+            {'category': "Water", 'posts': 2, 'donations': 3, 'raised': 115.0, 'share': 0.8519, 'funded_posts': 1, 'funded_rate': 0.5},
+            {'category': "Schools", 'posts': 1, 'donations': 1, 'raised': 20.0, 'share': 0.1481, 'funded_posts': 0, 'funded_rate': 0.0},
+        ])
+
+    def test_donation_histogram(self):
+        self.assertEqual(reports.donation_histogram(self.snapshot, edges=(10, 50)), [
+            {'min': 0, 'max': 10, 'donations': 1, 'total': 5.0},
+            {'min': 10, 'max': 50, 'donations': 1, 'total': 20.0},
+            {'min': 50, 'max': None, 'donations': 2, 'total': 110.0},
+        ])
+
+    def test_time_to_goal_skips_campaigns_without_a_target(self):
+        summary = reports.time_to_goal(self.snapshot)
+
+        self.assertEqual((summary['campaigns'], summary['funded'], summary['funded_rate']), (2, 1, 0.5))
+        self.assertEqual(summary['median_days'], 3.0)
+        self.assertEqual(summary['by_category'], [{'category': "Water", 'funded': 1, 'median_days': 3.0}])
+
+    def test_command_prints_json_and_rejects_unknown_reports(self):
+        out = StringIO()
+        call_command('donation_report', 'time-to-goal', '--edges', '10,50', '--json', stdout=out)
+        self.assertEqual(json.loads(out.getvalue())['time-to-goal']['funded'], 1)
+
+        call_command('donation_report', stdout=out)
+        self.assertIn("1 of 2 campaigns reached their target (50.0%).", out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('donation_report', 'forecast', stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('donation_report', '--dir', os.path.join(self.directory, 'missing'), stdout=StringIO())
+
+
+class SnapshotCommandTests(SnapshotTestCase):
+    def test_command_reports_what_it_added(self):
+        self.fill()
+        out = StringIO()
+
+        call_command('snapshot_analytics', '--chunk-rows', '3', stdout=out)
+
+        self.assertIn("Added 4 donation(s); the snapshot holds 4 donation(s) in 2 chunk(s) and 3 post(s).", out.getvalue())
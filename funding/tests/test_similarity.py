@@ -0,0 +1,28 @@
+from unittest import mock
+
+from funding.models import PostNeighbour
+
+from .base import FundingTestCase
+
+
+class SimilarPostsTests(FundingTestCase):
+    def test_unknown_post_is_not_found(self):
+        self.assertEqual(self.client.get(f'/funding/posts/{self.post.pk}/similar/').status_code, 200)
+        self.assertEqual(self.client.get(f'/funding/posts/{self.post.pk + 1}/similar/').status_code, 404)
+
+
+class CanceledNeighbourTests(FundingTestCase):
+    def test_canceling_a_post_removes_it_from_the_neighbours_table(self):
+        canceled, other = self.create_post("Canceled"), self.create_post("Other")
+        PostNeighbour.objects.bulk_create([
+            PostNeighbour(post=self.post, neighbour=canceled, score=0.9, rank=0),
+            PostNeighbour(post=self.post, neighbour=other, score=0.5, rank=1),
+            PostNeighbour(post=canceled, neighbour=self.post, score=0.9, rank=0),
+        ])
+
+        with mock.patch('funding.similarity._enqueue') as enqueue, self.captureOnCommitCallbacks(execute=True):
+            canceled.is_canceled = True
+            canceled.save(update_fields=['is_canceled'])
+
+        self.assertEqual(list(PostNeighbour.objects.values_list('post_id', 'neighbour_id')), [(self.post.pk, other.pk)])
+        enqueue.assert_called_once_with(self.post.pk)
@@ -0,0 +1,109 @@
+import os
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from funding import media
+from funding.models import MediaBlob, PostImage
+from funding.storage import blob_digest, media_storage
+
+from .base import FundingTestCase, TemporaryMediaMixin, image_file
+
+
+class ContentAddressedStorageTests(TemporaryMediaMixin, FundingTestCase):
+    def setUp(self):
+        self.storage = media_storage()
+
+    def test_identical_files_share_one_blob(self):
+        first = self.storage.save('post_images/a.png', ContentFile(b'same bytes'))
+        second = self.storage.save('post_images/b.png', ContentFile(b'same bytes'))
+
+        self.assertEqual(first, second)
+        self.assertIsNotNone(blob_digest(first))
+        self.assertEqual(MediaBlob.objects.get().refcount, 2)
+
+        self.storage.delete(first)
+        self.assertEqual(MediaBlob.objects.get().refcount, 1)
+        self.assertTrue(self.storage.exists(first))
+
+        self.storage.delete(second)
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(self.storage.exists(first))
+
+    def test_deleting_a_row_releases_its_blob_on_commit(self):
+        images = [PostImage.objects.create(post=self.post, image=image_file()) for _ in range(2)]
+        name = images[0].image.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            images[0].delete()
+        self.assertEqual(MediaBlob.objects.get().refcount, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            images[1].delete()
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(self.storage.exists(name))
+
+    def test_replacing_a_profile_picture_releases_the_old_one(self):
+        self.author.profile_picture = image_file('a.png', 'red')
+        self.author.save()
+        old = self.author.profile_picture.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.profile_picture = image_file('b.png', 'blue')
+            self.author.save()
+
+        self.assertFalse(self.storage.exists(old))
+        self.assertEqual(list(MediaBlob.objects.values_list('name', 'refcount')), [(self.author.profile_picture.name, 1)])
+
+    def test_saving_the_same_picture_again_keeps_one_reference(self):
+        self.author.profile_picture = image_file('a.png', 'red')
+        self.author.save()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.profile_picture = image_file('copy.png', 'red')
+            self.author.save()
+
+        self.assertEqual(MediaBlob.objects.get().refcount, 1)
+        self.assertTrue(self.storage.exists(self.author.profile_picture.name))
+
+
+class MediaMaintenanceTests(TemporaryMediaMixin, FundingTestCase):
+    def setUp(self):
+        self.storage = media_storage()
+
+    def write_legacy(self, name, content):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+
+    def test_legacy_files_move_into_blobs_and_defaults_stay(self):
+        content = image_file().read()
+        self.write_legacy('post_images/a.png', content)
+        self.write_legacy('post_images/b.png', content)
+        self.write_legacy('default.jpg', b'shared default')
+        images = [PostImage.objects.create(post=self.post, image=name) for name in ('post_images/a.png', 'post_images/b.png')]
+
+        self.assertEqual(media.dedup_existing_media(log=lambda message: None), (2, len(content)))
+
+        names = {PostImage.objects.get(pk=image.pk).image.name for image in images}
+        self.assertEqual(len(names), 1)
+        self.assertIsNotNone(blob_digest(names.pop()))
+        self.assertEqual(MediaBlob.objects.get().refcount, 2)
+        self.assertFalse(self.storage.exists('post_images/a.png'))
+        self.assertFalse(self.storage.exists('post_images/b.png'))
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.profile_picture.name, 'default.jpg')
+        self.assertTrue(self.storage.exists('default.jpg'))
+
+    def test_sweep_fixes_refcounts_and_deletes_orphans(self):
+        used = PostImage.objects.create(post=self.post, image=image_file('a.png', 'red'))
+        orphan = self.storage.save('post_images/b.png', image_file('b.png', 'blue'))
+        MediaBlob.objects.filter(name=used.image.name).update(refcount=5)
+        MediaBlob.objects.update(updated_at=timezone.now() - timedelta(days=2))
+        size = self.storage.size(orphan)
+
+        self.assertEqual(media.sweep_orphan_blobs(log=lambda message: None), (1, size))
+        self.assertFalse(self.storage.exists(orphan))
+        self.assertEqual(list(MediaBlob.objects.values_list('name', 'refcount')), [(used.image.name, 1)])
@@ -0,0 +1,77 @@
+import random
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from funding import typeahead
+from funding.models import Category, Tag
+
+from .base import FundingTestCase
+
+
+class PrefixIndexTests(SimpleTestCase):
+    def test_matches_a_full_scan(self):
+        rng = random.Random(7)
+        entries = [
+            {'id': i, 'name': name, 'key': name, 'post_count': rng.randint(0, 20), 'type': 'tag'}
+            for i, name in enumerate(''.join(rng.choices('abc', k=rng.randint(1, 6))) for _ in range(500))
+        ]
+        index = typeahead.Index(entries, depth=20)
+
+        for prefix in ('a', 'ab', 'abc', 'ba', 'cab', 'ccc', 'd', ''):
+            for limit in (1, 5, 20, 40):
+                with self.subTest(prefix=prefix, limit=limit):
+                    expected = sorted((entry for entry in entries if prefix and entry['key'].startswith(prefix)), key=typeahead.rank)
+                    self.assertEqual(index.search(prefix, limit), expected[:min(limit, index.depth)])
+
+
+class TypeaheadTests(FundingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.water, cls.wash, cls.school = (Tag.objects.create(name=name) for name in ("Water", "washing", "School"))
+        cls.welfare = Category.objects.create(name="Welfare")
+        for title in ("Well", "Pump"):
+            cls.create_post(title).tags.add(cls.water)
+        cls.post.tags.add(cls.wash)
+
+    def setUp(self):
+        typeahead.invalidate()
+
+    def names(self, prefix, **params):
+        response = self.client.get('/funding/typeahead/', {'q': prefix, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(match['type'], match['name'], match['post_count']) for match in response.json()]
+
+    def test_most_used_first_and_case_insensitive(self):
+        self.assertEqual(
+            self.names('WA'), [('tag', "Water", 2), ('tag', "washing", 1)],
+        )
+        self.assertEqual(
+            self.names('w'), [('tag', "Water", 2), ('tag', "washing", 1), ('category', "Welfare", 0)],
+        )
+
+    def test_type_and_limit(self):
+        self.assertEqual(self.names('w', type='category'), [('category', "Welfare", 0)])
+        self.assertEqual(self.names('w', limit=1), [('tag', "Water", 2)])
+        self.assertEqual(self.client.get('/funding/typeahead/', {'q': 'w', 'type': 'post'}).status_code, 400)
+        self.assertEqual(self.client.get('/funding/typeahead/', {'q': 'w', 'limit': 'many'}).status_code, 400)
+
+    def test_changes_are_picked_up_after_commit(self):
+        self.names('sch')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.tags.add(self.school)
+
+        self.assertEqual(self.names('sch'), [('tag', "School", 1)])
+
+    @override_settings(TYPEAHEAD_RECHECK=0)
+    def test_other_processes_changes_are_seen_through_the_shared_version(self):
+        self.names('sch')
+        # Another process added the tag and bumped the version; this one wasn't told.
+        with mock.patch('funding.signals.transaction.on_commit'):
+            self.post.tags.add(self.school)
+        self.assertEqual(self.names('sch'), [('tag', "School", 0)])
+
+        cache.incr(typeahead.VERSION_KEY)
+        self.assertEqual(self.names('sch'), [('tag', "School", 1)])
@@ -0,0 +1,110 @@
+import os
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+from django.utils import timezone
+
+from funding import uploads
+from funding.models import PostImage, Upload
+
+from .base import FundingTransactionTestCase, TemporaryMediaMixin, image_file
+
+
+class ResumableUploadTests(TemporaryMediaMixin, FundingTransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enterContext(mock.patch('funding.uploads.schedule_sweep'))
+        self.client.force_authenticate(self.author)
+        self.content = image_file().read()
+
+    def start(self, target=Upload.TARGET_POST_IMAGE, **data):
+        if target == Upload.TARGET_POST_IMAGE:
+            data.setdefault('post', self.post.pk)
+        response = self.client.post(
+            '/funding/uploads/', {'target': target, 'filename': 'photo.png', 'size': len(self.content), **data},
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return Upload.objects.get(pk=response.json()['id'])
+
+    def send(self, upload, offset, data):
+        return self.client.generic(
+            'PATCH', f'/funding/uploads/{upload.pk}/', data,
+            content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def finalize(self, upload):
+        return self.client.post(f'/funding/uploads/{upload.pk}/finalize/')
+
+    def test_chunks_are_assembled_into_a_post_image(self):
+        upload = self.start()
+        middle = len(self.content) // 2
+
+        response = self.send(upload, 0, self.content[:middle])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Upload-Offset'], str(middle))
+        self.assertEqual(self.send(upload, middle, self.content[middle:]).status_code, 200)
+
+        response = self.finalize(upload)
+        self.assertEqual(response.status_code, 201, response.content)
+        image = PostImage.objects.get(post=self.post)
+        with image.image.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+        self.assertFalse(Upload.objects.exists())
+        self.assertFalse(os.path.exists(uploads.part_path(upload)))
+
+    def test_wrong_offset_is_a_conflict_reporting_the_current_one(self):
+        upload = self.start()
+        self.send(upload, 0, self.content[:10])
+
+        response = self.send(upload, 4, self.content[4:20])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '10')
+
+    def test_chunk_past_the_declared_size_is_a_conflict(self):
+        upload = self.start()
+        response = self.send(upload, 0, self.content + b'extra')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Upload.objects.get().offset, 0)
+
+    def test_incomplete_upload_cannot_be_finalized(self):
+        upload = self.start()
+        self.send(upload, 0, self.content[:10])
+
+        self.assertEqual(self.finalize(upload).status_code, 409)
+        self.assertFalse(PostImage.objects.exists())
+
+    def test_profile_picture_upload_replaces_the_users_picture(self):
+        upload = self.start(Upload.TARGET_PROFILE_PICTURE)
+        self.send(upload, 0, self.content)
+
+        self.assertEqual(self.finalize(upload).status_code, 201)
+        self.author.refresh_from_db()
+        with self.author.profile_picture.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+
+    def test_only_the_author_can_upload_to_a_post(self):
+        self.client.force_authenticate(self.donor)
+        response = self.client.post(
+            '/funding/uploads/',
+            {'target': Upload.TARGET_POST_IMAGE, 'post': self.post.pk, 'filename': 'photo.png', 'size': 10},
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_stale_uploads_and_orphaned_parts_are_purged(self):
+        stale, fresh = self.start(), self.start()
+        Upload.objects.filter(pk=stale.pk).update(updated_at=timezone.now() - timedelta(days=2))
+        directory = os.path.dirname(uploads.part_path(fresh))
+        orphan, foreign = os.path.join(directory, f'{uuid.uuid4()}.part'), os.path.join(directory, 'notes.part')
+        old = (timezone.now() - timedelta(days=2)).timestamp()
+        for path in (orphan, foreign):
+            open(path, 'wb').close()
+            os.utime(path, (old, old))
+
+        self.assertEqual(uploads.purge_stale_uploads(), 2)
+        self.assertEqual(list(Upload.objects.values_list('pk', flat=True)), [fresh.pk])
+        self.assertFalse(os.path.exists(uploads.part_path(stale)))
+        self.assertTrue(os.path.exists(uploads.part_path(fresh)))
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(foreign))
@@ -0,0 +1,145 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Category, Tag
+
+VERSION_KEY = 'typeahead:version'
+KINDS = ('tag', 'category')
+# Prefixes up to this length get their top matches precomputed; they are the
+# ones with the most matches and the ones typed first.
+PRECOMPUTED_LENGTH = 2
+BLOCK_SIZE = 32
+
+
+def fold(text):
+    return text.casefold().strip()
+
+
+class Index:
+    """
+    Names sorted by their folded form, so every name starting with a prefix
+    is one contiguous slice found with two bisections. A segment tree over
+    blocks of that array holds each node's best `depth` entries, so the top
+    of any slice is merged from O(log n) short lists instead of scanning it.
+    """
+
+    def __init__(self, entries, depth):
+        self.entries = sorted(entries, key=lambda entry: (entry['key'], entry['name']))
+        self.keys = [entry['key'] for entry in self.entries]
+        self.depth = depth
+        blocks = -(-len(self.entries) // BLOCK_SIZE)
+        self.size = 1
+        while self.size < blocks:
+            self.size *= 2
+        self.tree = [[] for _ in range(2 * self.size)]
+        for block in range(blocks):
+            chunk = self.entries[block * BLOCK_SIZE:(block + 1) * BLOCK_SIZE]
+            self.tree[self.size + block] = heapq.nsmallest(depth, chunk, key=rank)
+        for node in range(self.size - 1, 0, -1):
+            self.tree[node] = list(islice(heapq.merge(self.tree[2 * node], self.tree[2 * node + 1], key=rank), depth))
+        self.top = {}
+        for entry in self.entries:
+            for length in range(1, min(PRECOMPUTED_LENGTH, len(entry['key'])) + 1):
+                self.top.setdefault(entry['key'][:length], []).append(entry)
+        for prefix, matches in self.top.items():
+            self.top[prefix] = heapq.nsmallest(depth, matches, key=rank)
+
+    def search(self, prefix, limit):
+        if not prefix:
+            return []
+        # Tree nodes only keep `depth` entries, so deeper results would be wrong.
+        limit = min(limit, self.depth)
+        if len(prefix) <= PRECOMPUTED_LENGTH:
+            return self.top.get(prefix, [])[:limit]
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + '\U0010ffff', start)
+        first, last = -(-start // BLOCK_SIZE), end // BLOCK_SIZE
+        if first >= last:
+            return heapq.nsmallest(limit, self.entries[start:end], key=rank)
+        # Partial blocks at either end are scanned; whole blocks come from the tree.
+        parts = [
+            heapq.nsmallest(limit, self.entries[start:first * BLOCK_SIZE], key=rank),
+            heapq.nsmallest(limit, self.entries[last * BLOCK_SIZE:end], key=rank),
+        ]
+        low, high = first + self.size, last + self.size
+        while low < high:
+            if low & 1:
+                parts.append(self.tree[low])
+                low += 1
+            if high & 1:
+                high -= 1
+                parts.append(self.tree[high])
+            low //= 2
+            high //= 2
+        return list(islice(heapq.merge(*parts, key=rank), limit))
+
+
+def rank(entry):
+    return (-entry['post_count'], entry['key'], entry['id'])
+
+
+def build(kind):
+    model = Tag if kind == 'tag' else Category
+    rows = model.objects.annotate(post_count=Count('posts')).values('id', 'name', 'post_count')
+    return Index(
+        ({'type': kind, 'id': row['id'], 'name': row['name'], 'post_count': row['post_count'], 'key': fold(row['name'])}
+         for row in rows),
+        settings.TYPEAHEAD_MAX_LIMIT,
+    )
+
+
+_indexes = {}
+_built_version = None
+_checked_at = 0.0
+_dirty = True
+_lock = threading.Lock()
+
+
+def _current():
+    """
+    The indexes, rebuilt if a tag, category or post changed since they were
+    built. Changes in this process are seen at once; other processes' changes
+    (the shared version key) are checked every TYPEAHEAD_RECHECK seconds.
+    """
+    global _built_version, _checked_at, _dirty
+    now = time.monotonic()
+    if not _dirty and now - _checked_at < settings.TYPEAHEAD_RECHECK:
+        return _indexes
+    with _lock:
+        version = cache.get_or_set(VERSION_KEY, 1, None)
+        _checked_at = now
+        if _dirty or version != _built_version:
+            # Cleared first so a change during the rebuild triggers another one.
+            _dirty = False
+            _indexes.update({kind: build(kind) for kind in KINDS})
+            _built_version = version
+    return _indexes
+
+
+def search(prefix, kinds=KINDS, limit=10):
+    """Top `limit` tags and/or categories whose name starts with `prefix`, most used first."""
+    prefix = fold(prefix)
+    indexes = _current()
+    if len(kinds) == 1:
+        matches = indexes[kinds[0]].search(prefix, limit)
+    else:
+        matches = heapq.nsmallest(
+            limit, (entry for kind in kinds for entry in indexes[kind].search(prefix, limit)), key=rank,
+        )
+    return [{key: value for key, value in entry.items() if key != 'key'} for entry in matches]
+
+
+def invalidate():
+    global _dirty
+    _dirty = True
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.files import File, locks
+from django.db import connection
+from django.utils import timezone
+
+from .models import Upload
+from .utiles import image_errors, save_post_images
+
+READ_SIZE = 64 * 1024
+
+_sweep_lock = threading.Lock()
+_last_sweep = None
+
+
+class UploadConflict(Exception):
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.offset = offset
+
+
+class PartFile(File):
+    # Exposing the on-disk path lets image validation open the file from disk
+    # instead of reading it into memory.
+    def __init__(self, path, name):
+        super().__init__(open(path, 'rb'), name=name)
+        self.path = path
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def part_path(upload):
+    return os.path.join(settings.RESUMABLE_UPLOAD_DIR, f'{upload.pk}.part')
+
+
+def start_upload(upload):
+    os.makedirs(settings.RESUMABLE_UPLOAD_DIR, exist_ok=True)
+    with open(part_path(upload), 'wb') as part:
+        part.truncate(upload.size)
+    schedule_sweep()
+
+
+def write_chunk(upload, offset, stream, length):
+    """
+    Stream `length` bytes from `stream` into the upload's part file at `offset`.
+
+    The body is copied in fixed-size reads, so memory use does not depend on
+    the chunk size. Returns the new offset.
+    """
+    if offset != upload.offset:
+        raise UploadConflict("Upload-Offset does not match the current offset.", upload.offset)
+    if offset + length > upload.size:
+        raise UploadConflict("Chunk exceeds the declared upload size.", upload.offset)
+
+    with open(part_path(upload), 'r+b') as part:
+        # Without file locking support (LOCK_EX == 0) lock() always fails; that isn't a conflict.
+        if not locks.lock(part, locks.LOCK_EX | locks.LOCK_NB) and locks.LOCK_EX:
+            raise UploadConflict("Another chunk is being written to this upload.", upload.offset)
+
+        part.seek(offset)
+        remaining = length
+        while remaining:
+            data = stream.read(min(READ_SIZE, remaining))
+            if not data:
+                break
+            part.write(data)
+            remaining -= len(data)
+
+        new_offset = offset + length - remaining
+        updated = Upload.objects.filter(pk=upload.pk, offset=offset).update(
+            offset=new_offset, updated_at=timezone.now()
+        )
+        if not updated:
+            raise UploadConflict("Upload offset changed concurrently.", offset)
+
+    upload.offset = new_offset
+    return new_offset
+
+
+def finalize_upload(upload):
+    """
+    Attach a completed upload to its target field and drop the upload record.
+
+    Returns `(instance, errors)`; `instance` is the created `PostImage` or the
+    updated user, or None if the file was rejected.
+    """
+    if upload.offset != upload.size:
+        raise UploadConflict("Upload is not complete.", upload.offset)
+
+    part = PartFile(part_path(upload), upload.filename)
+    try:
+        if upload.target == Upload.TARGET_POST_IMAGE:
+            images, errors = save_post_images(upload.post, [part])
+            instance = images[0] if images else None
+        else:
+            detail = image_errors(part)
+            if detail is None:
+                instance, errors = upload.user, []
+                # Assigned and saved with the row (rather than FieldFile.save)
+                # so the replaced-media signals see the old and new files.
+                instance.profile_picture = part
+                instance.save()
+            else:
+                instance, errors = None, [{'index': 0, 'name': upload.filename, 'errors': detail}]
+    finally:
+        part.close()
+
+    # Retrying a rejected file cannot succeed, so the upload is dropped either way.
+    discard_upload(upload)
+    return instance, errors
+
+
+def discard_upload(upload):
+    path = part_path(upload)
+    upload.delete()
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def purge_stale_uploads(max_age=None):
+    """
+    Delete uploads that have not received a chunk within `max_age`, together
+    with any part files left behind without a matching upload record.
+    """
+    max_age = max_age or settings.RESUMABLE_UPLOAD_MAX_AGE
+    cutoff = timezone.now() - max_age
+    purged = 0
+
+    for upload in Upload.objects.filter(updated_at__lt=cutoff).iterator():
+        discard_upload(upload)
+        purged += 1
+
+    upload_dir = settings.RESUMABLE_UPLOAD_DIR
+    if os.path.isdir(upload_dir):
+        cutoff_ts = cutoff.timestamp()
+        for entry in os.scandir(upload_dir):
+            if not entry.name.endswith('.part') or entry.stat().st_mtime >= cutoff_ts:
+                continue
+            try:
+                upload_id = uuid.UUID(entry.name[:-len('.part')])
+            except ValueError:
+                continue  # Not a part file of ours.
+            if not Upload.objects.filter(pk=upload_id).exists():
+                os.remove(entry.path)
+                purged += 1
+
+    return purged
+
+
+def _sweep():
+    try:
+        purge_stale_uploads()
+    finally:
+        connection.close()
+
+
+def schedule_sweep():
+    # Opportunistically run the purge in a daemon thread at most once per
+    # RESUMABLE_UPLOAD_MAX_AGE / 24, so stale uploads are collected without a cron job.
+    global _last_sweep
+    interval = settings.RESUMABLE_UPLOAD_MAX_AGE.total_seconds() / 24
+    with _sweep_lock:
+        if _last_sweep is not None and time.monotonic() - _last_sweep < interval:
+            return
+        _last_sweep = time.monotonic()
+    threading.Thread(target=_sweep, name='upload-sweeper', daemon=True).start()
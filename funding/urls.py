@@ -1,7 +1,9 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 from .views import (
     CategoryViewSet, CommentViewSet, PostImageViewSet,
-    PostViewSet, DonationViewSet, TagViewSet, RatingViewSet
+    PostViewSet, DonationViewSet, TagViewSet, RatingViewSet, UploadViewSet,
+    LeaderboardViewSet, FeedViewSet, TypeaheadViewSet, DigestPreferenceView, progress_stream,
 )
 
 router = DefaultRouter()
@@ -12,5 +14,12 @@ router.register(r'donations', DonationViewSet)
 router.register(r'categories', CategoryViewSet)
 router.register(r'tags', TagViewSet)
 router.register(r'ratings', RatingViewSet, basename='rating')
+router.register(r'uploads', UploadViewSet, basename='upload')
+router.register(r'leaderboard', LeaderboardViewSet, basename='leaderboard')
+router.register(r'feed', FeedViewSet, basename='feed')
+router.register(r'typeahead', TypeaheadViewSet, basename='typeahead')
 
-urlpatterns = router.urls
+urlpatterns = [
+    path('posts/<int:pk>/progress/stream/', progress_stream, name='post-progress-stream'),
+    path('digest-preference/', DigestPreferenceView.as_view(), name='digest-preference'),
+] + router.urls
@@ -0,0 +1,99 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connection, transaction
+from rest_framework import serializers
+from rest_framework.fields import get_error_detail
+
+from . import feed
+from .models import CampaignEvent, PostImage
+
+# Storage writes are I/O bound, so a small thread pool is enough to overlap them.
+UPLOAD_WORKERS = 4
+
+
+def _store_image(field, image_file):
+    try:
+        name = field.generate_filename(None, image_file.name)
+        return field.storage.save(name, image_file, max_length=field.max_length)
+    finally:
+        # Runs on a pool thread; don't leak its database connection.
+        connection.close()
+
+
+def image_errors(image_file):
+    # Returns the validation errors for an uploaded image, or None if it is valid.
+    try:
+        serializers.ImageField().run_validation(image_file)
+    except serializers.ValidationError as exc:
+        return exc.detail
+    except DjangoValidationError as exc:
+        return get_error_detail(exc)
+    return None
+
+
+def store_post_images(files):
+    """
+    Validate uploaded images and write the valid ones to storage
+    concurrently. Returns `(names, errors)`: the stored names in upload
+    order, and one entry per rejected file.
+    """
+    field = PostImage._meta.get_field('image')
+    valid, errors = [], []
+
+    for index, image_file in enumerate(files):
+        detail = image_errors(image_file)
+        if detail is None:
+            valid.append((index, image_file))
+        else:
+            errors.append({'index': index, 'name': getattr(image_file, 'name', None), 'errors': detail})
+
+    stored = []
+    if valid:
+        with ThreadPoolExecutor(max_workers=min(UPLOAD_WORKERS, len(valid))) as executor:
+            futures = [(index, f, executor.submit(_store_image, field, f)) for index, f in valid]
+            for index, image_file, future in futures:
+                try:
+                    stored.append(future.result())
+                except Exception as exc:
+                    errors.append({'index': index, 'name': image_file.name, 'errors': [str(exc)]})
+
+    errors.sort(key=lambda error: error['index'])
+    return stored, errors
+
+
+def create_post_images(post, names):
+    """Insert the rows for already stored images with one bulk_create; call inside a transaction."""
+    images = PostImage.objects.bulk_create([PostImage(post=post, image=name) for name in names])
+    if images:
+        feed.publish(
+            post.pk, CampaignEvent.VERB_IMAGE, actor_id=post.author_id,
+            object_id=images[0].pk, data={'count': len(images)},
+        )
+    return images
+
+
+def save_post_images(post, files):
+    """
+    Validate and store many uploaded images for `post` in one go.
+
+    Files are written to storage concurrently and the rows are inserted with a
+    single `bulk_create`. Returns `(images, errors)` where `errors` holds one
+    entry per rejected file so callers can report partial failures.
+    """
+    stored, errors = store_post_images(files)
+    if not stored:
+        return [], errors
+    try:
+        with transaction.atomic():
+            images = create_post_images(post, stored)
+    except Exception:
+        delete_stored_images(stored)
+        raise
+    return images, errors
+
+
+def delete_stored_images(names):
+    storage = PostImage._meta.get_field('image').storage
+    for name in names:
+        storage.delete(name)
@@ -1,13 +1,31 @@
+from copy import copy
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
 from django.forms import ValidationError
-from rest_framework import viewsets
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from rest_framework import generics, mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Category, Post, PostImage, Comment, Donation, Tag, Rating
+from account.serializers import UserProfileSerializer
+from .models import (
+    Category, Post, PostImage, Comment, Donation, Tag, Rating, Upload, PostNeighbour, CampaignEvent,
+    ArchivedComment, ArchivedDonation, ArchivedRating, DigestPreference,
+)
 from .serializers import (
-    CategorySerializer, CommentSerializer, PostImageSerializer,
-    PostSerializer, DonationSerializer, TagSerializer, RatingSerializer
+    CategorySerializer, CommentSerializer, PostImageSerializer, PostImageBulkSerializer,
+    PostSerializer, DonationSerializer, TagSerializer, RatingSerializer, UploadSerializer,
+    SimilarPostSerializer, LeaderboardEntrySerializer, CampaignEventSerializer,
+    ArchivedDonationSerializer, ArchivedRatingSerializer, DigestPreferenceSerializer, serialize_comments,
 )
+from . import archive, counters, feed, idempotency, ingest, leaderboards, loaders, progress, typeahead
+from .uploads import UploadConflict, discard_upload, finalize_upload, start_upload, write_chunk
+from .utiles import save_post_images
 
 
 
@@ -16,13 +34,64 @@ class PostViewSet(viewsets.ModelViewSet):
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     parser_classes = [MultiPartParser, FormParser]
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_fields = ['author', 'tags']
+    ordering_fields = ['created_at', 'views']
 
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        counters.record_view(int(kwargs['pk']))
+        return response
+
+    @action(detail=True, methods=['get'])
+    def views(self, request, pk=None):
+        stored = Post.objects.filter(pk=pk).values_list('views', flat=True).first()
+        if stored is None:
+            raise Http404
+        pending = counters.pending(int(pk))
+        return Response({'post': int(pk), 'views': stored + pending, 'stored': stored, 'pending': pending})
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        # Served from the precomputed neighbours table (see funding.similarity).
+        generics.get_object_or_404(Post.objects.only('id'), pk=pk)
+        neighbours = (
+            PostNeighbour.objects.filter(post_id=pk)
+            .select_related('neighbour__category').order_by('rank')
+        )
+        return Response(SimilarPostSerializer(neighbours, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def batch(self, request):
+        try:
+            ids = [int(value) for value in request.query_params.get('ids', '').split(',') if value.strip()]
+        except ValueError:
+            return Response({'ids': ['Must be a comma-separated list of post ids.']}, status=status.HTTP_400_BAD_REQUEST)
+        if not ids:
+            return Response({'ids': ['This parameter is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        if len(set(ids)) > settings.POST_BATCH_MAX_IDS:
+            return Response(
+                {'ids': [f'At most {settings.POST_BATCH_MAX_IDS} ids per request.']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Results follow the order of `ids` (duplicates collapsed); unknown ids are listed in `missing`.
+        loader = loaders.PostLoader()
+        posts, missing = loader.get_many(ids)
+        context = {**self.get_serializer_context(), loaders.CONTEXT_KEY: loader}
+        return Response({'results': PostSerializer(posts, many=True, context=context).data, 'missing': missing})
+
+    @action(detail=True, methods=['get'], url_path='top-donors')
+    def top_donors(self, request, pk=None):
+        entries = leaderboards.top_donors(
+            leaderboards.post_scope(pk), **leaderboard_params(request)
+        )
+        return Response(LeaderboardEntrySerializer(entries, many=True).data)
+
 
 class PostImageViewSet(viewsets.ModelViewSet):
     queryset = PostImage.objects.all()
@@ -30,6 +99,108 @@ class PostImageViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
 
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            image = serializer.save()
+            feed.publish(
+                image.post_id, CampaignEvent.VERB_IMAGE, actor_id=self.request.user.id,
+                object_id=image.pk, data={'count': 1},
+            )
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        data = {'post': request.data.get('post'), 'images': request.FILES.getlist('images')}
+        serializer = PostImageBulkSerializer(data=data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+
+        images, errors = save_post_images(
+            serializer.validated_data['post'], serializer.validated_data['images']
+        )
+        if not images:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif errors:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+
+        return Response({
+            'created': PostImageSerializer(images, many=True, context=self.get_serializer_context()).data,
+            'errors': errors,
+        }, status=response_status)
+
+
+class UploadViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Resumable uploads: POST to start, PATCH raw chunks with an `Upload-Offset`
+    header, then POST to `finalize/` to attach the file to its target.
+    """
+    serializer_class = UploadSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Upload.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        start_upload(serializer.save(user=self.request.user))
+
+    def partial_update(self, request, pk=None):
+        upload = self.get_object()
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            return Response(
+                {'detail': 'Upload-Offset and Content-Length headers are required.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if length > settings.RESUMABLE_UPLOAD_MAX_CHUNK_SIZE:
+            return Response(
+                {'detail': f'Chunks are limited to {settings.RESUMABLE_UPLOAD_MAX_CHUNK_SIZE} bytes.'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        try:
+            # Read the raw body straight from the request so it is never buffered.
+            new_offset = write_chunk(upload, offset, request.stream, length)
+        except UploadConflict as exc:
+            return Response(
+                {'detail': str(exc), 'offset': exc.offset},
+                status=status.HTTP_409_CONFLICT,
+                headers={'Upload-Offset': str(exc.offset)},
+            )
+        return Response(
+            {'offset': new_offset, 'size': upload.size},
+            headers={'Upload-Offset': str(new_offset)},
+        )
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        upload = self.get_object()
+        try:
+            instance, errors = finalize_upload(upload)
+        except UploadConflict as exc:
+            return Response({'detail': str(exc), 'offset': exc.offset}, status=status.HTTP_409_CONFLICT)
+
+        if instance is None:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        if upload.target == Upload.TARGET_POST_IMAGE:
+            data = PostImageSerializer(instance, context=self.get_serializer_context()).data
+        else:
+            data = UserProfileSerializer(instance, context=self.get_serializer_context()).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    def destroy(self, request, pk=None):
+        discard_upload(self.get_object())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def archived_post(request, counter):
+    # The post named by ?post_id= when some of its rows live in the archive tables.
+    post_id = request.query_params.get('post_id')
+    if not post_id or not post_id.isdigit():
+        return None
+    return Post.objects.filter(pk=post_id, **{f'{counter}__gt': 0}).only('id').first()
+
 
 class CommentViewSet(viewsets.ModelViewSet):
     queryset = Comment.objects.all()  
@@ -42,6 +213,14 @@ class CommentViewSet(viewsets.ModelViewSet):
             return Comment.objects.filter(post_id=post_id, parent__isnull=True).order_by('created_at')
         return Comment.objects.all().order_by('created_at')  
 
+    def list(self, request, *args, **kwargs):
+        post = archived_post(request, 'archived_comment_count')
+        if post is None:
+            return super().list(request, *args, **kwargs)
+        archived = ArchivedComment.objects.filter(post=post, parent__isnull=True)
+        page = self.paginate_queryset(archive.merge_by_created(archived, self.get_queryset()))
+        return self.get_paginated_response(serialize_comments(page, self.get_serializer_context()))
+
     def perform_create(self, serializer):
         post_id = self.request.data.get('post')
         if not post_id:
@@ -55,7 +234,11 @@ class CommentViewSet(viewsets.ModelViewSet):
             except Comment.DoesNotExist:
                 raise ValidationError({"parent": "Invalid parent comment ID."})
 
-        serializer.save(user=self.request.user, post_id=post_id, parent=parent)
+        with transaction.atomic():
+            comment = serializer.save(user=self.request.user, post_id=post_id, parent=parent)
+            feed.publish(
+                comment.post_id, CampaignEvent.VERB_COMMENT, actor_id=comment.user_id, object_id=comment.pk,
+            )
 
 class DonationViewSet(viewsets.ModelViewSet):
     serializer_class = DonationSerializer
@@ -76,8 +259,96 @@ class DonationViewSet(viewsets.ModelViewSet):
             
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        post = archived_post(request, 'archived_donation_count')
+        if post is None:
+            return super().list(request, *args, **kwargs)
+        archived = ArchivedDonation.objects.filter(post=post, post__author=request.user).order_by('id')
+        page = self.paginate_queryset(list(archived) + list(self.get_queryset().order_by('id')))
+        context = self.get_serializer_context()
+        return self.get_paginated_response([
+            (ArchivedDonationSerializer if isinstance(donation, ArchivedDonation) else DonationSerializer)(
+                donation, context=context,
+            ).data
+            for donation in page
+        ])
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(idempotency.HEADER)
+        if key is None:
+            return super().create(request, *args, **kwargs)
+        return idempotency.run(
+            request, key, lambda: super(DonationViewSet, self).create(request, *args, **kwargs),
+            # The group-commit writer must not wait on a transaction held open here.
+            atomic=not ingest.enabled(),
+        )
+
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        if ingest.enabled():
+            # Acknowledged only after the writer's batch transaction commits.
+            serializer.instance = ingest.save(
+                Donation(user=self.request.user, **serializer.validated_data),
+                render=lambda donation: self.get_serializer(donation).data,
+            )
+            return
+        with transaction.atomic():
+            donation = serializer.save(user=self.request.user)
+            leaderboards.record_donations([donation])
+            feed.donation_created(donation)
+            progress.donation_changed(donation.post_id)
+
+    def perform_update(self, serializer):
+        previous = copy(serializer.instance)
+        with transaction.atomic():
+            donation = serializer.save()
+            leaderboards.record_donations([previous], sign=-1)
+            leaderboards.record_donations([donation])
+            progress.donation_changed(previous.post_id)
+            if donation.post_id != previous.post_id:
+                progress.donation_changed(donation.post_id)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            leaderboards.record_donations([instance], sign=-1)
+            instance.delete()
+            progress.donation_changed(instance.post_id)
+
+
+def leaderboard_params(request):
+    # ?month=YYYY-MM selects a monthly window; ?limit=N the number of donors.
+    try:
+        limit = max(int(request.query_params.get('limit', 10)), 1)
+    except ValueError:
+        limit = 10
+    period = request.query_params.get('month', leaderboards.ALL_TIME)
+    return {'period': period, 'limit': limit}
+
+
+class LeaderboardViewSet(viewsets.ViewSet):
+    def list(self, request):
+        entries = leaderboards.top_donors(leaderboards.GLOBAL, **leaderboard_params(request))
+        return Response(LeaderboardEntrySerializer(entries, many=True).data)
+
+class FeedViewSet(viewsets.ViewSet):
+    """
+    Activity from campaigns the user donated to or rated, newest first.
+    Paginate with `?before=<id of the last event seen>`.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        try:
+            before = int(request.query_params['before']) if 'before' in request.query_params else None
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            before, limit = None, 20
+
+        events = feed.feed_for(request.user, before=before, limit=limit)
+        return Response({
+            'results': CampaignEventSerializer(events, many=True).data,
+            'next_before': events[-1].id if len(events) == limit else None,
+        })
+
 
 class RatingViewSet(viewsets.ModelViewSet):
     serializer_class = RatingSerializer
@@ -89,6 +360,20 @@ class RatingViewSet(viewsets.ModelViewSet):
             return Rating.objects.filter(post_id=post_id)
         return Rating.objects.all()
 
+    def list(self, request, *args, **kwargs):
+        post = archived_post(request, 'archived_rating_count')
+        if post is None:
+            return super().list(request, *args, **kwargs)
+        ratings = archive.merge_by_created(ArchivedRating.objects.filter(post=post), self.get_queryset())
+        page = self.paginate_queryset(ratings)
+        context = self.get_serializer_context()
+        return self.get_paginated_response([
+            (ArchivedRatingSerializer if isinstance(rating, ArchivedRating) else RatingSerializer)(
+                rating, context=context,
+            ).data
+            for rating in page
+        ])
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
@@ -101,3 +386,55 @@ class CategoryViewSet(viewsets.ModelViewSet):
 class TagViewSet(viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+
+
+class DigestPreferenceView(generics.RetrieveUpdateAPIView):
+    """How often the current user gets donation digests for their campaigns."""
+    serializer_class = DigestPreferenceSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_object(self):
+        if self.request.method == 'GET':
+            preference = DigestPreference.objects.filter(user=self.request.user).first()
+            return preference or DigestPreference(user=self.request.user, frequency=settings.DIGEST_DEFAULT_FREQUENCY)
+        preference, _ = DigestPreference.objects.get_or_create(
+            user=self.request.user, defaults={'frequency': settings.DIGEST_DEFAULT_FREQUENCY},
+        )
+        return preference
+
+
+class TypeaheadViewSet(viewsets.ViewSet):
+    """Tag and category names starting with `q`, most used first, from the in-process index."""
+
+    def list(self, request):
+        kind = request.query_params.get('type')
+        if kind is not None and kind not in typeahead.KINDS:
+            return Response(
+                {'type': [f"Must be one of {', '.join(typeahead.KINDS)}."]}, status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), settings.TYPEAHEAD_MAX_LIMIT)
+        except ValueError:
+            return Response({'limit': ['Must be an integer.']}, status=status.HTTP_400_BAD_REQUEST)
+        kinds = (kind,) if kind else typeahead.KINDS
+        return Response(typeahead.search(request.query_params.get('q', ''), kinds, max(limit, 1)))
+
+
+async def progress_stream(request, pk):
+    """
+    Server-sent events with a post's funding progress. Connections are held
+    open by the event loop, so this needs the ASGI application.
+    """
+    if request.method != 'GET':
+        return HttpResponse(status=405, headers={'Allow': 'GET'})
+    await sync_to_async(progress.get_backend().start)()
+    subscription = progress.broker.subscribe(pk)
+    initial = await sync_to_async(progress.snapshot)(pk)
+    if initial is None:
+        progress.broker.unsubscribe(pk, subscription)
+        raise Http404
+
+    response = StreamingHttpResponse(progress.stream(pk, subscription, initial), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,118 @@
+"""
+Admin building blocks shared by the apps' admin modules.
+"""
+from django.contrib import admin
+from django.contrib.admin.utils import get_fields_from_path
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.text import smart_split, unescape_string_literal
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for large tables: an unfiltered changelist uses the planner's
+    row estimate instead of COUNT(*), and a filtered one counts at most
+    FILTERED_COUNT_LIMIT rows.
+    """
+    EXACT_BELOW = 10000
+    FILTERED_COUNT_LIMIT = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if queryset.query.where:
+            return queryset.values('pk')[:self.FILTERED_COUNT_LIMIT].count()
+        estimate = estimated_row_count(queryset.model, queryset.db)
+        if estimate is None or estimate < self.EXACT_BELOW:
+            return queryset.count()
+        return estimate
+
+
+def estimated_row_count(model, using):
+    connection = connections[using]
+    table = model._meta.db_table
+    queries = {
+        'postgresql': ('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table]),
+        'mysql': (
+            'SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s',
+            [table],
+        ),
+        # Filled in by ANALYZE; the first number of each row is the table's row count.
+        'sqlite': ('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table]),
+    }
+    if connection.vendor not in queries:
+        return None
+    try:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(*queries[connection.vendor])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None or row[0] is None:
+        return None
+    value = int(str(row[0]).split()[0])
+    return value if value >= 0 else None
+
+
+def _prefix_upper_bound(prefix):
+    """Smallest string greater than every string starting with `prefix`, in code point order."""
+    code = ord(prefix[-1]) + 1
+    if 0xD800 <= code <= 0xDFFF:
+        code = 0xE000  # Surrogates cannot be stored.
+    return prefix[:-1] + chr(code) if code <= 0x10FFFF else None
+
+
+def _prefix_lookup(path, prefix):
+    # The range lets every backend walk the column's index (SQLite's LIKE is
+    # case-insensitive and can't); startswith keeps the result exact
+    # whatever the column's collation.
+    condition = Q(**{f'{path}__gte': prefix, f'{path}__startswith': prefix})
+    upper = _prefix_upper_bound(prefix)
+    return condition & Q(**{f'{path}__lt': upper}) if upper else condition
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    ModelAdmin for tables too big to scan. search_fields may only use
+    `=field` (an exact match, skipped when the term isn't a valid value
+    for the field, e.g. letters against an id or a number against an
+    email, so unrelated ORed lookups can't force a scan) and `^field` (a
+    case-sensitive prefix match), so every search term is an index lookup.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+    def get_search_results(self, request, queryset, search_term):
+        search_fields = self.get_search_fields(request)
+        if not search_fields or not search_term:
+            return queryset, False
+        if not all(field.startswith(('=', '^')) for field in search_fields):
+            return super().get_search_results(request, queryset, search_term)
+
+        lookups = [
+            (field[0], field[1:], get_fields_from_path(self.model, field[1:])[-1])
+            for field in search_fields
+        ]
+        for bit in smart_split(search_term):
+            if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+                bit = unescape_string_literal(bit)
+            if not bit:
+                continue
+            term_queries = Q()
+            for kind, path, field in lookups:
+                if kind == '^':
+                    term_queries |= _prefix_lookup(path, bit)
+                    continue
+                try:
+                    value = field.clean(bit, None)
+                except ValidationError:
+                    continue
+                term_queries |= Q(**{path: value})
+            if not term_queries:
+                return queryset.none(), False
+            queryset = queryset.filter(term_queries)
+        return queryset, False
@@ -0,0 +1,42 @@
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+# Datetimes are passed through to DRF's encoder so the output format
+# (millisecond precision, trailing "Z") stays identical to JSONRenderer.
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    if orjson is not None else 0
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    orjson-backed JSON renderer.
+
+    Falls back to DRF's stdlib renderer when orjson is not installed, when
+    pretty printing was requested (e.g. by the browsable API) or when the
+    UNICODE_JSON/COMPACT_JSON settings ask for output orjson can't produce.
+    """
+    _encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if (
+            orjson is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self._encoder.default, option=ORJSON_OPTIONS)
+
+        # Keep the output a strict javascript subset, like JSONRenderer does.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -36,6 +36,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'project.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -104,6 +105,85 @@ STATIC_URL = 'static/'
 # Media files
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+MEDIA_CACHE_MAX_AGE = 60 * 60
+# Set to "x-accel-redirect" (nginx) or "x-sendfile" (Apache/lighttpd) to let the
+# front proxy send media files; MEDIA_ACCEL_PREFIX is nginx's internal location.
+MEDIA_ACCEL_REDIRECT = os.getenv('MEDIA_ACCEL_REDIRECT', '')
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media/')
+
+# Resumable uploads
+RESUMABLE_UPLOAD_DIR = os.getenv('RESUMABLE_UPLOAD_DIR', os.path.join(BASE_DIR, 'uploads_tmp'))
+RESUMABLE_UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+RESUMABLE_UPLOAD_MAX_CHUNK_SIZE = 5 * 1024 * 1024
+RESUMABLE_UPLOAD_MAX_AGE = timedelta(hours=24)
+
+# Response compression (project.middleware). Brotli is used when the
+# 'brotli' package is installed and the client accepts it.
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+COMPRESSION_CACHE_BYTES = 16 * 1024 * 1024
+
+# Cache. Set REDIS_CACHE_URL when running several processes so cached
+# fragments are refreshed everywhere when a user changes.
+if os.getenv('REDIS_CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_CACHE_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'rafiq',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+USER_FRAGMENT_TIMEOUT = 24 * 60 * 60
+
+# Group commit: queue validated donations to one writer thread per process
+# that commits them in batches, for bursts on a single hot campaign.
+DONATION_GROUP_COMMIT = os.getenv('DONATION_GROUP_COMMIT', 'False') == 'True'
+DONATION_BATCH_SIZE = 200
+DONATION_BATCH_WAIT = 0.005
+DONATION_COMMIT_TIMEOUT = 30
+
+# Idempotency keys for retried donation requests
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+IDEMPOTENCY_LOCK_TIMEOUT = timedelta(seconds=60)
+
+# Archiving: rows of campaigns that ended longer ago than this move to the
+# archive tables (manage.py archive_campaigns).
+ARCHIVE_AFTER = timedelta(days=365)
+ARCHIVE_CHUNK_SIZE = 1000
+
+# Most posts returned by one /funding/posts/batch/ request
+POST_BATCH_MAX_IDS = 100
+
+# Tag/category typeahead. Each process keeps its own index and checks the
+# shared cache for changes made elsewhere every TYPEAHEAD_RECHECK seconds.
+TYPEAHEAD_MAX_LIMIT = 20
+TYPEAHEAD_RECHECK = 5
+
+# Post view counters are buffered per process and in the cache, and written
+# to Post.views every VIEW_FLUSH_INTERVAL seconds (and at exit).
+VIEW_FLUSH_INTERVAL = 10
+VIEW_FLUSH_LOCK_TIMEOUT = 60
+
+# Activity feed
+FEED_FANOUT_LIMIT = 5000
+FEED_RETENTION = timedelta(days=90)
+
+# Funding progress stream. Use funding.progress.RedisBackend when running more
+# than one worker process so every process sees every donation.
+PROGRESS_BACKEND = os.getenv('PROGRESS_BACKEND', 'funding.progress.LocalBackend')
+PROGRESS_REDIS_URL = os.getenv('PROGRESS_REDIS_URL', 'redis://localhost:6379/0')
+PROGRESS_REDIS_PREFIX = 'rafiq:progress:'
+PROGRESS_MIN_INTERVAL = 1.0
+PROGRESS_KEEPALIVE = 15
+PROGRESS_RETRY_MS = 5000
 
 # Default auto field
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -115,6 +195,15 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 12,
+    'DEFAULT_RENDERER_CLASSES': [
+        'project.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'project.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ]
@@ -135,7 +224,8 @@ SIMPLE_JWT = {
 CORS_ALLOW_ALL_ORIGINS = True
 
 # Email configuration
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# EMAIL_BACKEND=django.core.mail.backends.locmem.EmailBackend (or .console) keeps mail local.
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -143,6 +233,25 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL')
 
+# Donation digests (manage.py send_donation_digests, run hourly). Authors
+# without a preference get DIGEST_DEFAULT_FREQUENCY; donations older than
+# DIGEST_LOOKBACK are never reported.
+DIGEST_DEFAULT_FREQUENCY = 'daily'
+DIGEST_LOOKBACK = timedelta(days=8)
+DIGEST_BATCH_SIZE = 100
+DIGEST_MAX_DONATIONS = 10
+
+# Columnar analytics snapshots (manage.py snapshot_analytics / donation_report)
+ANALYTICS_SNAPSHOT_DIR = os.getenv('ANALYTICS_SNAPSHOT_DIR', os.path.join(BASE_DIR, 'analytics'))
+ANALYTICS_CHUNK_ROWS = 100_000
+
+# Bulk user import
+USER_IMPORT_CHUNK_SIZE = 500
+# How long the status and result of an import started over the API are kept.
+USER_IMPORT_JOB_TTL = 24 * 60 * 60
+# Password hashing processes shared by all imports in a server process.
+USER_IMPORT_WORKERS = int(os.getenv('USER_IMPORT_WORKERS', min(4, os.cpu_count() or 1)))
+
 # Frontend URL
 RAFIQ_URL = os.getenv('RAFIQ_URL')
 
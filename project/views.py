@@ -0,0 +1,143 @@
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+from funding.storage import blob_digest
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """
+    File wrapper that stops reading after `length` bytes.
+
+    It deliberately has no tell()/seek(): FileResponse then leaves
+    Content-Length alone, while `fileno()` still lets the WSGI server's
+    file_wrapper sendfile() the range straight from the current offset.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+        self.name = file.name
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    # Only single byte ranges are supported; anything else falls back to a
+    # full response, which RFC 9110 allows.
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or not any(match.groups()):
+        return None
+    start, end = match.groups()
+    if start:
+        start = int(start)
+        if end and int(end) < start:
+            # Syntactically invalid (RFC 9110 14.1.1), so the header is ignored.
+            return None
+        end = min(int(end), size - 1) if end else size - 1
+    else:
+        start, end = max(size - int(end), 0), size - 1
+    # Valid but unsatisfiable: raised so the caller answers 416.
+    if start > end or start >= size:
+        raise ValueError
+    return start, end
+
+
+def cache_headers(response, name, st):
+    digest = blob_digest(name)
+    etag = f'"{digest}"' if digest else f'"{int(st.st_mtime):x}-{st.st_size:x}"'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(st.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    if digest:
+        # Content-hashed names never change meaning, so they can be cached forever.
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response['Cache-Control'] = f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+    return etag
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve a file from MEDIA_ROOT with validators, long-lived cache headers and
+    byte ranges, or hand it to the front proxy when MEDIA_ACCEL_REDIRECT is set.
+    """
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        st = os.stat(fullpath)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404
+
+    content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+
+    not_modified = HttpResponseNotModified()
+    etag = cache_headers(not_modified, path, st)
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        if etag in parse_etags(if_none_match) or if_none_match.strip() == '*':
+            return not_modified
+    elif not was_modified_since(request.headers.get('If-Modified-Since'), st.st_mtime):
+        return not_modified
+
+    accel = settings.MEDIA_ACCEL_REDIRECT
+    if accel:
+        # The proxy streams the bytes and handles ranges itself.
+        response = HttpResponse(content_type=content_type)
+        if accel == 'x-sendfile':
+            response['X-Sendfile'] = fullpath
+        else:
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(path)
+        cache_headers(response, path, st)
+        return response
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if if_range is None or if_range.strip() in (etag, http_date(st.st_mtime)):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), st.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{st.st_size}'
+            return response
+
+    f = open(fullpath, 'rb')
+    if byte_range is None:
+        response = FileResponse(f, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(RangeFile(f, start, end - start + 1), status=206, content_type=content_type)
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{st.st_size}'
+    cache_headers(response, path, st)
+    return response